@@ -18,13 +18,16 @@ of the geometry-specific classes, which are located in the geometry module.
 
 3. RedundancyGuard: checks if an organism is redundant
 
+4. PartiallyPeriodicMatcher: compares structures that are only periodic in
+        some directions
+
+5. PendingRegistry: keeps track of the unrelaxed organisms whose energy
+        calculations haven't finished yet
+
 """
 
-from pymatgen.core.composition import Composition
-from pymatgen.core.periodic_table import Element, DummySpecie
+from pymatgen.core.periodic_table import Element
 from pymatgen.core.structure import Molecule
-from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram
-from pymatgen.analysis.phase_diagram import PDEntry
 from pymatgen.analysis.structure_matcher import StructureMatcher
 from pymatgen.analysis.molecule_matcher import IsomorphismMolAtomMapper, \
     MoleculeMatcher
@@ -34,8 +37,13 @@ try:
 except ImportError:
     ob = None
 
+from scipy.optimize import linear_sum_assignment
+
 import warnings
 import math
+import time
+import multiprocessing
+import numpy as np
 
 
 class Constraints(object):
@@ -189,6 +197,9 @@ class Constraints(object):
         # check that min and max numbers of atoms makes sense
         self.check_num_atoms_range(composition_space)
 
+        # make the matrix of the per-species mids
+        self.make_mid_matrix(composition_space)
+
     def set_all_to_defaults(self, composition_space):
         '''
         Sets all general constraints (those in Constraints block of input file)
@@ -253,6 +264,72 @@ class Constraints(object):
             self.per_species_mids[str(pair)] = self.default_mid_factor*(
                 Element(p[0]).atomic_radius + Element(p[1]).atomic_radius)
 
+    def make_mid_matrix(self, composition_space):
+        '''
+        Makes a symmetric matrix of the per-species mids, whose rows and
+        columns correspond to the element symbols in self.mid_symbols. The
+        row of each symbol is given by self.mid_indices.
+
+        Args:
+            composition_space: the CompositionSpace of the search
+        '''
+
+        self.mid_symbols = []
+        self.mid_indices = {}
+        self.mid_matrix = np.zeros((0, 0))
+        self.add_mid_symbols([element.symbol for element in
+                              composition_space.get_all_elements()])
+
+    def add_mid_symbols(self, symbols):
+        '''
+        Adds rows and columns to the mid matrix for element symbols that
+        aren't in it yet. The mids of pairs that aren't in
+        self.per_species_mids are set to default values based on atomic radii.
+
+        Args:
+            symbols: a list of element symbols
+        '''
+
+        new_symbols = [symbol for symbol in set(symbols) if symbol not in
+                       self.mid_indices]
+        if len(new_symbols) == 0:
+            return
+        for symbol in sorted(new_symbols):
+            self.mid_indices[symbol] = len(self.mid_symbols)
+            self.mid_symbols.append(symbol)
+
+        num_symbols = len(self.mid_symbols)
+        mid_matrix = np.zeros((num_symbols, num_symbols))
+        for i in range(num_symbols):
+            for j in range(i, num_symbols):
+                # we don't know the ordering in per_species_mids, so try both
+                key1 = self.mid_symbols[i] + " " + self.mid_symbols[j]
+                key2 = self.mid_symbols[j] + " " + self.mid_symbols[i]
+                if key1 in self.per_species_mids:
+                    mid = self.per_species_mids[key1]
+                elif key2 in self.per_species_mids:
+                    mid = self.per_species_mids[key2]
+                else:
+                    mid = self.default_mid_factor*(
+                        Element(self.mid_symbols[i]).atomic_radius +
+                        Element(self.mid_symbols[j]).atomic_radius)
+                mid_matrix[i][j] = mid
+                mid_matrix[j][i] = mid
+        self.mid_matrix = mid_matrix
+
+    def get_mid_indices(self, symbols):
+        '''
+        Returns an array containing the index in the mid matrix of each of the
+        given element symbols.
+
+        Args:
+            symbols: a list of element symbols
+        '''
+
+        self.add_mid_symbols(symbols)
+        return np.array([self.mid_indices[symbol] for symbol in symbols],
+                        dtype=int)
+
     def get_max_mid(self):
         '''
         Returns largest per-species minimum interatomic distance constraint.
@@ -290,6 +367,46 @@ class Constraints(object):
                 quit()
 
 
+# the arguments shared by the tasks of a worker process of
+# Developer.develop_many
+_develop_worker_args = None
+
+
+def _init_develop_worker(developer, composition_space, constraints,
+                         geometry):
+    """
+    Stores the arguments shared by all the tasks of a worker process of
+    Developer.develop_many, which don't change during the search.
+    """
+
+    global _develop_worker_args
+    # the main process prints the statistics
+    developer.stats_interval = None
+    _develop_worker_args = (developer, composition_space, constraints,
+                            geometry)
+
+
+def _develop_in_worker(task):
+    """
+    Develops an organism in a worker process of Developer.develop_many.
+
+    Returns a boolean indicating whether the organism survived development,
+    the developed organism and the statistics of the stages of development.
+
+    Args:
+        task: a tuple containing the Organism to develop and the Pool
+    """
+
+    organism, pool = task
+    developer, composition_space, constraints, geometry = \
+        _develop_worker_args
+    # makes a new dictionary, so the results of earlier tasks don't change
+    developer.reset_stage_stats()
+    survived = developer.develop(organism, composition_space, constraints,
+                                 geometry, pool)
+    return survived, organism, developer.stage_stats
+
+
 class Developer(object):
     '''
     A Developer object is used to develop an organism before evaluating its
@@ -308,20 +425,53 @@ class Developer(object):
             scale_density: a boolean indicating whether or not to scale the
                 density
 
+            stage_order: a list of the names of the stages of development, in
+                the order in which to run them
+
+            stats_interval: the number of organisms to develop between
+                printouts of the development statistics (None to never print
+                them)
+
+            num_processes: the number of worker processes used to develop
+                batches of organisms in parallel
+
+            batch_size: the number of new organisms to make and develop at
+                once when num_processes is greater than 1
+
             geometry: the Geometry of the search
         '''
 
+        # the stages of development, and the stages whose cell modifications
+        # each stage depends on
+        self.stage_dependencies = {
+            'num_atoms': [],
+            'composition': [],
+            'niggli': [],
+            'scale_volume': [],
+            'lattice': ['niggli', 'scale_volume'],
+            'mids': ['scale_volume'],
+            'geometry': ['niggli', 'scale_volume']}
+
         # defaults
         self.default_niggli = True
         if geometry.shape == 'bulk':
             self.default_scale_density = True
         else:
             self.default_scale_density = False
+        self.default_stage_order = ['num_atoms', 'composition', 'niggli',
+                                    'scale_volume', 'lattice', 'mids',
+                                    'geometry']
+        self.default_stats_interval = 1000
+        self.default_num_processes = 1
 
         # set to defaults
         if developer_parameters in (None, 'default'):
             self.niggli = self.default_niggli
             self.scale_density = self.default_scale_density
+            self.stage_order = self.default_stage_order
+            self.stats_interval = self.default_stats_interval
+            self.num_processes = self.default_num_processes
+            self.batch_size = 'default'
         # parse the parameters and set to defaults if necessary
         else:
             # niggli
@@ -340,6 +490,87 @@ class Developer(object):
             else:
                 self.scale_density = developer_parameters['scale_density']
 
+            # stage order
+            if 'stage_order' not in developer_parameters:
+                self.stage_order = self.default_stage_order
+            elif developer_parameters['stage_order'] in (None, 'default'):
+                self.stage_order = self.default_stage_order
+            else:
+                self.stage_order = developer_parameters['stage_order']
+
+            # stats interval (None turns off the printouts)
+            if 'stats_interval' not in developer_parameters:
+                self.stats_interval = self.default_stats_interval
+            elif developer_parameters['stats_interval'] == 'default':
+                self.stats_interval = self.default_stats_interval
+            elif developer_parameters['stats_interval'] in (None, 'None'):
+                self.stats_interval = None
+            else:
+                self.stats_interval = developer_parameters['stats_interval']
+
+            # number of processes
+            if 'num_processes' not in developer_parameters:
+                self.num_processes = self.default_num_processes
+            elif developer_parameters['num_processes'] in (None, 'default'):
+                self.num_processes = self.default_num_processes
+            else:
+                self.num_processes = developer_parameters['num_processes']
+
+            # batch size
+            if 'batch_size' not in developer_parameters:
+                self.batch_size = 'default'
+            else:
+                self.batch_size = developer_parameters['batch_size']
+
+        # the default batch size depends on the number of processes
+        if self.batch_size in (None, 'default'):
+            self.batch_size = 100*self.num_processes
+
+        # the worker processes of develop_many, started when first needed
+        self.process_pool = None
+
+        self.check_stage_order()
+
+        # the number of calls, number of rejections and total time (in
+        # seconds) of each stage of development
+        self.reset_stage_stats()
+        self.num_developed = 0
+
+    def check_stage_order(self):
+        """
+        Checks that the stage order contains each stage of development exactly
+        once, and that no stage comes before a stage that modifies the cell
+        in a way it depends on. Quits if either check fails.
+
+        Niggli cell reduction doesn't change the interatomic distances, so the
+        MID check can come before it. A stage may come before a cell
+        modification that is turned off.
+        """
+
+        if sorted(self.stage_order) != sorted(self.stage_dependencies):
+            print('The stage_order in the Development block must contain '
+                  'each of the following stages exactly once: ')
+            print(', '.join(self.default_stage_order))
+            print('Quitting...')
+            quit()
+
+        # only count the stages that modify the cell
+        active_stages = []
+        if self.niggli:
+            active_stages.append('niggli')
+        if self.scale_density:
+            active_stages.append('scale_volume')
+
+        for i in range(len(self.stage_order)):
+            stage = self.stage_order[i]
+            for dependency in self.stage_dependencies[stage]:
+                if dependency in active_stages and \
+                        dependency in self.stage_order[i + 1:]:
+                    print('The {} stage of development must come after the '
+                          '{} stage.'.format(stage, dependency))
+                    print('Quitting...')
+                    quit()
+
     def develop(self, organism, composition_space, constraints, geometry,
                 pool):
         '''
@@ -358,44 +589,206 @@ class Developer(object):
             geometry: the Geometry of the search
 
             pool: the Pool
+
+        Description:
+
+            Runs the stages of development in the order given by
+            self.stage_order, stopping at the first one that rejects the
+            organism, and records the number of calls, number of rejections
+            and the time taken by each stage.
+        '''
+
+        survived = True
+        for stage in self.stage_order:
+            start_time = time.time()
+            passed = self.run_stage(stage, organism, composition_space,
+                                    constraints, geometry, pool)
+            if passed is None:
+                # the stage doesn't apply to this organism
+                continue
+            stats = self.stage_stats[stage]
+            stats[0] += 1
+            stats[2] += time.time() - start_time
+            if not passed:
+                stats[1] += 1
+                survived = False
+                break
+
+        self.update_num_developed(1)
+        return survived
+
+    def develop_many(self, organisms, composition_space, constraints,
+                     geometry, pool):
         '''
+        Develops a list of organisms, using self.num_processes worker
+        processes if self.num_processes is greater than 1.
+
+        Returns a list of the organisms that survived development, in the
+        order they were given. When worker processes are used, the returned
+        organisms are developed copies of the given ones.
+
+        Args:
+            organisms: the list of Organisms to develop
+
+            composition_space: the CompositionSpace of the search
+
+            constraints: the Constraints of the search
+
+            geometry: the Geometry of the search
+
+            pool: the Pool
+        '''
+
+        if self.num_processes <= 1 or len(organisms) < 2:
+            return [organism for organism in organisms if self.develop(
+                organism, composition_space, constraints, geometry, pool)]
+
+        # the worker processes already have the arguments that don't change,
+        # so only the organisms and the current pool are sent to them. The
+        # pool is pickled once for each chunk of organisms.
+        if self.process_pool is None:
+            self.process_pool = multiprocessing.Pool(
+                self.num_processes, initializer=_init_develop_worker,
+                initargs=(self, composition_space, constraints, geometry))
+        chunk_size = -(-len(organisms)//self.num_processes)
+        results = self.process_pool.map(
+            _develop_in_worker, [(organism, pool) for organism in organisms],
+            chunk_size)
+
+        # collect the survivors and add the workers' statistics to ours
+        survivors = []
+        for survived, organism, stage_stats in results:
+            for stage in stage_stats:
+                for i in range(3):
+                    self.stage_stats[stage][i] += stage_stats[stage][i]
+            if survived:
+                survivors.append(organism)
+        self.update_num_developed(len(organisms))
+        return survivors
+
+    def close(self):
+        """
+        Stops the worker processes of develop_many, if they were started.
+        """
+
+        if self.process_pool is not None:
+            self.process_pool.close()
+            self.process_pool.join()
+            self.process_pool = None
+
+    def __getstate__(self):
+        """
+        Returns the state of the Developer for pickling, without the worker
+        processes, which can't be pickled.
+        """
+
+        state = self.__dict__.copy()
+        state['process_pool'] = None
+        return state
+
+    def update_num_developed(self, num_organisms):
+        """
+        Adds to the number of developed organisms, and prints the development
+        statistics if another self.stats_interval organisms have been
+        developed.
+
+        Args:
+            num_organisms: the number of organisms just developed
+        """
+
+        num_before = self.num_developed
+        self.num_developed += num_organisms
+        if self.stats_interval is not None and self.stats_interval > 0 and \
+                self.num_developed//self.stats_interval > \
+                num_before//self.stats_interval:
+            self.print_stage_stats()
+
+    def reset_stage_stats(self):
+        """
+        Sets the number of calls, number of rejections and total time of each
+        stage of development to zero.
+        """
+
+        self.stage_stats = {}
+        for stage in self.stage_order:
+            self.stage_stats[stage] = [0, 0, 0.0]
+
+    def run_stage(self, stage, organism, composition_space, constraints,
+                  geometry, pool):
+        """
+        Runs a single stage of development on an organism.
+
+        Returns a boolean indicating whether the organism passed the stage, or
+        None if the stage doesn't apply to the organism.
+
+        Args:
+            stage: the name of the stage
+
+            organism: the Organism to develop
+
+            composition_space: the CompositionSpace of the search
+
+            constraints: the Constraints of the search
+
+            geometry: the Geometry of the search
+
+            pool: the Pool
+        """
 
         # check the constraints on the number of atoms
-        if not self.satisfies_num_atoms_constraints(organism, geometry,
-                                                    constraints):
-            return False
+        if stage == 'num_atoms':
+            return self.satisfies_num_atoms_constraints(organism, geometry,
+                                                        constraints)
 
         # check if the organism is is the composition space
-        if not self.is_in_composition_space(organism, geometry,
-                                            composition_space,
-                                            constraints, pool):
-            return False
+        elif stage == 'composition':
+            return self.is_in_composition_space(organism, geometry,
+                                                composition_space,
+                                                constraints, pool)
 
         # optionally do Niggli cell reduction
-        if self.niggli:
-            if not self.niggli_reduction(organism, geometry, constraints):
-                return False
+        elif stage == 'niggli':
+            if not self.niggli:
+                return None
+            return self.niggli_reduction(organism, geometry, constraints)
 
         # optionally scale the volume per atom if the organism is unrelaxed
-        if self.scale_density and len(
-                pool.promotion_set) > 0 and organism.epa is None:
-            if not self.scale_volume(organism, composition_space, pool):
-                return False
+        elif stage == 'scale_volume':
+            if not self.scale_density or len(pool.promotion_set) == 0 or \
+                    organism.epa is not None:
+                return None
+            return self.scale_volume(organism, composition_space, pool)
 
         # check the lattice length and angle constraints
-        if not self.satisfies_lattice_constraints(organism, geometry,
-                                                            constraints):
-            return False
+        elif stage == 'lattice':
+            return self.satisfies_lattice_constraints(organism, geometry,
+                                                      constraints)
 
         # check the per-species minimum interatomic distance constraints
-        if not self.satisfies_mids_constraints(organism, constraints):
-            return False
+        elif stage == 'mids':
+            return self.satisfies_mids_constraints(organism, constraints)
 
         # check any geometry-specific constraints
-        if not self.satisfies_geometry_constraints(organism, geometry):
-            return False
+        elif stage == 'geometry':
+            return self.satisfies_geometry_constraints(organism, geometry)
 
-        return True
+    def print_stage_stats(self):
+        """
+        Prints the number of calls, the number and percentage of rejections
+        and the total and average time taken by each stage of development.
+        """
+
+        print('Development statistics after {} organisms: '.format(
+            self.num_developed))
+        for stage in self.stage_order:
+            calls, rejects, total_time = self.stage_stats[stage]
+            if calls == 0:
+                print('    {}: not run'.format(stage))
+                continue
+            print('    {}: {} calls, {} rejected ({:.1f}%), {:.3f} s total, '
+                  '{:.2e} s per call'.format(stage, calls, rejects,
+                                             100*rejects/calls, total_time,
+                                             total_time/calls))
 
     def satisfies_num_atoms_constraints(self, organism, geometry, constraints):
         """
@@ -491,19 +884,7 @@ class Developer(object):
             pool: the Pool
         """
 
-        # cast the endpoints to PDEntries (just make up some energies)
-        pdentries = []
-        for endpoint in composition_space.endpoints:
-            pdentries.append(PDEntry(endpoint, -10))
-        pdentries.append(PDEntry(organism.composition, -10))
-
-        # make a CompoundPhaseDiagram and use it to check if the organism
-        # is in the composition space from how many entries it returns
-        composition_checker = CompoundPhaseDiagram(
-            pdentries, composition_space.endpoints)
-        if len(composition_checker.transform_entries(
-                    pdentries, composition_space.endpoints)[0]) == len(
-                        composition_space.endpoints):
+        if not composition_space.contains_composition(organism.composition):
             print('Organism {} lies outside the composition space '.format(
                 organism.id))
             return False
@@ -619,66 +1000,14 @@ class Developer(object):
                 value.
         """
 
-        # make CompoundPhaseDiagram object
-        pdentries = []
-        for org in pool.promotion_set:
-            pdentries.append(PDEntry(org.composition, org.total_energy))
-        compound_pd = CompoundPhaseDiagram(pdentries,
-                                           composition_space.endpoints)
-
-        # transform the organism's composition
-        transformed_entry = compound_pd.transform_entries(
-            [PDEntry(organism.composition, 10)], composition_space.endpoints)
-
-        # get the transformed species and amounts
-        transformed_list = str(transformed_entry[0][0]).split()
-        del transformed_list[0]
-        popped = ''
-        while popped != 'with':
-            popped = transformed_list.pop()
-
-        # separate the dummy species symbols from the amounts
-        symbols = []
-        amounts = []
-        for entry in transformed_list:
-            split_entry = entry.split('0+')
-            symbols.append(split_entry[0])
-            amounts.append(float(split_entry[1]))
-
-        # make a dictionary mapping dummy species to amounts
-        dummy_species_amounts = {}
-        for i in range(len(symbols)):
-            dummy_species_amounts[DummySpecie(symbol=symbols[i])] = amounts[i]
-
-        # make Composition object with dummy species, get decomposition
-        dummy_comp = Composition(dummy_species_amounts)
-        decomp = compound_pd.get_decomposition(dummy_comp)
-
-        # get original compositions and amounts from the decomposition
-        fractions = []
-        comps = []
-        for item in decomp:
-            fractions.append(decomp[item])
-            first_split = str(item).split(',')
-            second_split = first_split[0].split()
-            while second_split[0] != 'composition':
-                del second_split[0]
-            del second_split[0]
-            # build the composition string
-            comp_string = ''
-            for symbol in second_split:
-                comp_string += str(symbol)
-            comps.append(Composition(comp_string))
-
-        # get weighted average volume per atom of the organisms in the
+        # get the weighted average volume per atom of the organisms in the
         # decomposition
-        vpa_mean = 0
-        for i in range(len(comps)):
-            for org in pool.promotion_set:
-                if (comps[i].reduced_composition).almost_equals(
-                        org.composition.reduced_composition):
-                    vpa_mean += (org.cell.volume/len(
-                        org.cell.sites))*fractions[i]
+        vpa_mean = pool.get_hull().get_vpa(
+            organism.composition, composition_space)
+        if vpa_mean is None:
+            print('Volume scaling failed on organism {} during '
+                  'development '.format(organism.id))
+            return False
 
         # compute the new volume and scale to it
         num_atoms = len(organism.cell.sites)
@@ -760,27 +1089,20 @@ class Developer(object):
             organism.cell.merge_sites(mode='delete')
 
         # check the per-species minimum interatomic distance constraints
-        species_symbols = organism.cell.symbol_set
-        for site in organism.cell.sites:
-            for species_symbol in species_symbols:
-                # We don't know the ordering in per_species_mids, so try both
-                test_key1 = species_symbol + " " + site.specie.symbol
-                test_key2 = site.specie.symbol + " " + species_symbol
-                if test_key1 in constraints.per_species_mids:
-                    mid = constraints.per_species_mids[test_key1]
-                elif test_key2 in constraints.per_species_mids:
-                    mid = constraints.per_species_mids[test_key2]
-                # get all the sites within a sphere of radius mid centered on
-                # the current site
-                neighbors = organism.cell.get_neighbors(site, mid)
-                # check each neighbor in the sphere to see if it has the
-                # forbidden type
-                for neighbor in neighbors:
-                    if neighbor[0].specie.symbol == species_symbol:
-                        print('Organism {} failed per-species minimum '
-                              'interatomic distance constraint '.format(
-                                  organism.id))
-                        return False
+        # using a single neighbor list out to the largest relevant mid
+        symbols = [site.specie.symbol for site in organism.cell.sites]
+        indices = constraints.get_mid_indices(symbols)
+        present = np.unique(indices)
+        max_mid = np.max(constraints.mid_matrix[np.ix_(present, present)])
+        if max_mid <= 0:
+            return True
+        centers, neighbors, _, distances = organism.cell.get_neighbor_list(
+            max_mid)
+        if np.any(distances <= constraints.mid_matrix[indices[centers],
+                                                      indices[neighbors]]):
+            print('Organism {} failed per-species minimum interatomic '
+                  'distance constraint '.format(organism.id))
+            return False
         return True
 
     def satisfies_geometry_constraints(self, organism, geometry):
@@ -900,12 +1222,9 @@ class RedundancyGuard(object):
         Makes a RedundancyGuard, and sets default parameter values if
         necessary.
 
-        TODO: currently using pymatgen's structure matcher for comparing bulk
-            and sheet structures, both pymatgen's structure matcher and
-            molecule matcher for comparing wires, and only the molecule matcher
-            for clusters. The sheet and wire cases aren't ideal, since the
-            structure matcher assumes periodicity in all three dimensions, and
-            the molecule matcher assumes no periodicity.
+        Uses pymatgen's structure matcher for comparing bulk structures, a
+        PartiallyPeriodicMatcher for comparing sheets, interfaces and wires,
+        and pymatgen's molecule matcher for comparing clusters.
 
         Args:
             redundancy parameters: a dictionary of parameters
@@ -929,6 +1248,10 @@ class RedundancyGuard(object):
         self.default_rmsd_tol = 0.1
         # the epa difference interval
         self.default_epa_diff = 0.0
+        # max difference between the interatomic distances of an unrelaxed
+        # organism and one whose energy calculation is still running for
+        # them to be considered redundant, in Angstroms
+        self.default_pending_tol = 0.05
 
         # set to defaults
         if redundancy_parameters in (None, 'default'):
@@ -999,6 +1322,14 @@ class RedundancyGuard(object):
             else:
                 self.epa_diff = redundancy_parameters['epa_diff']
 
+            # pending calculations tolerance
+            if 'pending_tol' not in redundancy_parameters:
+                self.pending_tol = self.default_pending_tol
+            elif redundancy_parameters['pending_tol'] in (None, 'default'):
+                self.pending_tol = self.default_pending_tol
+            else:
+                self.pending_tol = redundancy_parameters['pending_tol']
+
         # make the StructureMatcher object
         #
         # the first False is to prevent the matcher from scaling the volumes,
@@ -1008,13 +1339,32 @@ class RedundancyGuard(object):
             self.use_primitive_cell, False, self.attempt_supercell, False,
             ElementComparator())
 
+        # make the PartiallyPeriodicMatcher object
+        if geometry.shape in ('sheet', 'interface'):
+            self.partially_periodic_matcher = PartiallyPeriodicMatcher(
+                self.lattice_length_tol, self.site_tol, self.lattice_angle_tol,
+                [0, 1], self.attempt_supercell)
+        elif geometry.shape == 'wire':
+            self.partially_periodic_matcher = PartiallyPeriodicMatcher(
+                self.lattice_length_tol, self.site_tol, self.lattice_angle_tol,
+                [2], self.attempt_supercell)
+
         # make the MoleculeMatcher object
-        if geometry.shape == 'cluster' or geometry.shape == 'wire':
+        if geometry.shape == 'cluster':
             iso_mol_atom_mapper = IsomorphismMolAtomMapper()
             self.molecule_matcher = MoleculeMatcher(self.rmsd_tol,
                                                     iso_mol_atom_mapper)
             ob.obErrorLog.SetOutputLevel(0)  # to suppress openbabel warnings
 
+        # results of the structural comparisons made for the most recently
+        # checked organism, keyed by the (id, is unrelaxed) pairs of the
+        # organisms it was compared to
+        self.checked_organism_key = None
+        self.structure_match_cache = {}
+
+        # the unrelaxed organisms whose energy calculations are running
+        self.pending_registry = PendingRegistry(self.pending_tol)
+
     def set_all_to_defaults(self):
         '''
         Sets all the redundancy parameters to default values.
@@ -1027,6 +1377,7 @@ class RedundancyGuard(object):
         self.attempt_supercell = self.default_attempt_supercell
         self.rmsd_tol = self.default_rmsd_tol
         self.epa_diff = self.default_epa_diff
+        self.pending_tol = self.default_pending_tol
 
     def check_redundancy(self, new_organism, orgs_list, geometry):
         '''
@@ -1043,35 +1394,153 @@ class RedundancyGuard(object):
             geometry: the Geometry of the search
         '''
 
-        # if new_organism isn't relaxed, then just check structures
+        # unrelaxed organisms are first cheaply compared to the organisms
+        # whose energy calculations are still running
+        cleared_ids = set()
         if new_organism.epa is None:
-            for organism in orgs_list:
-                if new_organism.id != organism.id:  # just in case
-                    # check if their structures match
-                    if self.check_structures(new_organism, organism, geometry):
-                        print('Organism {} failed structural redundancy - '
-                              'looks like organism {} '.format(new_organism.id,
-                                                               organism.id))
-                        return organism
-
-        # if new_organism is relaxed, only check against relaxed organisms
-        else:
-            for organism in orgs_list:
-                if new_organism.id != organism.id and organism.epa is not None:
-                    # check if their structures match
-                    if self.check_structures(new_organism, organism, geometry):
-                        print('Organism {} failed structural redundancy - '
-                              'looks like organism {} '.format(new_organism.id,
-                                                               organism.id))
-                        return organism
-                    # check how close their epa's are
-                    if abs(new_organism.epa - organism.epa) < self.epa_diff:
-                        print('Organism {} failed energy per atom redundancy '
-                              '- looks like organism {} '.format(
-                                  new_organism.id, organism.id))
-                        return organism
+            pending_organism, cleared_ids = self.pending_registry.get_match(
+                new_organism)
+            if pending_organism is not None:
+                print('Organism {} failed redundancy - looks like organism {}, '
+                      'which is still being relaxed '.format(
+                          new_organism.id, pending_organism.id))
+                return pending_organism
+
+        for organism in orgs_list:
+            # the unrelaxed copies of the organisms the registry has cleared
+            # don't need the structure matchers
+            if organism.epa is None and organism.id in cleared_ids:
+                continue
+            if self.is_redundant(new_organism, organism, geometry):
+                return organism
         return None
 
+    def register_pending(self, organism, key):
+        '''
+        Records that the energy calculation of an unrelaxed organism has been
+        started.
+
+        Args:
+            organism: the unrelaxed Organism, before it is padded with vacuum
+
+            key: a hashable identifying the energy calculation (e.g., the
+                index of its thread)
+        '''
+
+        self.pending_registry.add(organism, key)
+
+    def release_pending(self, key):
+        '''
+        Records that an energy calculation has finished, whether or not it
+        succeeded.
+
+        Args:
+            key: the hashable identifying the energy calculation
+        '''
+
+        self.pending_registry.remove(key)
+
+    def check_redundancy_with_pool(self, new_organism, pool_list, whole_pop,
+                                   geometry):
+        '''
+        Checks for redundancy against the organisms in the pool and against
+        all the other organisms seen so far, comparing new_organism to each
+        stored organism only once. The pool is checked first.
+
+        Returns a tuple (pool_organism, archived_organism), where
+        pool_organism is the organism in the pool with which new_organism is
+        redundant and archived_organism is the organism not in the pool with
+        which new_organism is redundant. At most one of them is not None.
+
+        Args:
+            new_organism: the Organism to check for redundancy
+
+            pool_list: a list containing the Organisms in the pool
+
+            whole_pop: the list containing all the Organisms seen so far,
+                including those in the pool
+
+            geometry: the Geometry of the search
+        '''
+
+        pool_keys = set()
+        for organism in pool_list:
+            if self.is_redundant(new_organism, organism, geometry):
+                return organism, None
+            pool_keys.add((organism.id, organism.epa is None))
+
+        # the pool members have already been checked
+        for organism in whole_pop:
+            if (organism.id, organism.epa is None) not in pool_keys and \
+                    self.is_redundant(new_organism, organism, geometry):
+                return None, organism
+        return None, None
+
+    def is_redundant(self, new_organism, organism, geometry):
+        '''
+        Checks if new_organism is redundant with organism, both structurally
+        and if specified, by epa (d-value). An unrelaxed new_organism is only
+        checked structurally, and a relaxed new_organism is only checked
+        against relaxed organisms.
+
+        Returns a boolean indicating whether new_organism is redundant with
+        organism.
+
+        Args:
+            new_organism: the Organism to check for redundancy
+
+            organism: the Organism to check against
+
+            geometry: the Geometry of the search
+        '''
+
+        if new_organism.id == organism.id:  # just in case
+            return False
+        if new_organism.epa is not None and organism.epa is None:
+            return False
+
+        # check if their structures match
+        if self.structures_match(new_organism, organism, geometry):
+            print('Organism {} failed structural redundancy - looks like '
+                  'organism {} '.format(new_organism.id, organism.id))
+            return True
+
+        # if both are relaxed, check how close their epa's are
+        if new_organism.epa is not None and abs(
+                new_organism.epa - organism.epa) < self.epa_diff:
+            print('Organism {} failed energy per atom redundancy - looks '
+                  'like organism {} '.format(new_organism.id, organism.id))
+            return True
+        return False
+
+    def structures_match(self, new_organism, organism, geometry):
+        '''
+        Returns the result of check_structures for new_organism and organism.
+
+        The results for the most recently checked organism are cached, so
+        checking it again against the same organisms doesn't repeat the
+        structural comparisons.
+
+        Args:
+            new_organism: the Organism being checked for redundancy
+
+            organism: the Organism to compare against
+
+            geometry: the Geometry of the search
+        '''
+
+        # the cell of an organism changes when it gets relaxed
+        new_key = (new_organism.id, new_organism.epa is None)
+        if new_key != self.checked_organism_key:
+            self.checked_organism_key = new_key
+            self.structure_match_cache = {}
+
+        key = (organism.id, organism.epa is None)
+        if key not in self.structure_match_cache:
+            self.structure_match_cache[key] = self.check_structures(
+                new_organism, organism, geometry)
+        return self.structure_match_cache[key]
+
     def check_structures(self, org1, org2, geometry):
         '''
         Compares the structures of two organisms to determine if they are
@@ -1088,15 +1557,29 @@ class RedundancyGuard(object):
             geometry: the Geometry of the search
         '''
 
+        return self.match_cells(org1.cell, org2.cell, geometry)
+
+    def match_cells(self, cell1, cell2, geometry):
+        '''
+        Compares two cells with the matcher appropriate for the geometry.
+
+        Returns a boolean indicating whether the cells are redundant.
+
+        Args:
+            cell1: the first Cell
+
+            cell2: the second Cell
+
+            geometry: the Geometry of the search
+        '''
+
         # use the molecule matcher for cluster searches
         if geometry.shape == 'cluster':
-            return self.match_molecules(org1.cell, org2.cell)
-        elif geometry.shape == 'wire':
-            molecules_match = self.match_molecules(org1.cell, org2.cell)
-            structures_match = self.structure_matcher.fit(org1.cell, org2.cell)
-            return molecules_match or structures_match
+            return self.match_molecules(cell1, cell2)
+        elif geometry.shape in ('sheet', 'interface', 'wire'):
+            return self.partially_periodic_matcher.fit(cell1, cell2)
         else:
-            return self.structure_matcher.fit(org1.cell, org2.cell)
+            return self.structure_matcher.fit(cell1, cell2)
 
     def match_molecules(self, cell1, cell2):
         '''
@@ -1114,3 +1597,641 @@ class RedundancyGuard(object):
         mol1 = Molecule(cell1.species, cell1.cart_coords)
         mol2 = Molecule(cell2.species, cell2.cart_coords)
         return self.molecule_matcher.fit(mol1, mol2)
+
+
+class PartiallyPeriodicMatcher(object):
+    '''
+    Compares structures that are only periodic along some of their lattice
+    vectors, like sheets (periodic along a and b) and wires (periodic along
+    c).
+
+    Only the lattice transformations within the periodic directions are
+    searched, and atoms are only compared with periodic boundary conditions
+    in those directions. The non-periodic directions are treated as
+    Cartesian space, in which the structures may be rotated, reflected and
+    translated.
+
+    Cells with different numbers of atoms are compared by mapping a supercell
+    of the smaller cell onto the larger one, so they can only match if the
+    number of atoms in one is a multiple of the number in the other.
+    '''
+
+    def __init__(self, lattice_length_tol, site_tol, lattice_angle_tol,
+                 periodic_indices, attempt_supercell):
+        '''
+        Makes a PartiallyPeriodicMatcher.
+
+        Args:
+            lattice_length_tol: the fractional tolerance on the lengths of the
+                periodic lattice vectors
+
+            site_tol: the tolerance on the atomic positions, in fraction of
+                the average free length per atom
+
+            lattice_angle_tol: the tolerance on the angle between the
+                periodic lattice vectors, in degrees
+
+            periodic_indices: a list of the indices of the periodic lattice
+                vectors. Either [0, 1] (sheets) or [2] (wires).
+
+            attempt_supercell: whether to check if the structures are equal
+                to supercells of each other
+        '''
+
+        self.lattice_length_tol = lattice_length_tol
+        self.site_tol = site_tol
+        self.lattice_angle_tol = lattice_angle_tol
+        self.periodic_indices = periodic_indices
+        self.attempt_supercell = attempt_supercell
+
+    def fit(self, cell1, cell2):
+        '''
+        Returns a boolean indicating whether two cells contain the same
+        structure.
+
+        Args:
+            cell1: the first Cell
+
+            cell2: the second Cell
+        '''
+
+        # make cell1 the one with more atoms
+        if cell2.num_sites > cell1.num_sites:
+            cell1, cell2 = cell2, cell1
+        if cell1.num_sites % cell2.num_sites != 0:
+            return False
+        multiple = cell1.num_sites//cell2.num_sites
+        if multiple > 1 and not self.attempt_supercell:
+            return False
+
+        # the compositions must be the same
+        symbols1 = np.array([site.specie.symbol for site in cell1.sites])
+        symbols2 = np.array([site.specie.symbol for site in cell2.sites])
+        for symbol in set(symbols1) | set(symbols2):
+            if np.sum(symbols1 == symbol) != \
+                    multiple*np.sum(symbols2 == symbol):
+                return False
+
+        # the maximum distance between matched atoms
+        free_length = ((cell1.volume/cell1.num_sites +
+                        cell2.volume/cell2.num_sites)/2)**(1/3)
+        tolerance = self.site_tol*free_length
+
+        coords1 = self.get_unwrapped_coords(cell1)
+        coords2 = self.get_unwrapped_coords(cell2)
+        if len(self.periodic_indices) == 2:
+            return self.fit_sheets(cell1, cell2, coords1, coords2, symbols1,
+                                   symbols2, multiple, tolerance)
+        else:
+            return self.fit_wires(cell1, cell2, coords1, coords2, symbols1,
+                                  symbols2, multiple, tolerance)
+
+    def get_unwrapped_coords(self, cell):
+        '''
+        Returns the Cartesian coordinates of the atoms in a cell, with the
+        atoms made contiguous in each non-periodic direction by cutting the
+        cell at the largest gap between atoms in that direction.
+
+        Args:
+            cell: the Cell
+        '''
+
+        frac_coords = np.mod(np.array(cell.frac_coords), 1.0)
+        for i in range(3):
+            if i not in self.periodic_indices:
+                values = np.sort(frac_coords[:, i])
+                gaps = np.diff(np.append(values, values[0] + 1))
+                start = values[(np.argmax(gaps) + 1) % len(values)]
+                frac_coords[:, i] = np.mod(frac_coords[:, i] - start,
+                                           1.0) + start
+        return np.dot(frac_coords, cell.lattice.matrix)
+
+    def fit_sheets(self, cell1, cell2, coords1, coords2, symbols1, symbols2,
+                   multiple, tolerance):
+        '''
+        Returns a boolean indicating whether two cells that are periodic along
+        their a and b lattice vectors contain the same structure.
+
+        Args:
+            cell1: the Cell with more atoms
+
+            cell2: the Cell with fewer atoms
+
+            coords1: the unwrapped Cartesian coordinates of cell1
+
+            coords2: the unwrapped Cartesian coordinates of cell2
+
+            symbols1: an array of the species symbols of cell1
+
+            symbols2: an array of the species symbols of cell2
+
+            multiple: the number of atoms in cell1 divided by the number of
+                atoms in cell2
+
+            tolerance: the maximum distance between matched atoms
+        '''
+
+        basis1, planar1, heights1 = self.get_planar_coords(cell1, coords1)
+        basis2, planar2, heights2 = self.get_planar_coords(cell2, coords2)
+        basis1 = self.reduce_basis(basis1)
+        basis2 = self.reduce_basis(basis2)
+
+        # find the vectors of the lattice of cell2 that could map onto each
+        # of the basis vectors of cell1
+        lengths1 = np.linalg.norm(basis1, axis=1)
+        max_length = np.max(lengths1)*(1 + self.lattice_length_tol)
+        area2 = abs(np.linalg.det(basis2))
+        bound = int(math.ceil(max_length*np.max(np.linalg.norm(
+            basis2, axis=1))/area2)) + 1
+        indices = np.array([[i, j] for i in range(-bound, bound + 1)
+                            for j in range(-bound, bound + 1)])
+        vectors = np.dot(indices, basis2)
+        lengths = np.linalg.norm(vectors, axis=1)
+        candidates = []
+        for length1 in lengths1:
+            candidates.append(np.where(np.abs(
+                lengths - length1) <= self.lattice_length_tol*length1)[0])
+
+        angle1 = self.get_angle(basis1[0], basis1[1])
+        inverse1 = np.linalg.inv(basis1)
+        frac1 = np.dot(planar1, inverse1)
+        for i in candidates[0]:
+            for j in candidates[1]:
+                transformation = np.array([indices[i], indices[j]])
+                if abs(round(np.linalg.det(transformation))) != multiple:
+                    continue
+                if abs(self.get_angle(vectors[i], vectors[j]) -
+                       angle1) > self.lattice_angle_tol:
+                    continue
+
+                # express the atoms of the supercell of cell2 in fractional
+                # coordinates of the mapped basis vectors, which correspond
+                # to those of cell1
+                inverse2 = np.linalg.inv(np.dot(transformation, basis2))
+                frac2 = []
+                for translation in self.get_coset_translations(
+                        transformation):
+                    frac2.append(np.dot(planar2 + np.dot(translation, basis2),
+                                        inverse2))
+                frac2 = np.concatenate(frac2)
+                supercell_symbols2 = np.tile(symbols2, multiple)
+                supercell_heights2 = np.tile(heights2, multiple)
+
+                # also try flipping the sheet over
+                for flip in [1, -1]:
+                    if self.sites_match(
+                            frac1, heights1, symbols1, frac2,
+                            flip*supercell_heights2, supercell_symbols2,
+                            basis1, tolerance):
+                        return True
+        return False
+
+    def get_planar_coords(self, cell, coords):
+        '''
+        Returns the in-plane basis vectors, the in-plane coordinates and the
+        heights above the plane of the atoms of a cell that is periodic along
+        its a and b lattice vectors, in an orthonormal frame with its first
+        axis along the a lattice vector.
+
+        Args:
+            cell: the Cell
+
+            coords: the unwrapped Cartesian coordinates of the atoms of cell
+        '''
+
+        a_vector = cell.lattice.matrix[0]
+        b_vector = cell.lattice.matrix[1]
+        normal = np.cross(a_vector, b_vector)
+        normal = normal/np.linalg.norm(normal)
+        x_axis = a_vector/np.linalg.norm(a_vector)
+        frame = np.array([x_axis, np.cross(normal, x_axis)])
+        basis = np.dot(cell.lattice.matrix[:2], frame.T)
+        return basis, np.dot(coords, frame.T), np.dot(coords, normal)
+
+    def reduce_basis(self, basis):
+        '''
+        Returns the Lagrange-reduced form of a two-dimensional basis.
+
+        Args:
+            basis: a 2x2 array whose rows are the basis vectors
+        '''
+
+        u = np.array(basis[0])
+        v = np.array(basis[1])
+        while True:
+            if np.dot(u, u) > np.dot(v, v):
+                u, v = v, u
+            mu = int(round(np.dot(u, v)/np.dot(u, u)))
+            if mu == 0:
+                return np.array([u, v])
+            v = v - mu*u
+
+    def get_angle(self, vector1, vector2):
+        '''
+        Returns the angle between two vectors, in degrees.
+
+        Args:
+            vector1: the first vector
+
+            vector2: the second vector
+        '''
+
+        cosine = np.dot(vector1, vector2)/(np.linalg.norm(vector1)*
+                                           np.linalg.norm(vector2))
+        return math.degrees(math.acos(max(-1.0, min(1.0, cosine))))
+
+    def get_coset_translations(self, transformation):
+        '''
+        Returns the lattice translations (in fractional coordinates of the
+        original lattice) of the copies of the original cell that make up the
+        supercell given by a 2x2 integer transformation matrix.
+
+        Args:
+            transformation: the 2x2 integer matrix whose rows give the
+                supercell basis vectors in terms of the original ones
+        '''
+
+        inverse = np.linalg.inv(transformation)
+        corners = np.array([[0, 0], transformation[0], transformation[1],
+                            transformation[0] + transformation[1]])
+        translations = []
+        for i in range(int(np.min(corners[:, 0])),
+                       int(np.max(corners[:, 0])) + 1):
+            for j in range(int(np.min(corners[:, 1])),
+                           int(np.max(corners[:, 1])) + 1):
+                frac = np.dot([i, j], inverse)
+                if np.all(frac > -1e-8) and np.all(frac < 1 - 1e-8):
+                    translations.append([i, j])
+        return np.array(translations)
+
+    def sites_match(self, frac1, heights1, symbols1, frac2, heights2,
+                    symbols2, basis, tolerance):
+        '''
+        Returns a boolean indicating whether there is a translation that maps
+        each atom of one sheet to within the tolerance of a distinct atom of
+        the same species in the other sheet.
+
+        The translations tried are the ones that map an atom of the least
+        common species in the first sheet onto each of the atoms of that
+        species in the second sheet.
+
+        Args:
+            frac1: the fractional in-plane coordinates of the first sheet
+
+            heights1: the heights above the plane of the first sheet
+
+            symbols1: the species symbols of the first sheet
+
+            frac2: the fractional in-plane coordinates of the second sheet
+
+            heights2: the heights above the plane of the second sheet
+
+            symbols2: the species symbols of the second sheet
+
+            basis: the in-plane basis vectors used to compute distances
+
+            tolerance: the maximum distance between matched atoms
+        '''
+
+        anchor_symbol = min(set(symbols1),
+                            key=lambda symbol: np.sum(symbols1 == symbol))
+        anchor = np.where(symbols1 == anchor_symbol)[0][0]
+        for j in np.where(symbols2 == anchor_symbol)[0]:
+            shifted_frac2 = frac2 + frac1[anchor] - frac2[j]
+            shifted_heights2 = heights2 + heights1[anchor] - heights2[j]
+            if self.assignment_exists(
+                    symbols1, symbols2, tolerance,
+                    lambda i1, i2: self.get_planar_distances(
+                        frac1[i1], heights1[i1], shifted_frac2[i2],
+                        shifted_heights2[i2], basis)):
+                return True
+        return False
+
+    def get_planar_distances(self, frac1, heights1, frac2, heights2, basis):
+        '''
+        Returns the matrix of distances between two sets of atoms in a sheet,
+        using the minimum image convention in the plane.
+
+        Args:
+            frac1: the fractional in-plane coordinates of the first set
+
+            heights1: the heights above the plane of the first set
+
+            frac2: the fractional in-plane coordinates of the second set
+
+            heights2: the heights above the plane of the second set
+
+            basis: the in-plane basis vectors
+        '''
+
+        frac_diffs = frac1[:, None, :] - frac2[None, :, :]
+        frac_diffs -= np.round(frac_diffs)
+        planar_diffs = np.dot(frac_diffs, basis)
+        height_diffs = heights1[:, None] - heights2[None, :]
+        return np.sqrt(np.sum(planar_diffs**2, axis=2) + height_diffs**2)
+
+    def fit_wires(self, cell1, cell2, coords1, coords2, symbols1, symbols2,
+                  multiple, tolerance):
+        '''
+        Returns a boolean indicating whether two cells that are periodic along
+        their c lattice vectors contain the same structure.
+
+        Args:
+            cell1: the Cell with more atoms
+
+            cell2: the Cell with fewer atoms
+
+            coords1: the unwrapped Cartesian coordinates of cell1
+
+            coords2: the unwrapped Cartesian coordinates of cell2
+
+            symbols1: an array of the species symbols of cell1
+
+            symbols2: an array of the species symbols of cell2
+
+            multiple: the number of atoms in cell1 divided by the number of
+                atoms in cell2
+
+            tolerance: the maximum distance between matched atoms
+        '''
+
+        length1 = cell1.lattice.c
+        length2 = multiple*cell2.lattice.c
+        if abs(length1 - length2) > self.lattice_length_tol*length1:
+            return False
+        axial1, radial1 = self.get_axial_coords(cell1, coords1)
+        axial2, radial2 = self.get_axial_coords(cell2, coords2)
+
+        # make the supercell of cell2 along the wire axis, with the axial
+        # coordinates in fractions of its length
+        axial2 = np.concatenate([axial2/cell2.lattice.c + i for i in
+                                 range(multiple)])/multiple
+        radial2 = np.tile(radial2, (multiple, 1))
+        symbols2 = np.tile(symbols2, multiple)
+        axial1 = axial1/length1
+
+        # the atom farthest from the axis fixes the rotation about the axis
+        radii1 = np.linalg.norm(radial1, axis=1)
+        radii2 = np.linalg.norm(radial2, axis=1)
+        anchor = np.argmax(radii1)
+        candidates = np.where(np.logical_and(
+            symbols2 == symbols1[anchor],
+            np.abs(radii2 - radii1[anchor]) <= tolerance))[0]
+        length = (length1 + length2)/2
+
+        # try the four combinations of reversing the wire axis and reflecting
+        # about a plane containing the axis
+        for axis_flip in [1, -1]:
+            for reflection in [1, -1]:
+                oriented_axial2 = axis_flip*axial2
+                oriented_radial2 = radial2*np.array([1, reflection])
+                for j in candidates:
+                    if radii1[anchor] > 1e-8:
+                        angle = math.atan2(radial1[anchor][1],
+                                           radial1[anchor][0]) - math.atan2(
+                            oriented_radial2[j][1], oriented_radial2[j][0])
+                    else:
+                        angle = 0.0
+                    rotation = np.array([[math.cos(angle), math.sin(angle)],
+                                         [-math.sin(angle), math.cos(angle)]])
+                    rotated_radial2 = np.dot(oriented_radial2, rotation)
+                    shifted_axial2 = oriented_axial2 + axial1[anchor] - \
+                        oriented_axial2[j]
+                    if self.assignment_exists(
+                            symbols1, symbols2, tolerance,
+                            lambda i1, i2: self.get_axial_distances(
+                                axial1[i1], radial1[i1], shifted_axial2[i2],
+                                rotated_radial2[i2], length)):
+                        return True
+        return False
+
+    def get_axial_coords(self, cell, coords):
+        '''
+        Returns the coordinates along the c lattice vector and the Cartesian
+        coordinates perpendicular to it, relative to the center of the atoms,
+        of the atoms of a cell that is periodic along its c lattice vector.
+
+        Args:
+            cell: the Cell
+
+            coords: the unwrapped Cartesian coordinates of the atoms of cell
+        '''
+
+        axis = cell.lattice.matrix[2]/cell.lattice.c
+        x_axis = cell.lattice.matrix[0] - np.dot(cell.lattice.matrix[0],
+                                                 axis)*axis
+        x_axis = x_axis/np.linalg.norm(x_axis)
+        frame = np.array([x_axis, np.cross(axis, x_axis)])
+        radial = np.dot(coords, frame.T)
+        return np.dot(coords, axis), radial - np.mean(radial, axis=0)
+
+    def get_axial_distances(self, axial1, radial1, axial2, radial2, length):
+        '''
+        Returns the matrix of distances between two sets of atoms in a wire,
+        using the minimum image convention along the wire axis.
+
+        Args:
+            axial1: the fractional axial coordinates of the first set
+
+            radial1: the coordinates perpendicular to the axis of the first set
+
+            axial2: the fractional axial coordinates of the second set
+
+            radial2: the coordinates perpendicular to the axis of the second
+                set
+
+            length: the length of the wire's periodic repeat
+        '''
+
+        axial_diffs = axial1[:, None] - axial2[None, :]
+        axial_diffs -= np.round(axial_diffs)
+        radial_diffs = radial1[:, None, :] - radial2[None, :, :]
+        return np.sqrt(np.sum(radial_diffs**2, axis=2) +
+                       (length*axial_diffs)**2)
+
+    def assignment_exists(self, symbols1, symbols2, tolerance,
+                          get_distances):
+        '''
+        Returns a boolean indicating whether the atoms of two equally sized
+        sets can be paired up, each with an atom of the same species, such
+        that no paired atoms are farther apart than the tolerance.
+
+        Args:
+            symbols1: the species symbols of the first set
+
+            symbols2: the species symbols of the second set
+
+            tolerance: the maximum distance between paired atoms
+
+            get_distances: a function that takes arrays of indices into the
+                first and second sets and returns the matrix of distances
+                between those atoms
+        '''
+
+        for symbol in set(symbols1):
+            indices1 = np.where(symbols1 == symbol)[0]
+            indices2 = np.where(symbols2 == symbol)[0]
+            distances = get_distances(indices1, indices2)
+            # cheap rejection before solving the assignment problem
+            if np.any(np.min(distances, axis=1) > tolerance) or np.any(
+                    np.min(distances, axis=0) > tolerance):
+                return False
+            rows, columns = linear_sum_assignment(distances)
+            if np.max(distances[rows, columns]) > tolerance:
+                return False
+        return True
+
+
+class PendingRegistry(object):
+    '''
+    Keeps the fingerprints of the unrelaxed organisms whose energy
+    calculations are still running, indexed by their compositions, so new
+    organisms that are nearly identical to them can be rejected without
+    running the structure matchers.
+
+    The fingerprint of a cell contains, for each pair of species, the sorted
+    distances between atoms of those species that are within a cutoff
+    distance. Two cells are considered nearly identical if they have the same
+    composition and number of atoms, and for each pair of species, the
+    distances in each fingerprint that are shorter than the cutoff minus the
+    tolerance each differ by at most the tolerance from the corresponding
+    (equally ranked) distance in the other fingerprint. Distances close to
+    the cutoff can only be compared to the other fingerprint, so a distance
+    moving across the cutoff doesn't prevent a match.
+    '''
+
+    def __init__(self, tolerance, cutoff=5.0):
+        '''
+        Makes a PendingRegistry.
+
+        Args:
+            tolerance: the maximum difference between corresponding
+                interatomic distances, in Angstroms
+
+            cutoff: the maximum interatomic distance included in the
+                fingerprints, in Angstroms
+        '''
+
+        self.tolerance = tolerance
+        self.cutoff = cutoff
+        # maps the key of each pending calculation to a tuple containing the
+        # composition formula, the organism and its fingerprint
+        self.pending = {}
+        # maps each composition formula to the keys of the pending
+        # calculations of organisms with that composition
+        self.keys_by_formula = {}
+
+    def add(self, organism, key):
+        '''
+        Adds an organism whose energy calculation has been started.
+
+        Args:
+            organism: the unrelaxed Organism
+
+            key: a hashable identifying the energy calculation
+        '''
+
+        self.remove(key)
+        formula = organism.cell.composition.formula
+        self.pending[key] = (formula, organism,
+                             self.get_fingerprint(organism.cell))
+        self.keys_by_formula.setdefault(formula, set()).add(key)
+
+    def remove(self, key):
+        '''
+        Removes the organism of an energy calculation that has finished. Does
+        nothing if there is no organism registered with the key.
+
+        Args:
+            key: the hashable identifying the energy calculation
+        '''
+
+        if key not in self.pending:
+            return
+        formula = self.pending.pop(key)[0]
+        self.keys_by_formula[formula].discard(key)
+        if len(self.keys_by_formula[formula]) == 0:
+            del self.keys_by_formula[formula]
+
+    def get_match(self, organism):
+        '''
+        Returns a tuple containing a pending organism that is nearly identical
+        to the given organism (or None if there isn't one), and the set of the
+        ids of the pending organisms that were compared to the given organism
+        and aren't nearly identical to it.
+
+        Args:
+            organism: the unrelaxed Organism to check
+        '''
+
+        cleared_ids = set()
+        formula = organism.cell.composition.formula
+        if formula not in self.keys_by_formula:
+            return None, cleared_ids
+
+        fingerprint = None
+        for key in self.keys_by_formula[formula]:
+            pending_organism, pending_fingerprint = self.pending[key][1:]
+            if pending_organism.id == organism.id:
+                continue
+            # only compute the fingerprint if there's something to compare
+            if fingerprint is None:
+                fingerprint = self.get_fingerprint(organism.cell)
+            if self.fingerprints_match(fingerprint, pending_fingerprint):
+                return pending_organism, cleared_ids
+            cleared_ids.add(pending_organism.id)
+        return None, cleared_ids
+
+    def get_fingerprint(self, cell):
+        '''
+        Returns the fingerprint of a cell, as a dictionary mapping each pair of
+        species symbols to an array of the sorted distances between atoms of
+        those species.
+
+        Args:
+            cell: the Cell whose fingerprint to compute
+        '''
+
+        centers, neighbors, _, distances = cell.get_neighbor_list(
+            self.cutoff)
+        symbols = np.array([site.specie.symbol for site in cell.sites])
+        center_symbols = symbols[centers]
+        neighbor_symbols = symbols[neighbors]
+
+        fingerprint = {}
+        for symbol1 in cell.symbol_set:
+            for symbol2 in cell.symbol_set:
+                if symbol1 <= symbol2:
+                    in_pair = np.logical_and(center_symbols == symbol1,
+                                             neighbor_symbols == symbol2)
+                    fingerprint[(symbol1, symbol2)] = np.sort(
+                        distances[in_pair])
+        return fingerprint
+
+    def fingerprints_match(self, fingerprint1, fingerprint2):
+        '''
+        Returns a boolean indicating whether two fingerprints are within the
+        tolerance of each other.
+
+        Args:
+            fingerprint1: the first fingerprint
+
+            fingerprint2: the second fingerprint
+        '''
+
+        if set(fingerprint1.keys()) != set(fingerprint2.keys()):
+            return False
+        for pair in fingerprint1:
+            for distances1, distances2 in [
+                    (fingerprint1[pair], fingerprint2[pair]),
+                    (fingerprint2[pair], fingerprint1[pair])]:
+                # the partners of these are all within the cutoff
+                distances1 = distances1[
+                    distances1 < self.cutoff - self.tolerance]
+                if len(distances1) > len(distances2):
+                    return False
+                if len(distances1) > 0 and np.max(np.abs(
+                        distances1 - distances2[:len(distances1)])) > \
+                        self.tolerance:
+                    return False
+        return True
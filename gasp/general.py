@@ -16,31 +16,35 @@ This module contains several classes central to the algorithm.
 
 3. Cell: represents a structure, and extends pymatgen.core.structure.Structure
 
-4. OffspringGenerator: high-level class for making offspring organisms
+4. ArrayCell: a lightweight, array-based copy of the lattice and sites of a
+        Cell
 
-5. SelectionProbDist: specifies the distribution from which selection
+5. OffspringGenerator: high-level class for making offspring organisms
+
+6. SelectionProbDist: specifies the distribution from which selection
         probabilities are drawn
 
-6. CompositionSpace: specifies the composition or composition range
+7. CompositionSpace: specifies the composition or composition range
 
-7. CompositionFitnessWeight: specifies how the weight given to the composition
+8. CompositionFitnessWeight: specifies how the weight given to the composition
         fitness is to be computed
 
-8. StoppingCriteria: specifies when a search should stop
+9. StoppingCriteria: specifies when a search should stop
 
-9. DataWriter: writes information about the search to a file
+10. DataWriter: writes information about the search to a file
 
 """
 
-from pymatgen.core.structure import Structure, Molecule
+from pymatgen.core.structure import Structure
+from pymatgen.core.sites import PeriodicSite
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.composition import Composition
-from pymatgen.core.periodic_table import Element, DummySpecie
-from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram
-from pymatgen.analysis.phase_diagram import PDEntry
-from pymatgen.transformations.standard_transformations import \
-    RotationTransformation
+from pymatgen.core.periodic_table import Element
+from pymatgen.core.operations import SymmOp
+
+from scipy.optimize import nnls
 
+import copy
 import numpy as np
 
 
@@ -92,6 +96,9 @@ class Organism(object):
         # position in composition space. Only used for phase diagram searches
         self.composition_vector = self.compute_composition_vector(
             composition_space)
+        # the index of the endpoint the organism is at (None if it isn't at
+        # one). Only used for phase diagram searches
+        self.endpoint_index = self.compute_endpoint_index(composition_space)
         self.total_energy = None
         # the objective function value
         self.value = None
@@ -131,6 +138,18 @@ class Organism(object):
     def id(self):
         return self._id
 
+    def snapshot(self):
+        """
+        Returns a copy of the organism whose cell is a snapshot of this
+        organism's cell (see Cell.snapshot), so that later changes to this
+        organism's cell don't change the copy. The other attributes are
+        shared, since they are only ever replaced, not modified in place.
+        """
+
+        organism_copy = copy.copy(self)
+        organism_copy.cell = self.cell.snapshot()
+        return organism_copy
+
     def compute_composition_vector(self, composition_space):
         """
         Returns the composition vector of the organism, as a numpy array.
@@ -142,62 +161,23 @@ class Organism(object):
         if composition_space.objective_function == 'epa':
             return None
         elif composition_space.objective_function == 'pd':
-            # make CompoundPhaseDiagram and PDAnalyzer objects
-            pdentries = []
-            for endpoint in composition_space.endpoints:
-                pdentries.append(PDEntry(endpoint, -10))
-            compound_pd = CompoundPhaseDiagram(pdentries,
-                                               composition_space.endpoints)
+            return composition_space.get_endpoint_fractions(self.composition)
 
-            # transform the organism's composition
-            transformed_entry = compound_pd.transform_entries(
-                [PDEntry(self.composition, 10)], composition_space.endpoints)
+    def compute_endpoint_index(self, composition_space):
+        """
+        Returns the index of the endpoint of the composition space that the
+        organism is located at, or None if it isn't located at an endpoint.
 
-            # get the transformed species and amounts
-            if len(transformed_entry[0]) == 0:
-                return None
-            transformed_list = str(transformed_entry[0][0]).split()
-            del transformed_list[0]
-            popped = ''
-            while popped != 'with':
-                popped = transformed_list.pop()
-
-            # separate the dummy species symbols from the amounts
-            symbols = []
-            amounts = []
-            for entry in transformed_list:
-                split_entry = entry.split('0+')
-                symbols.append(split_entry[0])
-                amounts.append(float(split_entry[1]))
-
-            # make a dictionary mapping dummy species to amounts
-            dummy_species_amounts = {}
-            for i in range(len(symbols)):
-                dummy_species_amounts[DummySpecie(symbol=symbols[i])] = \
-                    amounts[i]
-
-            # make Composition object with dummy species, get decomposition
-            dummy_comp = Composition(dummy_species_amounts)
-            decomp = compound_pd.get_decomposition(dummy_comp)
-
-            # get amounts of the decomposition in terms of the (untransformed)
-            # composition space endpoints
-            formatted_decomp = {}
-            for key in decomp:
-                key_dict = key.as_dict()
-                comp = Composition(key_dict['entry']['composition'])
-                formatted_decomp[comp] = decomp[key]
-
-            # make the composition vector
-            composition_vector = []
-            # because the random organism creator shuffles the endpoints
-            composition_space.endpoints.sort()
-            for endpoint in composition_space.endpoints:
-                if endpoint in formatted_decomp:
-                    composition_vector.append(formatted_decomp[endpoint])
-                else:
-                    composition_vector.append(0.0)
-            return np.array(composition_vector)
+        Args:
+            composition_space: the CompositionSpace of the search
+        """
+
+        if composition_space.objective_function == 'epa':
+            return None
+        for i, endpoint in enumerate(composition_space.endpoints):
+            if self.composition.reduced_composition.almost_equals(endpoint):
+                return i
+        return None
 
     def is_at_endpoint(self, composition_space):
         """
@@ -233,6 +213,77 @@ class Cell(Structure):
                                         site_properties=site_properties)
 
 
+    def set_sites(self, lattice, species, coords,
+                  coords_are_cartesian=False):
+        """
+        Replaces the lattice and all the sites of the cell in one step,
+        instead of removing the sites and appending new ones one at a time.
+
+        Args:
+            lattice: the new Lattice, or its matrix
+
+            species: a list of the species of the new sites
+
+            coords: an array of the coordinates of the new sites
+
+            coords_are_cartesian: whether the coordinates are Cartesian or
+                fractional
+        """
+
+        if not isinstance(lattice, Lattice):
+            lattice = Lattice(lattice)
+        self.lattice = lattice
+        self._sites = [PeriodicSite(species[i], coords[i], lattice,
+                                    coords_are_cartesian=coords_are_cartesian)
+                       for i in range(len(species))]
+
+    def snapshot(self):
+        """
+        Returns a copy of the cell that can be modified without changing this
+        cell, and vice versa.
+
+        Much cheaper than copy.deepcopy, because the site objects are copied
+        shallowly: the copies share their coordinate arrays and species with
+        the original sites until one of them is modified. This is safe
+        because pymatgen and GASP replace the coordinates and species of a
+        site when changing them, rather than modifying them in place.
+        """
+
+        cell_copy = Cell.__new__(Cell)
+        for key in self.__dict__:
+            value = self.__dict__[key]
+            if isinstance(value, (list, dict)):
+                value = copy.copy(value)
+            cell_copy.__dict__[key] = value
+        cell_copy._sites = [copy.copy(site) for site in self._sites]
+        return cell_copy
+
+    def to_array_cell(self):
+        """
+        Returns an ArrayCell with the lattice and sites of the cell.
+        """
+
+        species = []
+        species_indices = np.empty(len(self.sites), dtype=int)
+        for i, site in enumerate(self.sites):
+            if site.specie not in species:
+                species.append(site.specie)
+            species_indices[i] = species.index(site.specie)
+        return ArrayCell(self.lattice.matrix, species, species_indices,
+                         self.frac_coords)
+
+    def set_from_array_cell(self, array_cell):
+        """
+        Replaces the lattice and all the sites of the cell with those of an
+        ArrayCell.
+
+        Args:
+            array_cell: the ArrayCell
+        """
+
+        self.set_sites(array_cell.lattice_matrix, array_cell.get_species(),
+                       array_cell.frac_coords)
+
     def rotate_to_principal_directions(self):
         """
         Rotates the cell into the principal directions. That is, lattice vector
@@ -244,51 +295,16 @@ class Cell(Structure):
         sites. However, the Cartesian coordinates may be changed.
         """
 
-        # rotate about the z-axis to align a vertically with the x-axis
-        rotation = RotationTransformation(
-            [0, 0, 1], 180 - (180/np.pi)*np.arctan2(
-                    self.lattice.matrix[0][1],
-                    self.lattice.matrix[0][0]))
-        new_structure = rotation.apply_transformation(self)
-        self.lattice = new_structure.lattice
-
-        # rotate about the y-axis to make a parallel to the x-axis
-        rotation = RotationTransformation(
-                [0, 1, 0], (180/np.pi)*np.arctan2(
-                    self.lattice.matrix[0][2],
-                    self.lattice.matrix[0][0]))
-        new_structure = rotation.apply_transformation(self)
-        self.lattice = new_structure.lattice
-
-        # rotate about the x-axis to make b lie in the x-y plane
-        rotation = RotationTransformation(
-                [1, 0, 0], 180 - (180/np.pi)*np.arctan2(
-                    self.lattice.matrix[1][2],
-                    self.lattice.matrix[1][1]))
-        new_structure = rotation.apply_transformation(self)
-        self.lattice = new_structure.lattice
-
-        # make sure they are all pointing in positive directions
-        if self.lattice.matrix[0][0] < 0:
-            # rotate about y-axis to make a positive
-            rotation = RotationTransformation([0, 1, 0], 180)
-            new_structure = rotation.apply_transformation(self)
-            self.lattice = new_structure.lattice
-        if self.lattice.matrix[1][1] < 0:
-            # rotate about x-axis to make b positive
-            rotation = RotationTransformation([1, 0, 0], 180)
-            new_structure = rotation.apply_transformation(self)
-            self.lattice = new_structure.lattice
-        if self.lattice.matrix[2][2] < 0:
-            # mirror c across the x-y plane to make it positive
-            # a and b
-            a = self.lattice.matrix[0]
-            b = self.lattice.matrix[1]
-            # the components of c
-            cx = self.lattice.matrix[2][0]
-            cy = self.lattice.matrix[2][1]
-            cz = -1*self.lattice.matrix[2][2]
-            self.lattice = Lattice([a, b, [cx, cy, cz]])
+        # compute the rotated lattice vectors directly from the lattice
+        # parameters, with c pointing up
+        a, b, c = self.lattice.abc
+        alpha, beta, gamma = np.radians(self.lattice.angles)
+        cx = c*np.cos(beta)
+        cy = c*(np.cos(alpha) - np.cos(beta)*np.cos(gamma))/np.sin(gamma)
+        cz = np.sqrt(max(c**2 - cx**2 - cy**2, 0.0))
+        self.lattice = Lattice([[a, 0.0, 0.0],
+                                [b*np.cos(gamma), b*np.sin(gamma), 0.0],
+                                [cx, cy, cz]])
 
     def rotate_c_parallel_to_z(self):
         """
@@ -299,28 +315,38 @@ class Cell(Structure):
         sites. However, the Cartesian coordinates may be changed.
         """
 
+        matrix = self.lattice.matrix
+
         # rotate about the z-axis until c lies in the x-z plane
-        rotation = RotationTransformation(
-                [0, 0, 1], 180 - (180/np.pi)*np.arctan2(
-                    self.lattice.matrix[2][1],
-                    self.lattice.matrix[2][0]))
-        new_structure = rotation.apply_transformation(self)
-        self.lattice = new_structure.lattice
+        matrix = self.rotate_matrix(matrix, [0, 0, 1], 180 - (
+            180/np.pi)*np.arctan2(matrix[2][1], matrix[2][0]))
 
         # rotate about the y-axis to make c parallel to the z-axis
-        rotation = RotationTransformation(
-            [0, 1, 0], 180 - (180/np.pi)*np.arctan2(
-                self.lattice.matrix[2][0],
-                self.lattice.matrix[2][2]))
-        new_structure = rotation.apply_transformation(self)
-        self.lattice = new_structure.lattice
+        matrix = self.rotate_matrix(matrix, [0, 1, 0], 180 - (
+            180/np.pi)*np.arctan2(matrix[2][0], matrix[2][2]))
 
         # make sure c is pointing along the positive z-axis
-        if self.lattice.matrix[2][2] < 0:
+        if matrix[2][2] < 0:
             # rotate 180 degrees about the x-axis
-            rotation = RotationTransformation([1, 0, 0], 180)
-            new_structure = rotation.apply_transformation(self)
-            self.lattice = new_structure.lattice
+            matrix = self.rotate_matrix(matrix, [1, 0, 0], 180)
+        self.lattice = Lattice(matrix)
+
+    def rotate_matrix(self, matrix, axis, angle):
+        """
+        Returns a lattice matrix rotated about an axis by an angle, the same
+        way pymatgen's RotationTransformation rotates a lattice.
+
+        Args:
+            matrix: the lattice matrix to rotate (rows are lattice vectors)
+
+            axis: the axis about which to rotate
+
+            angle: the angle to rotate (in degrees)
+        """
+
+        rotation_matrix = SymmOp.from_axis_angle_and_translation(
+            axis, angle).rotation_matrix
+        return np.dot(matrix, rotation_matrix.T)
 
     def translate_atoms_into_cell(self):
         """
@@ -332,24 +358,58 @@ class Cell(Structure):
             each lattice vector.
         """
 
-        # get the bounding box of the atoms, in fractional coordinates
-        bounding_box = self.get_bounding_box(cart_coords=False)
-        translation_vector = []
+        if len(self.sites) == 0:
+            return
+        frac_coords = np.array(self.frac_coords)
+        frac_coords += self.get_into_cell_shift(frac_coords)
+        self.set_sites(self.lattice, self.species, frac_coords)
+
+    def get_into_cell_shift(self, frac_coords):
+        """
+        Returns the shift (in fractional coordinates) that translates all the
+        atoms into the cell, as done by translate_atoms_into_cell.
+
+        Args:
+            frac_coords: an array containing the fractional coordinates of the
+                atoms
+        """
 
         # determine the needed shift along each lattice vector
-        for i in range(3):
-            if bounding_box[i][0] < 0.0:
-                translation_vector.append(-1*(bounding_box[i][0]) + 0.001)
-            elif bounding_box[i][1] >= 1.0:
-                translation_vector.append(-1*(bounding_box[i][1] + 0.001) +
-                                          1.0)
-            else:
-                translation_vector.append(0.0)
+        mins = np.min(frac_coords, axis=0)
+        maxs = np.max(frac_coords, axis=0)
+        return np.where(mins < 0.0, -1*mins + 0.001,
+                        np.where(maxs >= 1.0, -1*(maxs + 0.001) + 1.0, 0.0))
+
+    def set_lattice_and_center(self, lattice, species, cart_coords,
+                               center_indices):
+        """
+        Replaces the lattice and all the sites of the cell in one step,
+        translating the atoms into the cell and then shifting them to the
+        center of the cell along the given lattice vectors.
 
-        # do the shift
-        site_indices = [i for i in range(len(self.sites))]
-        self.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        Args:
+            lattice: the new Lattice
+
+            species: a list of the species of the sites
+
+            cart_coords: an array containing the Cartesian coordinates of the
+                sites
+
+            center_indices: the indices of the lattice vectors along which to
+                center the atoms
+        """
+
+        if len(species) == 0:
+            self.set_sites(lattice, species, cart_coords)
+            return
+
+        frac_coords = lattice.get_fractional_coords(cart_coords)
+        frac_coords += self.get_into_cell_shift(frac_coords)
+        for i in center_indices:
+            center = (np.min(frac_coords[:, i]) +
+                      np.max(frac_coords[:, i]))/2
+            frac_coords[:, i] += 0.5 - center
+        self.set_sites(lattice, species, frac_coords)
 
     def reduce_cell(self):
         """
@@ -367,16 +427,9 @@ class Cell(Structure):
             return False
 
         # modify the cell to correspond to the reduced structure
-        rcartesian_coords = reduced_structure.cart_coords
-        rspecies = reduced_structure.species
-        self.lattice = reduced_structure.lattice
-        site_indices = []
-        for i in range(len(self.sites)):
-            site_indices.append(i)
-        self.remove_sites(site_indices)
-        for i in range(len(rcartesian_coords)):
-            self.append(rspecies[i], rcartesian_coords[i],
-                        coords_are_cartesian=True)
+        self.set_sites(reduced_structure.lattice, reduced_structure.species,
+                       reduced_structure.cart_coords,
+                       coords_are_cartesian=True)
 
         # rotate the cell into the principal directions
         self.rotate_to_principal_directions()
@@ -429,26 +482,26 @@ class Cell(Structure):
             coords = self.frac_coords
 
         # find the largest and smallest coordinates in each dimension
-        minx = np.inf
-        maxx = -np.inf
-        miny = np.inf
-        maxy = -np.inf
-        minz = np.inf
-        maxz = -np.inf
-        for coord in coords:
-            if coord[0] < minx:
-                minx = coord[0]
-            if coord[0] > maxx:
-                maxx = coord[0]
-            if coord[1] < miny:
-                miny = coord[1]
-            if coord[1] > maxy:
-                maxy = coord[1]
-            if coord[2] < minz:
-                minz = coord[2]
-            if coord[2] > maxz:
-                maxz = coord[2]
-        return [[minx, maxx], [miny, maxy], [minz, maxz]]
+        if len(coords) == 0:
+            return [[np.inf, -np.inf], [np.inf, -np.inf], [np.inf, -np.inf]]
+        mins = np.min(coords, axis=0)
+        maxs = np.max(coords, axis=0)
+        return [[mins[0], maxs[0]], [mins[1], maxs[1]], [mins[2], maxs[2]]]
+
+    def get_species_indices(self):
+        """
+        Returns a dictionary whose keys are the symbols of the elements in the
+        cell and whose values are lists of the indices of the sites of each
+        element.
+        """
+
+        species_indices = {}
+        for i, site in enumerate(self.sites):
+            symbol = str(site.specie.symbol)
+            if symbol not in species_indices:
+                species_indices[symbol] = []
+            species_indices[symbol].append(i)
+        return species_indices
 
     def surface_area(cell):
         """
@@ -458,6 +511,92 @@ class Cell(Structure):
         return np.linalg.norm(np.cross(m[0], m[1]))
 
 
+class ArrayCell(object):
+    """
+    A lightweight copy of the lattice and sites of a Cell, stored as numpy
+    arrays. Used to manipulate many sites at once without making a pymatgen
+    site object for each one. Convert back to a Cell with to_cell() or
+    Cell.set_from_array_cell().
+    """
+
+    __slots__ = ('lattice_matrix', 'species', 'species_indices',
+                 'frac_coords')
+
+    def __init__(self, lattice_matrix, species, species_indices, frac_coords):
+        """
+        Makes an ArrayCell.
+
+        Args:
+            lattice_matrix: a 3x3 array whose rows are the lattice vectors
+
+            species: a list of the distinct species in the cell
+
+            species_indices: an array containing the index in species of the
+                species of each site
+
+            frac_coords: an array containing the fractional coordinates of
+                each site
+        """
+
+        self.lattice_matrix = np.array(lattice_matrix, dtype=float)
+        self.species = list(species)
+        self.species_indices = np.array(species_indices, dtype=int)
+        self.frac_coords = np.array(frac_coords,
+                                    dtype=float).reshape(-1, 3)
+
+    @property
+    def num_sites(self):
+        return len(self.species_indices)
+
+    def get_species(self):
+        """
+        Returns a list of the species of the sites.
+        """
+
+        return [self.species[i] for i in self.species_indices]
+
+    def get_cart_coords(self):
+        """
+        Returns an array containing the Cartesian coordinates of the sites.
+        """
+
+        return np.dot(self.frac_coords, self.lattice_matrix)
+
+    def set_cart_coords(self, cart_coords):
+        """
+        Sets the fractional coordinates of the sites from their Cartesian
+        coordinates.
+
+        Args:
+            cart_coords: an array containing the Cartesian coordinates of the
+                sites
+        """
+
+        self.frac_coords = np.linalg.solve(self.lattice_matrix.T,
+                                           np.transpose(cart_coords)).T
+
+    def get_sites(self, indices):
+        """
+        Returns a new ArrayCell with the same lattice, containing only the
+        given sites.
+
+        Args:
+            indices: the indices of the sites to keep, or a boolean mask
+        """
+
+        return ArrayCell(self.lattice_matrix, self.species,
+                         self.species_indices[indices],
+                         self.frac_coords[indices])
+
+    def to_cell(self):
+        """
+        Returns a new Cell with the lattice and sites of the ArrayCell.
+        """
+
+        return Cell(Lattice(self.lattice_matrix), self.get_species(),
+                    self.frac_coords)
+
+
 class OffspringGenerator(object):
     """
     This class handles generating offspring organisms from the pool and the
@@ -662,6 +801,16 @@ class CompositionSpace(object):
             species_dict['specie_C'] = sorted_elems[2]
         self.species_dict = species_dict
 
+        # the matrix whose columns contain the amount of each element in each
+        # endpoint, used to express compositions in terms of the endpoints
+        self.endpoints.sort()
+        self.endpoint_elements = sorted(elems, key=lambda x: x.number)
+        self.endpoint_matrix = np.array(
+            [[endpoint[element] for endpoint in self.endpoints] for element in
+             self.endpoint_elements])
+        # maps reduced formulas to the normalized amounts of the endpoints
+        # (None if outside the composition space)
+        self.endpoint_fractions_cache = {}
 
     def infer_objective_function(self):
         """
@@ -713,6 +862,58 @@ class CompositionSpace(object):
             center_vect.append(1/len(self.endpoints))
         return np.array(center_vect)
 
+    def get_endpoint_fractions(self, composition):
+        """
+        Expresses a composition as a combination of the endpoints of the
+        composition space by solving a non-negative least squares problem.
+
+        Returns a numpy array containing the fraction of each (sorted)
+        endpoint, where the amount of each endpoint is counted in formula
+        units of its reduced composition, or None if the composition is
+        outside the composition space. The results are cached by reduced
+        formula.
+
+        Args:
+            composition: the pymatgen.core.composition.Composition
+        """
+
+        key = composition.reduced_formula
+        if key not in self.endpoint_fractions_cache:
+            self.endpoint_fractions_cache[key] = \
+                self.compute_endpoint_fractions(composition)
+        return self.endpoint_fractions_cache[key]
+
+    def compute_endpoint_fractions(self, composition):
+        """
+        Computes the uncached result of get_endpoint_fractions.
+
+        Args:
+            composition: the pymatgen.core.composition.Composition
+        """
+
+        # elements that aren't in any endpoint can't be made from them
+        for element in composition.elements:
+            if element not in self.endpoint_elements:
+                return None
+        reduced_composition = composition.reduced_composition
+        element_amounts = np.array([reduced_composition[element] for element
+                                    in self.endpoint_elements])
+        amounts, residual = nnls(self.endpoint_matrix, element_amounts)
+        if residual > 1e-5*np.linalg.norm(element_amounts):
+            return None
+        return amounts/np.sum(amounts)
+
+    def contains_composition(self, composition):
+        """
+        Returns a boolean indicating whether a composition lies in the
+        composition space.
+
+        Args:
+            composition: the pymatgen.core.composition.Composition
+        """
+
+        return self.get_endpoint_fractions(composition) is not None
+
     def get_all_elements(self):
         """
         Returns a list of all the elements
@@ -926,17 +1127,8 @@ class StoppingCriteria(object):
 
         # check the structure if needed
         if self.found_cell is not None:
-            if geometry.shape == 'cluster':
-                mol1 = Molecule(organism.cell.species,
-                                organism.cell.cart_coords)
-                mol2 = Molecule(self.found_cell.species,
-                                self.found_cell.cart_coords)
-                self.are_satisfied = \
-                    redundancy_guard.molecule_matcher.fit(mol1, mol2)
-            else:
-                self.are_satisfied = \
-                    redundancy_guard.structure_matcher.fit(organism.cell,
-                                                           self.found_cell)
+            self.are_satisfied = redundancy_guard.match_cells(
+                organism.cell, self.found_cell, geometry)
 
 
 class DataWriter(object):
@@ -26,7 +26,6 @@ from pymatgen.core.lattice import Lattice
 from pymatgen.core.sites import Site
 
 import numpy as np
-import copy
 
 
 class Bulk(object):
@@ -158,26 +157,11 @@ class Sheet(object):
         padded_lattice = Lattice([[ax, 0.0, 0.0], [bx, by, 0.0],
                                   [0.0, 0.0, layer_thickness + pad_amount]])
 
-        # modify the cell to correspond to the padded lattice
-        cell.lattice = padded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the vertical center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        z_center = frac_bounds[2][0] + (frac_bounds[2][1] -
-                                        frac_bounds[2][0])/2
-        translation_vector = [0, 0, 0.5 - z_center]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the padded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # vertical center
+        cell.set_lattice_and_center(padded_lattice, species, cartesian_coords,
+                                    [2])
 
     def unpad(self, cell, n_sub, constraints):
         '''
@@ -204,26 +188,11 @@ class Sheet(object):
         unpadded_lattice = Lattice([[ax, 0.0, 0.0], [bx, by, 0.0],
                                     [0.0, 0.0, layer_thickness + max_mid]])
 
-        # modify the cell to correspond to the unpadded lattice
-        cell.lattice = unpadded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the vertical center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        z_center = frac_bounds[2][0] + (frac_bounds[2][1] -
-                                        frac_bounds[2][0])/2
-        translation_vector = [0, 0, 0.5 - z_center]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the unpadded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # vertical center
+        cell.set_lattice_and_center(unpadded_lattice, species,
+                                    cartesian_coords, [2])
 
     def get_size(self, cell):
         '''
@@ -324,28 +293,11 @@ class Wire(object):
         padded_lattice = Lattice([[x_extent + pad_amount, 0, 0],
                                   [0, y_extent + pad_amount, 0], [0, 0, cz]])
 
-        # modify the cell to correspond to the padded lattice
-        cell.lattice = padded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the horizontal center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        x_center = frac_bounds[0][0] + (frac_bounds[0][1] -
-                                        frac_bounds[0][0])/2
-        y_center = frac_bounds[1][0] + (frac_bounds[1][1] -
-                                        frac_bounds[1][0])/2
-        translation_vector = [0.5 - x_center, 0.5 - y_center, 0.0]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the padded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # horizontal center
+        cell.set_lattice_and_center(padded_lattice, species, cartesian_coords,
+                                    [0, 1])
 
     def unpad(self, cell, n_sub, constraints):
         '''
@@ -379,28 +331,11 @@ class Wire(object):
                                     [0, y_extent + max_mid, 0.0],
                                     [0.0, 0.0, cz]])
 
-        # modify the cell to correspond to the unpadded lattice
-        cell.lattice = unpadded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the horizontal center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        x_center = frac_bounds[0][0] + (frac_bounds[0][1] -
-                                        frac_bounds[0][0])/2
-        y_center = frac_bounds[1][0] + (frac_bounds[1][1] -
-                                        frac_bounds[1][0])/2
-        translation_vector = [0.5 - x_center, 0.5 - y_center, 0.0]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the unpadded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # horizontal center
+        cell.set_lattice_and_center(unpadded_lattice, species,
+                                    cartesian_coords, [0, 1])
 
     def get_size(self, cell):
         '''
@@ -514,30 +449,11 @@ class Cluster(object):
                                   [0, y_extent + pad_amount, 0],
                                   [0, 0, z_extent + pad_amount]])
 
-        # modify the cell to correspond to the padded lattice
-        cell.lattice = padded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        x_center = frac_bounds[0][0] + (frac_bounds[0][1] -
-                                        frac_bounds[0][0])/2
-        y_center = frac_bounds[1][0] + (frac_bounds[1][1] -
-                                        frac_bounds[1][0])/2
-        z_center = frac_bounds[2][0] + (frac_bounds[2][1] -
-                                        frac_bounds[2][0])/2
-        translation_vector = [0.5 - x_center, 0.5 - y_center, 0.5 - z_center]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the padded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # center
+        cell.set_lattice_and_center(padded_lattice, species, cartesian_coords,
+                                    [0, 1, 2])
 
     def unpad(self, cell, n_sub, constraints):
         '''
@@ -571,30 +487,11 @@ class Cluster(object):
                                     [0, y_extent + max_mid, 0.0],
                                     [0.0, 0.0, z_extent + max_mid]])
 
-        # modify the cell to correspond to the unpadded lattice
-        cell.lattice = unpadded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        x_center = frac_bounds[0][0] + (frac_bounds[0][1] -
-                                        frac_bounds[0][0])/2
-        y_center = frac_bounds[1][0] + (frac_bounds[1][1] -
-                                        frac_bounds[1][0])/2
-        z_center = frac_bounds[2][0] + (frac_bounds[2][1] -
-                                        frac_bounds[2][0])/2
-        translation_vector = [0.5 - x_center, 0.5 - y_center, 0.5 - z_center]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the unpadded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # center
+        cell.set_lattice_and_center(unpadded_lattice, species,
+                                    cartesian_coords, [0, 1, 2])
 
     def get_size(self, cell):
         '''
@@ -701,26 +598,11 @@ class Substrate_2D(object):
         padded_lattice = Lattice([[ax, 0.0, 0.0], [bx, by, 0.0],
                                   [0.0, 0.0, layer_thickness + pad_amount]])
 
-        # modify the cell to correspond to the padded lattice
-        cell.lattice = padded_lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the vertical center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        z_center = frac_bounds[2][0] + (frac_bounds[2][1] -
-                                        frac_bounds[2][0])/2
-        translation_vector = [0, 0, 0.5 - z_center]
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                             frac_coords=True, to_unit_cell=False)
+        # modify the cell to correspond to the padded lattice, translate
+        # the atoms back into the cell if needed, and shift them to the
+        # vertical center
+        cell.set_lattice_and_center(padded_lattice, species, cartesian_coords,
+                                    [2])
 
     def unpad(self, cell, n_sub, constraints):
         '''
@@ -764,34 +646,13 @@ class Substrate_2D(object):
         twod_thickness = max(twod_z) - min(twod_z)
         twod_lattice = Lattice([[ax, 0.0, 0.0], [bx, by, 0.0],
                                 [0.0, 0.0, twod_thickness + max_mid]])
-        # Make a copy of relaxed interface before modifying cell
-        interface_cell = copy.deepcopy(cell)
-        cell.lattice = twod_lattice
-
-        # index of all the twod sites in the interface cell
-        all_ind = range(len(cartesian_coords))
-        twod_ind = all_ind[-n_twod:]
-
-        # Add 2D atomic sites to the 2D lattice
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
+        # Add 2D atomic sites to the 2D lattice, translate the atoms back into
+        # the cell if needed, and shift them to the vertical center (making
+        # z_center as 0.5)
         # Note: cartesian coords are not sorted to utilize the
         # existing sorted structure of interface cell
-        for i in twod_ind:
-            cell.append(species[i], cartesian_coords[i],
-                                coords_are_cartesian=True)
-
-        # translate the atoms back into the cell if needed, and shift them to
-        # the vertical center
-        cell.translate_atoms_into_cell()
-        frac_bounds = cell.get_bounding_box(cart_coords=False)
-        z_center = frac_bounds[2][0] + (frac_bounds[2][1] - frac_bounds[2][0])/2
-        translation_vector = [0, 0, 0.5 - z_center]    # making z_center as 0.5
-        site_indices = [i for i in range(len(cell.sites))]
-        cell.translate_sites(site_indices, translation_vector,
-                                  frac_coords=True, to_unit_cell=False)
+        cell.set_lattice_and_center(twod_lattice, species[-n_twod:],
+                                    cartesian_coords[-n_twod:], [2])
 
     def get_size(self, cell):
         '''
@@ -119,7 +119,7 @@ def make_objects(parameters):
 
     # make the organism creators
     initial_organism_creators = make_organism_creators(
-        parameters, composition_space, constraints)
+        parameters, composition_space, constraints, geometry)
 
     # if more than one organism creator, sort them so that the attempts-based
     # ones are at the front and the successes-based ones are at the back
@@ -360,7 +360,8 @@ def get_substrate_params(parameters):
     else:
         return None
 
-def make_organism_creators(parameters, composition_space, constraints):
+def make_organism_creators(parameters, composition_space, constraints,
+                           geometry=None):
     """
     Returns a list containing organism creator objects.
 
@@ -371,12 +372,16 @@ def make_organism_creators(parameters, composition_space, constraints):
         composition_space: the CompositionSpace of the search
 
         constraints: the Constraints of the search
+
+        geometry: the Geometry of the search
     """
 
     if 'InitialPopulation' not in parameters:
-        return make_default_organism_creator(composition_space, constraints)
+        return make_default_organism_creator(composition_space, constraints,
+                                             geometry)
     elif parameters['InitialPopulation'] in (None, 'default'):
-        return make_default_organism_creator(composition_space, constraints)
+        return make_default_organism_creator(composition_space, constraints,
+                                             geometry)
     # make the specified creators
     else:
         # check that at least one valid option is used
@@ -396,7 +401,7 @@ def make_organism_creators(parameters, composition_space, constraints):
         if 'random' in parameters['InitialPopulation']:
             random_organism_creator = organism_creators.RandomOrganismCreator(
                 parameters['InitialPopulation']['random'], composition_space,
-                constraints)
+                constraints, geometry)
             initial_organism_creators.append(random_organism_creator)
 
         # the from files organism creator
@@ -440,16 +445,34 @@ def make_organism_creators(parameters, composition_space, constraints):
                       'population does not exist.')
                 print('Quitting...')
                 quit()
+            # if a file was given, check that it's an archive
+            elif os.path.isfile(given_path) and \
+                    organism_creators.FileOrganismCreator.get_archive_type(
+                        given_path) is None:
+                print('The given file containing structures for the initial '
+                      'population is not a zip or tar archive.')
+                print('Quitting...')
+                quit()
             # if the folder exists, check that it contains files
-            elif len([f for f in os.listdir(given_path) if
-                      os.path.isfile(os.path.join(given_path, f))]) == 0:
+            elif os.path.isdir(given_path) and len(
+                    [f for f in os.listdir(given_path) if
+                     os.path.isfile(os.path.join(given_path, f))]) == 0:
                 print('The given folder containing structures for the initial '
                       'population does not contain any files.')
                 print('Quitting...')
                 quit()
             else:
+                # the number of processes used to parse the files
+                from_files_params = parameters['InitialPopulation'][
+                    'from_files']
+                if 'num_processes' not in from_files_params:
+                    num_processes = 1
+                elif from_files_params['num_processes'] in (None, 'default'):
+                    num_processes = 1
+                else:
+                    num_processes = from_files_params['num_processes']
                 files_organism_creator = organism_creators.FileOrganismCreator(
-                    given_path)
+                    given_path, num_processes)
                 # check that the files cover all composition space endpoints
                 if composition_space.objective_function == 'pd':
                     cells = files_organism_creator.get_cells()
@@ -476,7 +499,8 @@ def make_organism_creators(parameters, composition_space, constraints):
         return initial_organism_creators
 
 
-def make_default_organism_creator(composition_space, constraints):
+def make_default_organism_creator(composition_space, constraints,
+                                  geometry=None):
     """
     Returns a list containing a RandomOrganismCreator, or quits.
 
@@ -484,6 +508,8 @@ def make_default_organism_creator(composition_space, constraints):
         composition_space: the CompositionSpace of the search
 
         constraints: the Constraints of the search
+
+        geometry: the Geometry of the search
     """
 
     if composition_space.objective_function == 'pd':
@@ -497,7 +523,7 @@ def make_default_organism_creator(composition_space, constraints):
             quit()
     else:
         random_organism_creator = organism_creators.RandomOrganismCreator(
-            'default', composition_space, constraints)
+            'default', composition_space, constraints, geometry)
         return [random_organism_creator]
 
 
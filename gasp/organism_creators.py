@@ -20,10 +20,14 @@ population.
 from gasp.general import Organism, Cell
 
 from pymatgen.core.lattice import Lattice
-from pymatgen.core.composition import Composition
+from pymatgen.core.structure import Structure
+from pymatgen.symmetry.groups import SpaceGroup
 
-from fractions import Fraction
+import itertools
+import multiprocessing
+import tarfile
 import warnings
+import zipfile
 import os
 import math
 import numpy as np
@@ -34,7 +38,8 @@ class RandomOrganismCreator(object):
     Creates random organisms for the initial population.
     """
 
-    def __init__(self, random_org_parameters, composition_space, constraints):
+    def __init__(self, random_org_parameters, composition_space, constraints,
+                 geometry=None):
         """
         Makes a RandomOrganismCreator, and sets default parameter values if
         necessary.
@@ -46,6 +51,9 @@ class RandomOrganismCreator(object):
             composition_space: the CompositionSpace of the search
 
             constraints: the Constraints of the search
+
+            geometry: the Geometry of the search. Only used to choose the
+                symmetry groups when self.mode is 'symmetry'.
         """
 
         self.name = 'random organism creator'
@@ -70,6 +78,12 @@ class RandomOrganismCreator(object):
         self.default_max_num_atoms = min(min_of_max, constraints.max_num_atoms)
         # allow structure with compositions at the endpoints (for pd searches)
         self.default_allow_endpoints = True
+        # how to place the atoms: 'random' uses a random lattice and random
+        # coordinates, and 'symmetry' uses the orbits of a random space group
+        self.default_mode = 'random'
+        # the number of random candidates to draw at once (for the random
+        # mode)
+        self.default_batch_size = 1000
         # volume scaling behavior
         # default volumes per atom of elemental ground state structures
         # computed from structures on materials project (materialsproject.org)
@@ -111,6 +125,8 @@ class RandomOrganismCreator(object):
             self.number = self.default_number
             self.max_num_atoms = self.default_max_num_atoms
             self.allow_endpoints = self.default_allow_endpoints
+            self.mode = self.default_mode
+            self.batch_size = self.default_batch_size
             self.vpas = self.default_vpas
         # parse the parameters and set to defaults if necessary
         else:
@@ -154,6 +170,28 @@ class RandomOrganismCreator(object):
             else:
                 self.allow_endpoints = random_org_parameters['allow_endpoints']
 
+            # how to place the atoms
+            if 'mode' not in random_org_parameters:
+                self.mode = self.default_mode
+            elif random_org_parameters['mode'] in (None, 'default'):
+                self.mode = self.default_mode
+            elif random_org_parameters['mode'] in ('random', 'symmetry'):
+                self.mode = random_org_parameters['mode']
+            else:
+                print('The value of the "mode" keyword in the random block of '
+                      'the InitialPopulation block must be either "random" or '
+                      '"symmetry".')
+                print('Quitting...')
+                quit()
+
+            # the number of random candidates to draw at once
+            if 'batch_size' not in random_org_parameters:
+                self.batch_size = self.default_batch_size
+            elif random_org_parameters['batch_size'] in (None, 'default'):
+                self.batch_size = self.default_batch_size
+            else:
+                self.batch_size = random_org_parameters['batch_size']
+
             # volume scaling
             self.vpas = self.default_vpas
             if 'volumes_per_atom' not in random_org_parameters:
@@ -167,6 +205,58 @@ class RandomOrganismCreator(object):
                     self.vpas[symbol] = random_org_parameters[
                         'volumes_per_atom'][symbol]
 
+        # for the symmetry mode
+        #
+        # the shape of the search, which decides which symmetry operations
+        # are allowed
+        if geometry is None:
+            self.shape = 'bulk'
+        else:
+            self.shape = geometry.shape
+        # the number of space groups to try before giving up on an organism
+        self.max_space_group_attempts = 20
+        # the number of orbits to try before giving up on a space group
+        self.max_orbit_attempts = 50
+        # the numbers of the space groups that haven't been ruled out yet,
+        # and the rotations, translations and crystal systems of the ones that
+        # have been loaded
+        self.space_group_numbers = list(range(1, 231))
+        self.space_groups = {}
+
+        # for the random mode
+        #
+        # the random cells that passed the screening but haven't been used
+        # yet
+        self.random_cells = []
+        # the fractional coordinates of the 27 cells around the origin cell
+        self.images = np.array(list(itertools.product([-1, 0, 1],
+                                                      repeat=3)))
+        # the numpy random number generator used to draw the candidates, made
+        # from Python's PRNG the first time it's needed
+        self.rng = None
+
+        # the compositions a random organism can have (only used for phase
+        # diagram searches), grouped by the number of atoms per formula unit.
+        # Each group is only made the first time it's needed.
+        self.composition_table = None
+        self.table_elements = None
+        self.table_endpoint_amounts = None
+        self.table_denominator = None
+        self.table_group_sizes = None
+        if len(composition_space.endpoints) > 1:
+            self.make_composition_table(composition_space, constraints)
+            if not any(len(self.get_composition_group(num_atoms)) > 0 for
+                       num_atoms in self.table_group_sizes):
+                print('No composition in the composition space allows a '
+                      'random organism with between {} and {} '
+                      'atoms.'.format(constraints.min_num_atoms,
+                                      self.max_num_atoms))
+                print('Please increase the value passed to the '
+                      '"max_num_atoms" keyword in the InitialPopulation '
+                      'block.')
+                print('Quitting...')
+                quit()
+
         self.num_made = 0  # number added to initial population
         self.is_successes_based = True  # it's based on number added
         self.is_finished = False
@@ -191,8 +281,8 @@ class RandomOrganismCreator(object):
         """
         Creates a random organism for the initial population.
 
-        Returns a random organism, or None if an error was encountered during
-        volume scaling.
+        Returns a random organism, or None if none of the random candidates
+        could be used.
 
         Note: for phase diagram searches, this is will not create structures
             with compositions equivalent to the endpoints of the composition
@@ -210,26 +300,281 @@ class RandomOrganismCreator(object):
             random: a copy of Python's built in PRNG
         """
 
-        # make a random lattice
-        random_lattice = self.make_random_lattice(constraints, random)
+        if self.mode == 'symmetry':
+            return self.create_symmetric_organism(
+                id_generator, composition_space, constraints, random)
+
+        # random cells are made in batches, and handed out one at a time
+        if len(self.random_cells) == 0:
+            self.random_cells = self.make_random_cells(
+                self.batch_size, composition_space, constraints, random)
+            if len(self.random_cells) == 0:
+                return None
+        random_cell = self.random_cells.pop()
+
+        # make the random organism
+        random_org = Organism(random_cell, id_generator, self.name,
+                              composition_space)
+        print('Random organism creator making organism {} '.format(
+            random_org.id))
+        return random_org
+
+    def make_random_cells(self, num_candidates, composition_space,
+                          constraints, random):
+        """
+        Draws a batch of random candidates at once, and returns a list of
+        Cells made from the ones that pass the screening.
+
+        Args:
+            num_candidates: the number of random candidates to draw
+
+            composition_space: the CompositionSpace of the search
+
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+
+        Description:
+
+            1. Gets a list of species for each candidate.
+
+            2. Draws the lattice parameters of all the candidates as arrays,
+                builds the lattice matrices from them, and scales each one to
+                the volume given by self.vpas. Candidates whose volume can't
+                be scaled are discarded.
+
+            3. Draws the fractional coordinates of all the atoms of all the
+                candidates as one array.
+
+            4. For bulk searches, discards the candidates with a lattice
+                vector shorter than the minimum lattice length, or with two
+                atoms closer than their per-species minimum interatomic
+                distance. Development would reject these anyway, since Niggli
+                reduction never lengthens the shortest lattice vector.
+
+            5. Makes Cells from the remaining candidates.
+        """
+
+        rng = self.get_rng(random)
+
+        # get the species of each candidate
+        species_lists = self.get_species_lists(
+            num_candidates, composition_space, constraints, random)
+        num_atoms = np.array([len(species) for species in species_lists])
+
+        # make the lattices, scaled to the target volumes
+        matrices = self.make_random_lattice_matrices(len(species_lists),
+                                                     constraints, rng)
+        target_volumes = np.array([self.get_target_volume(species) for
+                                   species in species_lists])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale_factors = np.cbrt(
+                target_volumes/np.abs(np.linalg.det(matrices)))
+            matrices *= scale_factors[:, None, None]
+            lengths = np.linalg.norm(matrices, axis=2)
+        # discard the lattices whose volume couldn't be scaled
+        is_valid = np.all(np.isfinite(lengths), axis=1) & \
+            (lengths[:, 0] <= 100)
+
+        # draw the fractional coordinates of all the atoms
+        all_frac_coords = rng.random((np.sum(num_atoms), 3))
+        frac_coords = np.split(all_frac_coords, np.cumsum(num_atoms)[:-1])
+
+        # screen out the candidates development would reject
+        if self.shape == 'bulk':
+            is_valid &= np.all(lengths >= constraints.min_lattice_length,
+                               axis=1)
+            mid_indices = [constraints.get_mid_indices(
+                [specie.symbol for specie in species]) for species in
+                species_lists]
+            for n in np.unique(num_atoms[is_valid]):
+                group = np.flatnonzero(is_valid & (num_atoms == n))
+                is_valid[group] = self.satisfy_mids(
+                    matrices[group], np.array([frac_coords[i] for i in group]),
+                    np.array([mid_indices[i] for i in group]), constraints)
+
+        return [Cell(Lattice(matrices[i]), species_lists[i], frac_coords[i])
+                for i in np.flatnonzero(is_valid)]
+
+    def satisfy_mids(self, matrices, frac_coords, mid_indices, constraints):
+        """
+        Returns a boolean array indicating which of a group of candidates with
+        the same number of atoms have no two atoms closer than their
+        per-species minimum interatomic distance.
+
+        For each pair of atoms, only the images in the 27 cells around the
+        nearest image in fractional coordinates are checked. These are true
+        distances between the atoms, so no valid candidate is rejected, but
+        a few very skewed invalid ones may get through (development checks
+        them fully).
+
+        Args:
+            matrices: the lattice matrices of the candidates, as an array of
+                shape (number of candidates, 3, 3)
+
+            frac_coords: the fractional coordinates of the candidates, as an
+                array of shape (number of candidates, number of atoms, 3)
+
+            mid_indices: the indices of the elements of the atoms in the MID
+                matrix, as an array of shape (number of candidates, number of
+                atoms)
+
+            constraints: the Constraints of the search
+        """
+
+        num_candidates, num_atoms = frac_coords.shape[:2]
+
+        # do the candidates in chunks to limit the memory used, since each
+        # candidate needs 27 images of the differences between all its pairs
+        # of atoms
+        satisfied = np.empty(num_candidates, dtype=bool)
+        chunk_size = max(1, 20000//(num_atoms*num_atoms))
+        for start in range(0, num_candidates, chunk_size):
+            chunk_coords = frac_coords[start:start + chunk_size]
+            chunk_indices = mid_indices[start:start + chunk_size]
+            num_chunk = len(chunk_coords)
+            differences = chunk_coords[:, :, None, :] - \
+                chunk_coords[:, None, :, :]
+            differences -= np.round(differences)
+            differences = differences.reshape(num_chunk, -1, 1, 3) + \
+                self.images
+            cart_differences = np.matmul(
+                differences, matrices[start:start + chunk_size, None])
+            distances = np.min(np.linalg.norm(cart_differences, axis=3),
+                               axis=2)
+            mids = constraints.mid_matrix[chunk_indices[:, :, None],
+                                          chunk_indices[:, None, :]]
+            mids[:, np.arange(num_atoms), np.arange(num_atoms)] = 0
+            satisfied[start:start + chunk_size] = np.all(
+                distances >= mids.reshape(num_chunk, -1), axis=1)
+        return satisfied
+
+    def get_rng(self, random):
+        """
+        Returns the numpy random number generator used to draw the random
+        candidates, making it from Python's PRNG if needed.
+
+        Args:
+            random: a copy of Python's built in PRNG
+        """
+
+        if self.rng is None:
+            self.rng = np.random.default_rng(random.getrandbits(64))
+        return self.rng
+
+    def make_random_lattice_matrices(self, num_lattices, constraints, rng):
+        """
+        Returns the matrices of random lattices that satisfy the constraints on
+        maximum and minimum lengths and angles, as an array of shape
+        (num_lattices, 3, 3). The matrices are the same as those made by
+        Lattice.from_parameters.
+
+        Args:
+            num_lattices: the number of lattices to make
+
+            constraints: the Constraints of the search
+
+            rng: the numpy random number generator
+        """
+
+        lengths = rng.uniform(constraints.min_lattice_length,
+                              constraints.max_lattice_length,
+                              (num_lattices, 3))
+        angles = np.radians(rng.uniform(constraints.min_lattice_angle,
+                                        constraints.max_lattice_angle,
+                                        (num_lattices, 3)))
+        cosines = np.cos(angles)
+        sines = np.sin(angles)
+        gamma_star = np.arccos(np.clip(
+            (cosines[:, 0]*cosines[:, 1] - cosines[:, 2]) /
+            (sines[:, 0]*sines[:, 1]), -1, 1))
+
+        matrices = np.zeros((num_lattices, 3, 3))
+        matrices[:, 0, 0] = lengths[:, 0]*sines[:, 1]
+        matrices[:, 0, 2] = lengths[:, 0]*cosines[:, 1]
+        matrices[:, 1, 0] = -lengths[:, 1]*sines[:, 0]*np.cos(gamma_star)
+        matrices[:, 1, 1] = lengths[:, 1]*sines[:, 0]*np.sin(gamma_star)
+        matrices[:, 1, 2] = lengths[:, 1]*cosines[:, 0]
+        matrices[:, 2, 2] = lengths[:, 2]
+        return matrices
+
+    def create_symmetric_organism(self, id_generator, composition_space,
+                                  constraints, random):
+        """
+        Creates a random organism whose atoms fill the orbits of a random
+        space group, for the initial population.
+
+        Returns a random organism, or None if no valid structure could be
+        made.
+
+        Args:
+            id_generator: the IDGenerator used to assign id numbers to all
+                organisms
+
+            composition_space: the CompositionSpace of the search
+
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+
+        Description:
+
+            1. Gets a list of species for the random organism.
+
+            2. Picks a random space group that is compatible with the shape
+                of the search and with the constraints on the lattice angles,
+                and makes a random lattice of the right crystal system, scaled
+                to the volume given by self.vpas.
+
+            3. Fills the cell one orbit at a time, where each orbit comes from
+                a random point, possibly moved onto the set of points fixed by
+                a few random symmetry operations (a special position). An
+                orbit is only accepted if it fits in the number of atoms of
+                the element still to be placed and its atoms are no closer to
+                each other or to the atoms already placed than the per-species
+                minimum interatomic distances.
+
+            4. If the cell can't be filled, tries again with another space
+                group, up to self.max_space_group_attempts times.
+        """
 
         # get a list of species for the random organism
         species = self.get_species_list(composition_space, constraints, random)
-        if species is None:  # could happen for pd searches...
+        target_volume = self.get_target_volume(species)
+        for _ in range(self.max_space_group_attempts):
+            space_group = self.get_random_space_group(constraints, random)
+            if space_group is None:
+                break
+            rotations, translations, crystal_system = space_group
+            lattice = self.make_symmetric_lattice(crystal_system, constraints,
+                                                  random)
+            # this is to suppress the warnings produced if the scale method
+            # fails
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                lattice = lattice.scale(target_volume)
+            if str(lattice.a) == 'nan' or lattice.a > 100:
+                continue
+            placement = self.place_orbits(species, lattice, rotations,
+                                          translations, constraints, random)
+            if placement is not None:
+                break
+        else:
+            placement = None
+        if placement is None:
             return None
 
-        # for each specie, generate a set of random fractional coordinates
-        random_coordinates = []
-        for _ in range(len(species)):
-            random_coordinates.append([random.random(), random.random(),
-                                       random.random()])
-
-        # make a random cell
-        random_cell = Cell(random_lattice, species, random_coordinates)
-
-        # optionally scale the volume of the random structure
-        if not self.scale_volume(random_cell):
-            return None  # sometimes pymatgen's scaling algorithm crashes
+        # the symmetry operations of non-bulk geometries fix the origin along
+        # the non-periodic directions, so move the structure to the middle of
+        # the cell along those directions
+        placed_species, frac_coords = placement
+        if self.shape in ('sheet', 'interface'):
+            frac_coords[:, 2] += 0.5
+        elif self.shape == 'wire':
+            frac_coords[:, :2] += 0.5
+        elif self.shape == 'cluster':
+            frac_coords += 0.5
+        random_cell = Cell(lattice, placed_species, frac_coords % 1.0)
 
         # make the random organism
         random_org = Organism(random_cell, id_generator, self.name,
@@ -238,6 +583,238 @@ class RandomOrganismCreator(object):
             random_org.id))
         return random_org
 
+    def get_random_space_group(self, constraints, random):
+        """
+        Returns the rotations (as an array of 3x3 matrices), the translations
+        (as an array of vectors) and the crystal system of the symmetry
+        operations of a random space group that is compatible with the shape
+        of the search and the constraints on the lattice angles, or None if
+        there are no compatible space groups.
+
+        Space groups are loaded the first time they are picked, and the ones
+        that turn out to be incompatible are not picked again.
+
+        Args:
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+        """
+
+        while len(self.space_group_numbers) > 0:
+            number = random.choice(self.space_group_numbers)
+            if number not in self.space_groups:
+                space_group = SpaceGroup.from_int_number(number)
+                rotations = np.array([op.rotation_matrix for op in
+                                      space_group.symmetry_ops])
+                translations = np.array([op.translation_vector for op in
+                                         space_group.symmetry_ops]) % 1.0
+                crystal_system = space_group.crystal_system
+                if self.is_compatible_space_group(
+                        rotations, translations, crystal_system, constraints):
+                    self.space_groups[number] = (rotations, translations,
+                                                 crystal_system)
+                else:
+                    self.space_group_numbers.remove(number)
+                    continue
+            return self.space_groups[number]
+        return None
+
+    def is_compatible_space_group(self, rotations, translations,
+                                  crystal_system, constraints):
+        """
+        Returns a boolean indicating whether a space group can be used for
+        the shape of the search and the constraints on the lattice angles.
+
+        For sheets, every operation must map the c lattice vector to plus or
+        minus itself without translating along it (a layer group). For wires,
+        every operation must map the c lattice vector to plus or minus itself
+        without translating along a or b (a rod group). For clusters, no
+        operation may have a translation (a point group).
+
+        Args:
+            rotations: the rotation matrices of the symmetry operations
+
+            translations: the translation vectors of the symmetry operations
+
+            crystal_system: the crystal system of the space group
+
+            constraints: the Constraints of the search
+        """
+
+        # the lattice angles required by the crystal system
+        if crystal_system in ('hexagonal', 'trigonal'):
+            required_angles = [90, 120]
+        elif crystal_system == 'triclinic':
+            required_angles = []
+        else:
+            required_angles = [90]
+        for angle in required_angles:
+            if angle < constraints.min_lattice_angle or \
+                    angle > constraints.max_lattice_angle:
+                return False
+
+        # the symmetry operations allowed by the shape of the search
+        translations = np.abs(translations - np.round(translations))
+        keeps_c_axis = np.all(rotations[:, 2, :2] == 0) and \
+            np.all(rotations[:, :2, 2] == 0)
+        if self.shape in ('sheet', 'interface'):
+            return keeps_c_axis and np.all(translations[:, 2] < 1e-6)
+        elif self.shape == 'wire':
+            return keeps_c_axis and np.all(translations[:, :2] < 1e-6)
+        elif self.shape == 'cluster':
+            return bool(np.all(translations < 1e-6))
+        return True
+
+    def make_symmetric_lattice(self, crystal_system, constraints, random):
+        """
+        Returns a random lattice of the given crystal system that satisfies
+        the constraints on maximum and minimum lengths and angles.
+
+        Uses the standard settings of the space groups in pymatgen: the b
+        lattice vector is the unique axis of monoclinic lattices, and
+        trigonal lattices use the hexagonal setting.
+
+        Args:
+            crystal_system: the crystal system of the lattice
+
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+        """
+
+        a, b, c, alpha, beta, gamma = self.make_random_lattice(
+            constraints, random).parameters
+        if crystal_system == 'monoclinic':
+            alpha = gamma = 90
+        elif crystal_system == 'orthorhombic':
+            alpha = beta = gamma = 90
+        elif crystal_system == 'tetragonal':
+            b = a
+            alpha = beta = gamma = 90
+        elif crystal_system in ('hexagonal', 'trigonal'):
+            b = a
+            alpha = beta = 90
+            gamma = 120
+        elif crystal_system == 'cubic':
+            b = c = a
+            alpha = beta = gamma = 90
+        return Lattice.from_parameters(a, b, c, alpha, beta, gamma)
+
+    def place_orbits(self, species, lattice, rotations, translations,
+                     constraints, random):
+        """
+        Fills a lattice with orbits of the given symmetry operations until it
+        contains the given species.
+
+        Returns a list of the placed species and a numpy array of their
+        fractional coordinates, or None if the lattice couldn't be filled.
+
+        Args:
+            species: a list of the species to place
+
+            lattice: the Lattice to fill
+
+            rotations: the rotation matrices of the symmetry operations
+
+            translations: the translation vectors of the symmetry operations
+
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+        """
+
+        # the number of atoms of each element still to place
+        amounts_to_place = {}
+        for specie in species:
+            if specie not in amounts_to_place:
+                amounts_to_place[specie] = 0
+            amounts_to_place[specie] += 1
+        elements = list(amounts_to_place.keys())
+
+        # every orbit contains a multiple of the number of lattice centering
+        # translations (the operations without a rotation), so quit early if
+        # the amounts can't be split into orbits
+        num_centerings = np.sum(np.all(rotations == np.eye(3), axis=(1, 2)))
+        for element in elements:
+            if amounts_to_place[element] % num_centerings != 0:
+                return None
+
+        mid_indices = constraints.get_mid_indices(
+            [element.symbol for element in elements])
+
+        placed_species = []
+        placed_coords = np.empty((0, 3))
+        placed_mid_indices = np.empty(0, dtype=int)
+        for element, mid_index in zip(elements, mid_indices):
+            mid = constraints.mid_matrix[mid_index]
+            while amounts_to_place[element] > 0:
+                for _ in range(self.max_orbit_attempts):
+                    orbit = self.get_random_orbit(rotations, translations,
+                                                  random)
+                    if orbit is None or \
+                            len(orbit) > amounts_to_place[element]:
+                        continue
+                    if len(orbit) > 1:
+                        distances = lattice.get_all_distances(orbit, orbit)
+                        np.fill_diagonal(distances, np.inf)
+                        if np.min(distances) < mid[mid_index]:
+                            continue
+                    if len(placed_coords) > 0:
+                        distances = lattice.get_all_distances(orbit,
+                                                              placed_coords)
+                        if np.any(distances < mid[placed_mid_indices]):
+                            continue
+                    break
+                else:
+                    return None
+                placed_species.extend([element]*len(orbit))
+                placed_coords = np.concatenate((placed_coords, orbit))
+                placed_mid_indices = np.concatenate(
+                    (placed_mid_indices, [mid_index]*len(orbit)))
+                amounts_to_place[element] -= len(orbit)
+        return placed_species, placed_coords
+
+    def get_random_orbit(self, rotations, translations, random):
+        """
+        Returns the fractional coordinates of the orbit of a random point
+        under the given symmetry operations, as a numpy array with one row
+        per distinct point, or None if the point could not be made.
+
+        With equal probability, the random point is a general position or is
+        moved onto the points fixed by one, two or three random symmetry
+        operations (a special position, which has a smaller orbit).
+
+        Args:
+            rotations: the rotation matrices of the symmetry operations
+
+            translations: the translation vectors of the symmetry operations
+
+            random: a copy of Python's built in PRNG
+        """
+
+        point = np.array([random.random(), random.random(), random.random()])
+        num_fixing_ops = min(random.randint(0, 3), len(rotations) - 1)
+        if num_fixing_ops > 0:
+            # the points fixed by the operations (R, t) solve (R - I)x = -t,
+            # so project the random point onto that solution set
+            op_indices = random.sample(range(1, len(rotations)),
+                                       num_fixing_ops)
+            a_matrix = (rotations[op_indices] - np.eye(3)).reshape(-1, 3)
+            t_vector = translations[op_indices].reshape(-1)
+            point = point - np.dot(np.linalg.pinv(a_matrix),
+                                   np.dot(a_matrix, point) + t_vector)
+            residual = np.dot(a_matrix, point) + t_vector
+            if np.any(np.abs(residual - np.round(residual)) > 1e-6):
+                return None  # the operations have no common fixed point
+
+        # apply all the operations and remove the duplicate points
+        orbit = (np.dot(rotations, point) + translations) % 1.0
+        differences = orbit[:, None, :] - orbit[None, :, :]
+        differences -= np.round(differences)
+        same = np.all(np.abs(differences) < 1e-4, axis=2)
+        is_duplicate = np.any(np.triu(same, 1), axis=0)
+        return orbit[~is_duplicate]
+
     def make_random_lattice(self, constraints, random):
         """
         Returns a random lattice that satisfies the constraints on maximum and
@@ -290,6 +867,62 @@ class RandomOrganismCreator(object):
             return self.get_pd_species_list(composition_space, constraints,
                                             random)
 
+    def get_species_lists(self, num_lists, composition_space, constraints,
+                          random):
+        """
+        Returns a list of num_lists lists, each containing the species in a
+        random candidate.
+
+        Args:
+            num_lists: the number of lists to make
+
+            composition_space: the CompositionSpace of the search
+
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+        """
+
+        rng = self.get_rng(random)
+        if composition_space.objective_function == 'epa' and \
+                len(composition_space.endpoints) == 1:
+            min_num_formulas, max_num_formulas = self.get_num_formulas_range(
+                composition_space, constraints)
+            nums_formulas = rng.integers(min_num_formulas,
+                                         max_num_formulas + 1, num_lists)
+            return [self.get_formula_species_list(composition_space,
+                                                  int(num_formulas))
+                    for num_formulas in nums_formulas]
+        else:
+            return [self.get_table_species_list(
+                *self.choose_table_composition(
+                    constraints, lambda n: int(rng.integers(n))))
+                for _ in range(num_lists)]
+
+    def get_num_formulas_range(self, composition_space, constraints):
+        """
+        Returns the minimum and maximum number of formula units in a random
+        organism of a fixed-composition search, computed from the minimum
+        (constraints.min_num_atoms) and maximum (self.max_num_atoms) number of
+        atoms and the number of atoms per formula unit.
+
+        Args:
+            composition_space: the CompositionSpace of the search
+
+            constraints: the Constraints of the search
+        """
+
+        reduced_formula = composition_space.endpoints[0].reduced_composition
+        num_atoms_in_formula = reduced_formula.num_atoms
+        max_num_formulas = int(math.floor(
+            self.max_num_atoms/num_atoms_in_formula))
+        min_num_formulas = int(math.ceil(
+            constraints.min_num_atoms/num_atoms_in_formula))
+        # round up the next formula unit if necessary
+        if max_num_formulas < min_num_formulas:
+            max_num_formulas += 1
+        return min_num_formulas, max_num_formulas
+
     def get_epa_species_list(self, composition_space, constraints, random):
         """
         Returns a list containing the species in the random organism.
@@ -318,22 +951,29 @@ class RandomOrganismCreator(object):
                 number of formula units.
         """
         # get random number of formula units and resulting number of atoms
-        reduced_formula = composition_space.endpoints[0].reduced_composition
-        num_atoms_in_formula = reduced_formula.num_atoms
-        max_num_formulas = int(math.floor(
-            self.max_num_atoms/num_atoms_in_formula))
-        min_num_formulas = int(math.ceil(
-            constraints.min_num_atoms/num_atoms_in_formula))
-        # round up the next formula unit if necessary
-        if max_num_formulas < min_num_formulas:
-            max_num_formulas += 1
+        min_num_formulas, max_num_formulas = self.get_num_formulas_range(
+            composition_space, constraints)
         random_num_formulas = random.randint(min_num_formulas,
                                              max_num_formulas)
+        return self.get_formula_species_list(composition_space,
+                                             random_num_formulas)
+
+    def get_formula_species_list(self, composition_space, num_formulas):
+        """
+        Returns a list containing the species in num_formulas formula units
+        of the composition of a fixed-composition search.
+
+        Args:
+            composition_space: the CompositionSpace of the search
+
+            num_formulas: the number of formula units
+        """
 
         # add the right number of each specie
+        reduced_formula = composition_space.endpoints[0].reduced_composition
         species = []
         for specie in reduced_formula:
-            for _ in range(random_num_formulas*int(reduced_formula[specie])):
+            for _ in range(num_formulas*int(reduced_formula[specie])):
                 species.append(specie)
         return species
 
@@ -342,7 +982,7 @@ class RandomOrganismCreator(object):
         Returns a list containing the species in the random organism.
 
         Precondition: the composition space contains multiple endpoints
-            (it's a fixed-composition search)
+            (it's a phase diagram search)
 
         Args:
             composition_space: the CompositionSpace of the search
@@ -353,221 +993,218 @@ class RandomOrganismCreator(object):
 
         Description:
 
-            1. Gets a random fraction of each composition space endpoint such
-                that the fractions sum to 1.
-
-            2. Computes the fraction of each specie from the fraction of each
-                endpoint and the amount of each specie within each endpoint.
-
-            3. Approximates the fraction of each specie as a rational number
-                with a maximum possible denominator of self.max_num_atoms.
-
-            4. Takes the product of the denominators of all the species'
-                rational fractions, and then multiplies each specie's rational
-                fraction by this product to obtain the number of atoms of that
-                species.
-
-            5. Checks if the total number of atoms exceeds self.max_num_atoms.
-                If so, reduce the amount of each atom with a multiplicative
-                factor.
-
-            6. Reduces the resulting composition (i.e., find the smallest
-                number of atoms needed to describe the composition).
-
-            7. Optionally increases the number of atoms (w/o changing the
-                composition) such that the min num atoms constraint is
-                satisfied if possible.
-
-            8. Checks that the resulting number of atoms satisfies the maximum
-                (self.max_num_atoms) number of atoms constraint, and optionally
-                checks that the resulting composition is not equivalent to one
-                of the endpoint compositions.
-        """
-
-        # get random fractions for each endpoint that sum to one 1 (i.e., a
-        # random location in the composition space
-        fracs = self.get_random_endpoint_fractions(composition_space, random)
-        composition_space.endpoints.sort()
-        endpoint_fracs = {}
-        for i in range(len(fracs)):
-            endpoint_fracs[composition_space.endpoints[i]] = fracs[i]
-
-        # compute amount of each element from amount of each endpoint
-        all_elements = composition_space.get_all_elements()
-        element_amounts = {}
-        for element in all_elements:
-            element_amounts[element] = 0
-        for formula in endpoint_fracs:
-            for element in formula:
-                element_amounts[element] += endpoint_fracs[
-                    formula]*formula[element]
-
-        # normalize the amounts of the elements
-        amounts_sum = 0
-        for element in element_amounts:
-            amounts_sum += element_amounts[element]
-        for element in element_amounts:
-            element_amounts[element] = element_amounts[element]/amounts_sum
-
-        # approximate the decimal amount of each element as a fraction
-        # (rational number)
-        rational_amounts = {}
-        for element in element_amounts:
-            rational_amounts[element] = Fraction(
-                element_amounts[element]).limit_denominator(
-                    self.max_num_atoms)
-
-        # multiply the denominators together, then multiply each fraction
-        # by this result to get the number of atoms of each element
-        denom_product = 1.0
-        for element in rational_amounts:
-            denom_product *= rational_amounts[element].denominator
-        for element in rational_amounts:
-            element_amounts[element] = round(float(
-                denom_product)*rational_amounts[element])
-
-        # see how many total atoms we have
-        num_atoms = 0
-        for element in element_amounts:
-            num_atoms += element_amounts[element]
-
-        # reduce the number of atoms of each element if needed
-        if num_atoms > self.max_num_atoms:
-            numerator = random.randint(
-                int(round(0.5*(constraints.min_num_atoms +
-                               self.max_num_atoms))), self.max_num_atoms)
-            factor = numerator/num_atoms
-            for element in element_amounts:
-                element_amounts[element] = round(
-                    factor*element_amounts[element])
-
-        # make a Composition object from the amounts of each element
-        random_composition = Composition(element_amounts)
-        random_composition = random_composition.reduced_composition
-
-        # possibly increase the number of atoms by a random (allowed) amount
-        min_multiple = int(
-            math.ceil(constraints.min_num_atoms/random_composition.num_atoms))
-        max_multiple = int(
-            math.floor(self.max_num_atoms/random_composition.num_atoms))
-        if max_multiple > min_multiple:
-            random_multiple = random.randint(min_multiple, max_multiple)
-            bigger_composition = {}
-            for element in random_composition:
-                bigger_composition[element] = \
-                    random_multiple*random_composition[element]
-            random_composition = Composition(bigger_composition)
-
-        # check the max number of atoms constraints (should be ok)
-        if int(random_composition.num_atoms) > self.max_num_atoms:
-            return None
+            1. Picks a random reduced composition from the composition table
+                (see choose_table_composition) and a random allowed number of
+                formula units of it.
 
-        # check the composition - only allow endpoints if specified
-        if not self.allow_endpoints:
-            for endpoint in composition_space.endpoints:
-                if endpoint.almost_equals(
-                        random_composition.reduced_composition):
-                    return None
+            2. Makes the list of species from them.
+        """
+
+        return self.get_table_species_list(*self.choose_table_composition(
+            constraints, random.randrange))
+
+    def choose_table_composition(self, constraints, choose_index):
+        """
+        Returns a random reduced composition from the composition table (the
+        number of atoms of each element, in the order of self.table_elements,
+        in one formula unit) and a random number of formula units of it.
+
+        Args:
+            constraints: the Constraints of the search
+
+            choose_index: a function that takes a positive integer n and
+                returns a random integer between 0 and n - 1
+
+        Description:
+
+            1. Picks a random number of atoms per formula unit, so that every
+                number of atoms per formula unit is equally likely, and makes
+                its group of the composition table if it hasn't been made yet.
+                If the group is empty, never picks that number again and picks
+                another one.
+
+            2. Picks a random reduced composition from that group.
+
+            3. Picks a random number of formula units from the ones that
+                satisfy the minimum (constraints.min_num_atoms) and maximum
+                (self.max_num_atoms) number of atoms constraints.
+        """
+
+        while True:
+            num_atoms = self.table_group_sizes[choose_index(
+                len(self.table_group_sizes))]
+            group = self.get_composition_group(num_atoms)
+            if len(group) > 0:
+                break
+            self.table_group_sizes.remove(num_atoms)
+        reduced_amounts = group[choose_index(len(group))]
+        min_multiple = int(math.ceil(constraints.min_num_atoms/num_atoms))
+        max_multiple = self.max_num_atoms//num_atoms
+        return reduced_amounts, min_multiple + choose_index(
+            max_multiple - min_multiple + 1)
+
+    def get_table_species_list(self, reduced_amounts, multiple):
+        """
+        Returns a list containing the species in multiple formula units of a
+        composition from self.composition_table.
+
+        Args:
+            reduced_amounts: the number of atoms of each element (in the order
+                of self.table_elements) in one formula unit
+
+            multiple: the number of formula units
+        """
 
-        # save the element objects
         species = []
-        for specie in random_composition:
-            for _ in range(int(random_composition[specie])):
-                species.append(specie)
+        for element, amount in zip(self.table_elements, reduced_amounts):
+            species.extend([element]*int(amount*multiple))
         return species
 
-    def get_random_endpoint_fractions(self, composition_space, random):
+    def make_composition_table(self, composition_space, constraints):
         """
-        Uniformly samples the composition space. Returns a list containing the
-        fractions of each endpoint composition (that sum to 1).
+        Prepares the table of the compositions in the composition space that a
+        random organism can have, grouped by the number of atoms per formula
+        unit. The groups themselves are made by get_composition_group the
+        first time they're needed, since there are far too many compositions
+        to list them all in spaces with many elements.
+
+        The compositions are grouped so that small formula units aren't
+        swamped by the many more large ones when sampling.
+
+        Sets self.composition_table, self.table_elements,
+        self.table_endpoint_amounts, self.table_denominator and
+        self.table_group_sizes.
 
         Args:
             composition_space: the CompositionSpace of the search
 
-            random: a copy of Python's built-in PRNG
+            constraints: the Constraints of the search
 
         Description:
 
-            1. Computes vectors that span the normalized composition space
-                (e.g., the triangular facet for a ternary system) by
-                subtracting the first composition fraction unit vector from the
-                others.
-
-            2. Takes a random linear combination of these vectors by
-                multiplying each one by a uniform random number and then taking
-                their sum.
-
-            3. Adds the first composition unit vector to the result from step 2
-                to obtain a vector with random fractions of each endpoint
-                composition.
-
-            4. Checks that the vector from step 3 lies in the portion of the
-                plane that corresponds to normalized amounts. This is done be
-                checking that amount of the first endpoint composition is
-                non-negative. If it's negative, calls itself recursively until
-                a valid solution is found.
-        """
-
-        # compute the vectors corresponding to the needed binary edges of the
-        # phase diagram (w.r.t. to the first endpoint of the composition space)
-        num_endpoints = len(composition_space.endpoints)
-        bindary_edges = []
-        for i in range(1, num_endpoints):
-            edge = [-1]
-            for j in range(1, num_endpoints):
-                if j == i:
-                    edge.append(1)
-                else:
-                    edge.append(0)
-            bindary_edges.append(np.array(edge))
-
-        # take a linear combination of the edge vectors, where the weight of
-        # each vector is drawn from a uniform distribution
-        weighted_average = random.random()*bindary_edges[0]
-        for i in range(1, len(bindary_edges)):
-            weighted_average = np.add(weighted_average,
-                                      random.random()*bindary_edges[i])
-
-        # add the first unit vector to the weighted average of the edge
-        # vectors to obtain the fractions of each endpoint
-        endpoint_fracs = weighted_average.tolist()
-        endpoint_fracs[0] = endpoint_fracs[0] + 1
-
-        # check that the computed fraction of the first endpoint is not less
-        # than zero. If it is, try again.
-        if endpoint_fracs[0] < 0:
-            return self.get_random_endpoint_fractions(composition_space,
-                                                      random)
-        else:
-            return endpoint_fracs
+            1. Gets the number of atoms of each element in each endpoint.
+
+            2. Gets the smallest integer that makes every composition in the
+                composition space with integer amounts a combination of the
+                endpoints with integer coefficients when multiplied by it.
+                The coefficients of such a composition in any linearly
+                independent set of endpoints that spans the composition space
+                are fractions whose denominators divide the greatest common
+                divisor of the minors of that set's matrix of amounts.
 
-    def scale_volume(self, random_cell):
+            3. Lists the numbers of atoms per formula unit with at least one
+                number of formula units that satisfies the minimum
+                (constraints.min_num_atoms) and maximum (self.max_num_atoms)
+                number of atoms constraints.
         """
-        Scales the volume of the random cell according the values in
-        self.vpas.
 
-        Returns a boolean indicating whether volume scaling was completed
-        without errors.
+        self.table_elements = sorted(composition_space.get_all_elements())
+        self.table_endpoint_amounts = np.array([
+            [int(endpoint[element]) for element in self.table_elements] for
+            endpoint in composition_space.endpoints])
+
+        # the lcm of the denominators of each spanning set of endpoints
+        rank = np.linalg.matrix_rank(self.table_endpoint_amounts)
+        self.table_denominator = 1
+        for rows in itertools.combinations(
+                range(len(self.table_endpoint_amounts)), rank):
+            minors = [abs(int(round(np.linalg.det(
+                self.table_endpoint_amounts[np.ix_(rows, columns)])))) for
+                columns in itertools.combinations(
+                    range(len(self.table_elements)), rank)]
+            denominator = int(np.gcd.reduce(minors))
+            if denominator > 0:
+                self.table_denominator = int(np.lcm(self.table_denominator,
+                                                    denominator))
+
+        self.composition_table = {}
+        self.table_group_sizes = [
+            num_atoms for num_atoms in range(1, self.max_num_atoms + 1) if
+            int(math.ceil(constraints.min_num_atoms/num_atoms)) <=
+            self.max_num_atoms//num_atoms]
+
+    def get_composition_group(self, num_atoms):
+        """
+        Returns the group of the composition table with num_atoms atoms per
+        formula unit, as an array with a row for each reduced composition in
+        the composition space with that many atoms per formula unit, holding
+        the number of atoms of each element (in the order of
+        self.table_elements). Makes the group the first time it's needed.
 
         Args:
-            random_cell: the random Cell whose volume to possibly scale
+            num_atoms: the number of atoms per formula unit
+
+        Description:
+
+            1. Lists every combination of the endpoints with non-negative
+                integer coefficients (the numbers of formula units of each
+                endpoint) with self.table_denominator*num_atoms atoms.
+
+            2. Divides the amounts of each element by
+                self.table_denominator, and keeps the combinations whose
+                amounts are still integers and have no common divisor (the
+                reduced compositions).
+
+            3. Optionally removes the compositions equivalent to an endpoint,
+                and removes the duplicates if the endpoints are linearly
+                dependent.
         """
 
-        # compute the volume to scale to
-        composition = random_cell.composition
-        total_volume = 0
-        for specie in composition:
-            total_volume += composition[specie]*self.vpas[specie.symbol]
+        if num_atoms in self.composition_table:
+            return self.composition_table[num_atoms]
+
+        endpoint_sizes = np.sum(self.table_endpoint_amounts, axis=1)
+        total_atoms = self.table_denominator*num_atoms
+
+        # the numbers of formula units of every endpoint but the last that
+        # don't have too many atoms
+        coefficients = np.zeros((1, 0), dtype=int)
+        sizes = np.zeros(1, dtype=int)
+        for endpoint_size in endpoint_sizes[:-1]:
+            new_coefficients = np.arange(total_atoms//endpoint_size + 1)
+            coefficients = np.column_stack((
+                np.repeat(coefficients, len(new_coefficients), axis=0),
+                np.tile(new_coefficients, len(coefficients))))
+            sizes = np.repeat(sizes, len(new_coefficients)) + np.tile(
+                new_coefficients*endpoint_size, len(sizes))
+            coefficients = coefficients[sizes <= total_atoms]
+            sizes = sizes[sizes <= total_atoms]
+
+        # the last endpoint makes up the rest of the atoms
+        remainders = total_atoms - sizes
+        fits = remainders % endpoint_sizes[-1] == 0
+        coefficients = np.column_stack((coefficients[fits],
+                                        remainders[fits]//endpoint_sizes[-1]))
+
+        amounts = np.dot(coefficients, self.table_endpoint_amounts)
+        amounts = amounts[np.all(amounts % self.table_denominator == 0,
+                                 axis=1)]//self.table_denominator
+        amounts = amounts[np.gcd.reduce(amounts, axis=1) == 1]
+        if not self.allow_endpoints:
+            reduced_endpoints = self.table_endpoint_amounts//np.gcd.reduce(
+                self.table_endpoint_amounts, axis=1)[:, None]
+            is_endpoint = np.any(np.all(
+                amounts[:, None, :] == reduced_endpoints[None, :, :],
+                axis=2), axis=1)
+            amounts = amounts[~is_endpoint]
+        # different combinations only give the same composition if the
+        # endpoints are linearly dependent
+        if np.linalg.matrix_rank(self.table_endpoint_amounts) < len(
+                self.table_endpoint_amounts):
+            amounts = np.unique(amounts, axis=0)
+        self.composition_table[num_atoms] = amounts
+        return self.composition_table[num_atoms]
+
+    def get_target_volume(self, species):
+        """
+        Returns the volume of a random structure containing the given species,
+        computed from the values in self.vpas.
 
-        # scale the volume
-        with warnings.catch_warnings():
-            warnings.simplefilter('ignore')
-            random_cell.scale_lattice(total_volume)
-            if str(random_cell.lattice.a) == 'nan' or \
-                    random_cell.lattice.a > 100:
-                return False
-            else:
-                return True
+        Args:
+            species: a list of the species in the random structure
+        """
+
+        return sum(self.vpas[specie.symbol] for specie in species)
 
     def update_status(self):
         '''
@@ -580,31 +1217,175 @@ class RandomOrganismCreator(object):
             self.is_finished = True
 
 
+def _parse_structure(entry):
+    """
+    Parses the structure in the text of a cif or poscar file. Runs in the
+    worker processes of FileOrganismCreator.parse_files.
+
+    Returns a tuple containing the lattice matrix, the list of species, the
+    fractional coordinates and the site properties (e.g., selective dynamics)
+    of the structure, or None if the structure could not be parsed.
+
+    Args:
+        entry: a tuple containing the format of the file ('cif' or 'poscar')
+            and the text of the file
+    """
+
+    fmt, text = entry
+    try:
+        structure = Structure.from_str(text, fmt=fmt)
+        return (structure.lattice.matrix, structure.species,
+                structure.frac_coords, structure.site_properties)
+    except Exception:
+        return None
+
+
 class FileOrganismCreator(object):
     """
     Creates organisms from files (poscar or cif) for the initial population.
+
+    The files can be in a folder or in a single zip or tar archive.
     """
 
-    def __init__(self, path_to_folder):
+    def __init__(self, path_to_folder, num_processes=1):
         """
         Makes a FileOrganismCreator.
 
         Args:
-            path_to_folder: the path to the folder containing the files from
-                which to make organisms
+            path_to_folder: the path to the folder (or zip or tar archive)
+                containing the files from which to make organisms
+
+            num_processes: the number of processes to use to parse the files
 
-        Precondition: the folder exists and contains files
+        Precondition: the folder exists and contains files, or the archive
+            exists
         """
 
         self.name = 'file organism creator'
         self.path_to_folder = path_to_folder
-        self.files = [f for f in os.listdir(self.path_to_folder) if
-                      os.path.isfile(os.path.join(self.path_to_folder, f))]
+        self.num_processes = num_processes
+        self.archive_type = self.get_archive_type(path_to_folder)
+        self.files = self.get_file_names()
         self.number = len(self.files)
+        # the number of files each process parses at a time
+        self.batch_size = 10
+        # the worker processes used to parse the files, made the first time
+        # they're needed and kept until all the files have been used
+        self.process_pool = None
+        # the parsed structures that haven't been used yet, by file name (None
+        # if the structure in the file could not be parsed)
+        self.cells = {}
         self.num_made = 0  # number of attempts (usually number of files given)
         self.is_successes_based = False  # it's based on number attempted
         self.is_finished = False
 
+    @staticmethod
+    def get_archive_type(path):
+        """
+        Returns 'zip' or 'tar' if the path is a zip or tar archive, and None
+        otherwise.
+
+        Args:
+            path: the path to check
+        """
+
+        if not os.path.isfile(path):
+            return None
+        elif zipfile.is_zipfile(path):
+            return 'zip'
+        elif tarfile.is_tarfile(path):
+            return 'tar'
+        return None
+
+    def get_file_names(self):
+        """
+        Returns a list of the names of the files in the folder or archive.
+        """
+
+        if self.archive_type == 'zip':
+            with zipfile.ZipFile(self.path_to_folder) as archive:
+                return [info.filename for info in archive.infolist() if
+                        not info.is_dir()]
+        elif self.archive_type == 'tar':
+            with tarfile.open(self.path_to_folder) as archive:
+                return [member.name for member in archive.getmembers() if
+                        member.isfile()]
+        return [f for f in os.listdir(self.path_to_folder) if
+                os.path.isfile(os.path.join(self.path_to_folder, f))]
+
+    def get_format(self, file_name):
+        """
+        Returns the format of a file ('cif' or 'poscar') from its name, or
+        None if the file has an invalid name.
+
+        Args:
+            file_name: the name of the file
+        """
+
+        base_name = os.path.basename(file_name)
+        if base_name.endswith('.cif'):
+            return 'cif'
+        elif base_name.startswith('POSCAR'):
+            return 'poscar'
+        return None
+
+    def read_files(self, file_names):
+        """
+        Returns a list of the texts of the given files.
+
+        Args:
+            file_names: the names of the files in the folder or archive
+        """
+
+        if self.archive_type == 'zip':
+            with zipfile.ZipFile(self.path_to_folder) as archive:
+                return [archive.read(name).decode() for name in file_names]
+        elif self.archive_type == 'tar':
+            with tarfile.open(self.path_to_folder) as archive:
+                return [archive.extractfile(name).read().decode() for name in
+                        file_names]
+        texts = []
+        for name in file_names:
+            with open(os.path.join(self.path_to_folder, name)) as cell_file:
+                texts.append(cell_file.read())
+        return texts
+
+    def parse_files(self, file_names):
+        """
+        Parses the structures in the given files that haven't been parsed yet
+        (using self.num_processes processes, which get several files per task)
+        and stores them in self.cells.
+
+        Args:
+            file_names: the names of the files in the folder or archive
+        """
+
+        file_names = [name for name in file_names if name not in self.cells
+                      and self.get_format(name) is not None]
+        if len(file_names) == 0:
+            return
+
+        entries = []
+        for name, text in zip(file_names, self.read_files(file_names)):
+            entries.append((self.get_format(name), text))
+        if self.num_processes > 1 and len(entries) > 1:
+            if self.process_pool is None:
+                self.process_pool = multiprocessing.Pool(self.num_processes)
+            chunk_size = min(self.batch_size,
+                             -(-len(entries)//self.num_processes))
+            results = self.process_pool.map(_parse_structure, entries,
+                                            chunk_size)
+        else:
+            results = [_parse_structure(entry) for entry in entries]
+
+        for name, result in zip(file_names, results):
+            if result is None:
+                self.cells[name] = None
+            else:
+                lattice, species, coords, site_properties = result
+                self.cells[name] = Cell(lattice, species, coords,
+                                        site_properties=site_properties)
+
     def create_organism(self, id_generator, composition_space, constraints,
                         random):
         """
@@ -631,50 +1412,51 @@ class FileOrganismCreator(object):
             it is. Maybe there's a better way to deal with this...
         """
 
-        if self.files[self.num_made - 1].endswith('.cif') or self.files[
-                self.num_made - 1].startswith('POSCAR'):
-            try:
-                new_cell = Cell.from_file(
-                    str(self.path_to_folder) + '/' + str(
-                        self.files[self.num_made - 1]))
-                new_org = Organism(new_cell, id_generator, self.name,
-                                   composition_space)
-                print('Making organism {} from file: {} '.format(
-                    new_org.id, self.files[self.num_made - 1]))
-                self.update_status()
-                return new_org
-            except:
-                print('Error reading structure from file: {} '.format(
-                    self.files[self.num_made - 1]))
-                self.update_status()
-                return None
-        else:
+        file_name = self.files[self.num_made - 1]
+        if self.get_format(file_name) is None:
             print('File {} has invalid extension - file must end with .cif or '
-                  'begin with POSCAR '.format(self.files[self.num_made - 1]))
+                  'begin with POSCAR '.format(file_name))
+            self.update_status()
+            return None
+
+        # parse this file and the next few to be used (a batch for each
+        # process) together if it hasn't been parsed
+        if file_name not in self.cells:
+            num_to_parse = min(
+                self.num_made + self.batch_size*self.num_processes,
+                self.number)
+            self.parse_files([self.files[i - 1] for i in range(
+                self.num_made, num_to_parse)])
+        new_cell = self.cells.pop(file_name)
+        if new_cell is None:
+            print('Error reading structure from file: {} '.format(file_name))
             self.update_status()
             return None
 
+        new_org = Organism(new_cell, id_generator, self.name,
+                           composition_space)
+        print('Making organism {} from file: {} '.format(new_org.id,
+                                                         file_name))
+        self.update_status()
+        return new_org
+
     def get_cells(self):
         """
         Creates cells from the files and puts them in a list.
 
-        Returns the list of Cell objects.
+        Returns the list of Cell objects. The parsed structures are kept, so
+        the files don't have to be parsed again when making organisms from
+        them.
 
         Used for checking if all the composition space endpoint are included
         for phase diagram searches.
         """
 
-        file_cells = []
-        for cell_file in self.files:
-            if cell_file.endswith('.cif') or cell_file.startswith(
-                    'POSCAR'):
-                try:
-                    new_cell = Cell.from_file(
-                        str(self.path_to_folder) + "/" + str(cell_file))
-                    file_cells.append(new_cell)
-                except:
-                    pass
-        return file_cells
+        # nothing is left to parse afterwards
+        self.parse_files(self.files)
+        self.close()
+        return [self.cells[f] for f in self.files if
+                self.cells.get(f) is not None]
 
     def update_status(self):
         """
@@ -686,3 +1468,24 @@ class FileOrganismCreator(object):
             self.name, self.number - self.num_made))
         if self.num_made == len(self.files):
             self.is_finished = True
+            self.close()
+
+    def close(self):
+        """
+        Stops the worker processes of parse_files, if they were started.
+        """
+
+        if self.process_pool is not None:
+            self.process_pool.close()
+            self.process_pool.join()
+            self.process_pool = None
+
+    def __getstate__(self):
+        """
+        Returns the state of the FileOrganismCreator for pickling, without
+        the worker processes, which can't be pickled.
+        """
+
+        state = self.__dict__.copy()
+        state['process_pool'] = None
+        return state
@@ -108,6 +108,10 @@ def print_parameters(objects_dict, lat_match_dict=None):
                                       str(creator.max_num_atoms) + '\n')
                 parameters_file.write('        allow_endpoints: ' +
                                       str(creator.allow_endpoints) + '\n')
+                parameters_file.write('        mode: ' +
+                                      str(creator.mode) + '\n')
+                parameters_file.write('        batch_size: ' +
+                                      str(creator.batch_size) + '\n')
                 parameters_file.write('        volumes_per_atom: ' + '\n')
                 for vpa in creator.vpas:
                     parameters_file.write('            ' + str(vpa) + ': ' +
@@ -118,6 +122,8 @@ def print_parameters(objects_dict, lat_match_dict=None):
                                       str(creator.number) + '\n')
                 parameters_file.write('        path_to_folder: ' +
                                       str(creator.path_to_folder) + '\n')
+                parameters_file.write('        num_processes: ' +
+                                      str(creator.num_processes) + '\n')
         parameters_file.write('\n')
 
         # write the pool info
@@ -198,6 +204,11 @@ def print_parameters(objects_dict, lat_match_dict=None):
                                           str(variation.sigma_num_adds) + '\n')
                     parameters_file.write('        scale_volume: ' +
                                           str(variation.scale_volume) + '\n')
+                    parameters_file.write('        insertion_mode: ' +
+                                          str(variation.insertion_mode) +
+                                          '\n')
+                    parameters_file.write('        removal_mode: ' +
+                                          str(variation.removal_mode) + '\n')
 
                 elif variation.name == 'permutation':
                     parameters_file.write('    Permutation: \n')
@@ -218,6 +229,15 @@ def print_parameters(objects_dict, lat_match_dict=None):
         parameters_file.write('    niggli: ' + str(developer.niggli) + '\n')
         parameters_file.write('    scale_density: ' +
                               str(developer.scale_density) + '\n')
+        parameters_file.write('    stage_order: \n')
+        for stage in developer.stage_order:
+            parameters_file.write('        - ' + stage + '\n')
+        parameters_file.write('    stats_interval: ' +
+                              str(developer.stats_interval) + '\n')
+        parameters_file.write('    num_processes: ' +
+                              str(developer.num_processes) + '\n')
+        parameters_file.write('    batch_size: ' +
+                              str(developer.batch_size) + '\n')
         parameters_file.write('\n')
 
         # write the constraints info
@@ -304,6 +324,8 @@ def print_parameters(objects_dict, lat_match_dict=None):
                               str(redundancy_guard.rmsd_tol) + '\n')
         parameters_file.write('    epa_diff: ' +
                               str(redundancy_guard.epa_diff) + '\n')
+        parameters_file.write('    pending_tol: ' +
+                              str(redundancy_guard.pending_tol) + '\n')
         parameters_file.write('\n')
 
         # write the geometry info
@@ -14,13 +14,13 @@ This module contains classes used to hold the population of organisms.
 
 2. Pool: represents the population of organisms, after the initial population
 
-"""
+3. LowerHull: the lower convex hull of the organisms in a phase diagram
+        search, updated incrementally and shared by everything that needs
+        distances above the hull, the hull area/volume or decompositions
 
-from pymatgen.analysis.phase_diagram import PDEntry
-from pymatgen.analysis.phase_diagram import CompoundPhaseDiagram
+"""
 
 import os
-import copy
 import math
 import numpy as np
 from collections import deque
@@ -43,6 +43,9 @@ class InitialPopulation():
 
         self.run_dir_name = run_dir_name
         self.initial_population = []
+        # the lower convex hull of the initial population (for phase diagram
+        # searches), made once there are organisms at all the endpoints
+        self.hull = None
 
     def add_organism(self, organism_to_add, composition_space):
         """
@@ -61,6 +64,8 @@ class InitialPopulation():
             organism_to_add.id))
         self.initial_population.append(organism_to_add)
         organism_to_add.is_active = True
+        if self.hull is not None:
+            self.hull.add_organism(organism_to_add)
 
     def replace_organism(self, old_org, new_org, composition_space):
         """
@@ -89,6 +94,9 @@ class InitialPopulation():
                 org.is_active = False
         self.initial_population.append(new_org)
         new_org.is_active = True
+        if self.hull is not None:
+            self.hull.add_organism(new_org)
+            self.hull.remove_organism(old_org)
 
     def get_progress(self, composition_space):
         """
@@ -110,9 +118,7 @@ class InitialPopulation():
         Returns the epa of the best organism in the initial population.
         """
 
-        sorted_list = copy.deepcopy(self.initial_population)
-        sorted_list.sort(key=lambda x: x.epa, reverse=False)
-        return sorted_list[0].epa
+        return min(org.epa for org in self.initial_population)
 
     def get_convex_hull_area(self, composition_space):
         """
@@ -122,36 +128,17 @@ class InitialPopulation():
             composition_space: the CompositionSpace of the search
         """
 
-        # check if the initial population contains organisms at all the
-        # endpoints of the composition space
-        if self.has_endpoints(composition_space) and \
+        # make the hull once the initial population contains organisms at all
+        # the endpoints of the composition space
+        if self.hull is None and self.has_endpoints(composition_space) and \
                 self.has_non_endpoint(composition_space):
-
-            # compute and print the area or volume of the convex hull
-            pdentries = []
+            self.hull = LowerHull(composition_space)
             for organism in self.initial_population:
-                pdentries.append(PDEntry(organism.composition,
-                                         organism.total_energy))
-            compound_pd = CompoundPhaseDiagram(pdentries,
-                                               composition_space.endpoints)
-
-            # get the data for the convex hull
-            qhull_data = compound_pd.qhull_data
-            # for some reason, the last point is positive, so remove it
-            hull_data = np.delete(qhull_data, -1, 0)
-
-            # make a ConvexHull object from the hull data
-            # Sometime this fails, saying that only two points were given to
-            # construct the convex hull, even though the if statement above
-            # checks that there are enough points.
-            try:
-                convex_hull = ConvexHull(hull_data)
-            except:
-                return None
-            if len(composition_space.endpoints) == 2:
-                return convex_hull.area
-            else:
-                return convex_hull.volume
+                self.hull.add_organism(organism)
+            self.hull.build()
+
+        if self.hull is not None:
+            return self.hull.get_area()
 
     def has_endpoints(self, composition_space):
         """
@@ -266,11 +253,28 @@ class Pool(object):
         # objects_maker.make_objects()
         self.selection = []
         self.comp_fitness_weight = []
+        # the organisms in the order of their selection intervals, and the
+        # ends of the intervals, as a numpy array
+        self.selection_organisms = []
+        self.selection_ends = None
+        # maps the ids of reference organisms to the organisms in the order of
+        # their relative selection intervals and the ends of the intervals
+        self.relative_selections = {}
+        # the organisms in the pool, and their fitnesses, composition vectors
+        # and endpoint indices (-1 if not at an endpoint) as numpy arrays, used
+        # to compute relative fitnesses
+        self.pool_organisms = []
+        self.fitnesses = None
+        self.composition_vectors = None
+        self.endpoint_indices = None
         # the number of organisms added to the pool (excluding the initial
         # population)
         self.num_adds = 0
         # the name (not  path) of the garun directory
         self.run_dir_name = run_dir_name
+        # the lower convex hull of the pool (for phase diagram searches), made
+        # when the initial population is added
+        self.hull = None
 
     def add_initial_population(self, initial_population, composition_space):
         """
@@ -288,6 +292,7 @@ class Pool(object):
 
         print('Populating the pool with the initial population...')
         organisms_list = initial_population.initial_population
+        self.relative_selections = {}
 
         # check that the initial population contains at least three organisms
         if len(organisms_list) < 3:
@@ -311,7 +316,18 @@ class Pool(object):
 
         elif composition_space.objective_function == 'pd':
             try:
-                self.compute_pd_values(organisms_list, composition_space)
+                # if the initial population has a hull, make a copy of it
+                # (which the pool can update without changing the hull of the
+                # initial population) from its vertices, since no other
+                # organism can be a vertex
+                if initial_population.hull is None:
+                    self.compute_pd_values(organisms_list, composition_space)
+                else:
+                    self.hull = LowerHull(composition_space)
+                    for organism in organisms_list:
+                        self.hull.add_organism(organism)
+                    self.hull.build(list(initial_population.hull.vertex_ids))
+                    self.hull.set_values(organisms_list)
             except:
                 print('Error: could not construct the phase diagram because '
                       'there is not a structure at one or more of the '
@@ -367,6 +383,7 @@ class Pool(object):
         print('Adding organism {} to the pool '.format(organism_to_add.id))
 
         self.num_adds = self.num_adds + 1
+        self.relative_selections = {}
         organism_to_add.cell.sort()
         organism_to_add.cell.to('poscar', os.getcwd() + '/POSCAR.' +
                                 str(organism_to_add.id))
@@ -383,11 +400,16 @@ class Pool(object):
                 self.queue.appendleft(organism_to_add)
 
         elif composition_space.objective_function == 'pd':
-            organisms_list = self.to_list()
-            organisms_list.append(organism_to_add)
-            self.compute_pd_values(organisms_list, composition_space)
-            self.check_promotion_set_pd()
-            if organism_to_add.value == 0.0:
+            # only recompute the values of the whole pool if the new organism
+            # changed the convex hull
+            if self.hull.add_organism(organism_to_add):
+                organisms_list = self.to_list()
+                organisms_list.append(organism_to_add)
+                self.hull.set_values(organisms_list)
+                self.check_promotion_set_pd()
+            else:
+                self.hull.set_values([organism_to_add])
+            if organism_to_add.value < 0.000000001:
                 self.promotion_set.append(organism_to_add)
             else:
                 self.queue.appendleft(organism_to_add)
@@ -440,6 +462,23 @@ class Pool(object):
             self.queue.remove(organism_to_promote)
             self.promotion_set.append(organism_to_promote)
 
+    def remove_organism(self, composition_space):
+        """
+        Removes the organism at the front (right end) of the queue from the
+        pool, and returns it.
+
+        Args:
+            composition_space: the CompositionSpace of the search
+        """
+
+        removed_org = self.queue.pop()
+        removed_org.is_active = False
+        self.relative_selections = {}
+        if composition_space.objective_function == 'pd':
+            self.hull.remove_organism(removed_org)
+        print('Removing organism {} from the pool '.format(removed_org.id))
+        return removed_org
+
     def replace_organism(self, old_org, new_org, composition_space):
         """
         Replaces an organism in the pool with a new organism. The new organism
@@ -460,14 +499,17 @@ class Pool(object):
 
         new_org.cell.sort()
         new_org.cell.to('poscar', os.getcwd() + '/POSCAR.' + str(new_org.id))
+        self.relative_selections = {}
 
         # set new objective function value
         if composition_space.objective_function == 'epa':
             new_org.value = new_org.epa
         elif composition_space.objective_function == 'pd':
-            organisms_list = self.to_list()
-            organisms_list.append(new_org)
-            self.compute_pd_values(organisms_list, composition_space)
+            # add the new organism first, in case the old one is the only one
+            # at an endpoint
+            hull_changed = self.hull.add_organism(new_org)
+            hull_changed = self.hull.remove_organism(old_org) or \
+                hull_changed
 
         # add new organism and remove old one
         if old_org in self.promotion_set:
@@ -481,8 +523,13 @@ class Pool(object):
         old_org.is_active = False
         new_org.is_active = True
 
-        # for pd searches, check promotion set and queue memberships
+        # for pd searches, update the values and check promotion set and
+        # queue memberships
         if composition_space.objective_function == 'pd':
+            if hull_changed:
+                self.hull.set_values(self.to_list())
+            else:
+                self.hull.set_values([new_org])
             self.check_promotion_set_pd()
 
     def compute_pd_values(self, organisms_list, composition_space):
@@ -490,8 +537,8 @@ class Pool(object):
         Constructs a convex hull from the provided organisms and sets the
         organisms' values to their distances from the convex hull.
 
-        Returns the CompoundPhaseDiagram object computed from the organisms
-        in organisms_list.
+        Returns the LowerHull built from the organisms in organisms_list, which
+        is kept by the pool and updated as organisms are added and replaced.
 
         Args:
             organisms_list: a list of Organisms whose values we need to compute
@@ -499,46 +546,20 @@ class Pool(object):
             composition_space: the CompositionSpace of the search
         """
 
-        # create a PDEntry object for each organism in the list of organisms
-        pdentries = {}
-        for organism in organisms_list:
-            pdentries[organism.id] = PDEntry(organism.composition,
-                                             organism.total_energy)
-
-        # put the pdentries in a list
-        pdentries_list = []
-        for organism_id in pdentries:
-            pdentries_list.append(pdentries[organism_id])
-
-        # create a compound phase diagram object from the list of pdentries
-        compound_pd = CompoundPhaseDiagram(pdentries_list,
-                                           composition_space.endpoints)
-
-        # transform the pdentries and put them in a dictionary, with the
-        # organism id's as the keys
-        transformed_pdentries = {}
-        for org_id in pdentries:
-            transformed_pdentries[org_id] = compound_pd.transform_entries(
-                    [pdentries[org_id]], composition_space.endpoints)[0][0]
-
-        # put the values in a dictionary, with the organism id's as the keys
-        values = {}
-        for org_id in pdentries:
-            values[org_id] = compound_pd.get_e_above_hull(
-                transformed_pdentries[org_id])
-
-        # assign values to the organisms
+        self.hull = LowerHull(composition_space)
         for organism in organisms_list:
-            organism.value = values[organism.id]
-
-        return compound_pd
+            self.hull.add_organism(organism)
+        self.hull.build()
+        self.hull.set_values(organisms_list)
+        return self.hull
 
     def compute_fitnesses(self):
         """
         Calculates and assigns fitnesses to all organisms in the pool. If
         selection.num_parents is less than pool.size, then the fitnesses are
         computed relative to the selection.num_parents + 1 best organisms in
-        the pool.
+        the pool. Also stores the fitnesses, composition vectors and endpoint
+        indices of the organisms in arrays.
 
         Precondition: the organisms in the pool all have up-to-date values
         """
@@ -568,6 +589,26 @@ class Pool(object):
             if organism not in best_organisms:
                 organism.fitness = 0.0
 
+        self.update_fitness_arrays()
+
+    def update_fitness_arrays(self):
+        """
+        Stores the organisms in the pool, and their fitnesses, composition
+        vectors and endpoint indices in arrays, which are used to compute
+        relative fitnesses.
+
+        Precondition: the organisms in the pool all have fitnesses
+        """
+
+        self.pool_organisms = self.to_list()
+        self.fitnesses = np.array(
+            [org.fitness for org in self.pool_organisms])
+        self.composition_vectors = np.array(
+            [org.composition_vector for org in self.pool_organisms])
+        self.endpoint_indices = np.array(
+            [-1 if org.endpoint_index is None else org.endpoint_index for
+             org in self.pool_organisms])
+
     def compute_relative_fitnesses(self, ref_organism, composition_space):
         """
         Calculates and assigns relative fitnesses to all the organisms in the
@@ -586,6 +627,9 @@ class Pool(object):
         composition fitness of the organism is set to zero. The relative
         fitness of ref_organism is always set to zero.
 
+        Precondition: the organisms in the pool all have up-to-date fitnesses
+            (set by calling compute_fitnesses)
+
         Args:
             ref_organism: relative fitnesses are computed w.r.t. this Organism
 
@@ -612,25 +656,31 @@ class Pool(object):
             comp_fit_weight = self.comp_fitness_weight.max_weight*math.pow(
                 normalized_dist_from_center, self.comp_fitness_weight.power)
 
+            # the arrays are normally made by compute_fitnesses, but make them
+            # here if they're missing or were made for other organisms
+            if self.fitnesses is None or len(self.pool_organisms) != len(
+                    pool_list) or any(
+                    pool_organism is not organism for pool_organism, organism
+                    in zip(self.pool_organisms, pool_list)):
+                self.update_fitness_arrays()
+
             # compute the relative fitnesses from the weighted average of the
-            # regular and composition fitnesses
-            for organism in pool_list:
-                if organism.fitness > 0.0:
-                    comp_fitness = 1 - self.get_composition_distance(
-                        organism.composition_vector,
-                        ref_organism.composition_vector)
-                    # in case both the organisms are at the same endpoint
-                    if ref_organism.is_at_endpoint(composition_space) and \
-                            ref_organism.composition.reduced_composition.almost_equals(
-                                organism.composition.reduced_composition):
-                        organism.relative_fitness = (1 - comp_fit_weight
-                                                     )*organism.fitness
-                    else:
-                        organism.relative_fitness = \
-                            comp_fit_weight*comp_fitness + (
-                                1 - comp_fit_weight)*organism.fitness
-                else:
-                    organism.relative_fitness = 0.0
+            # regular and composition fitnesses, for all the organisms at once
+            comp_fitnesses = 1 - 0.5*np.sum(np.abs(
+                self.composition_vectors - ref_organism.composition_vector),
+                axis=1)
+            relative_fitnesses = comp_fit_weight*comp_fitnesses + (
+                1 - comp_fit_weight)*self.fitnesses
+            # in case both the organisms are at the same endpoint
+            if ref_organism.endpoint_index is not None:
+                same_endpoint = \
+                    self.endpoint_indices == ref_organism.endpoint_index
+                relative_fitnesses[same_endpoint] = (
+                    1 - comp_fit_weight)*self.fitnesses[same_endpoint]
+            relative_fitnesses[self.fitnesses <= 0.0] = 0.0
+            for organism, relative_fitness in zip(self.pool_organisms,
+                                                  relative_fitnesses):
+                organism.relative_fitness = float(relative_fitness)
             # set the relative fitness of the reference organism to 0
             ref_organism.relative_fitness = 0.0
 
@@ -669,7 +719,9 @@ class Pool(object):
     def compute_selection_probs(self):
         """
         Calculates and assigns selection probabilities to all the organisms in
-        the pool.
+        the pool, and stores the ends of their selection intervals for
+        select_organism. Clears the cached relative selection probabilities,
+        since they depend on the fitnesses.
 
         Precondition: the organisms in the pool all have up-to-date fitnesses
         """
@@ -693,11 +745,19 @@ class Pool(object):
             organism.selection_loc = selection_loc
             selection_loc = selection_loc + organism.selection_prob
 
+        self.selection_organisms = organisms
+        self.selection_ends = np.array(
+            [org.selection_loc + org.selection_prob for org in organisms])
+        self.relative_selections = {}
+
     def compute_relative_selection_probs(self):
         """
         Calculates and assigns relative selection probabilities to all the
         organisms in the pool.
 
+        Returns the organisms in the order of their relative selection
+        intervals, and the ends of the intervals, as a numpy array.
+
         Precondition: the organisms in the pool all have up-to-date relative
             fitnesses
         """
@@ -724,6 +784,10 @@ class Pool(object):
             relative_selection_loc = relative_selection_loc + \
                 organism.relative_selection_prob
 
+        return organisms, np.array(
+            [org.relative_selection_loc + org.relative_selection_prob for
+             org in organisms])
+
     def select_organism(self, random, composition_space, excluded_org=None):
         """
         Randomly selects an organism from the pool based on selection
@@ -738,37 +802,42 @@ class Pool(object):
             excluded_org: an Organism to exclude from being selected
         """
 
-        pool_list = self.to_list()
-
         # if not excluding an organism, then select based on standard selection
         # probabilities
         if excluded_org is None:
-            found = False
-            while not found:
-                rand = random.random()
-                for i, organism in enumerate(pool_list):
-                    if rand >= organism.selection_loc and rand < (
-                            organism.selection_loc + organism.selection_prob):
-                        found = True
-                        ind = i
-                        break
-            return pool_list[ind]
-        # if excluding an organism, first compute relative selection
-        # probabilities, then select based on those
+            return self.draw_organism(self.selection_organisms,
+                                      self.selection_ends, random)
+        # if excluding an organism, select based on relative selection
+        # probabilities, which are only computed once for each excluded
+        # organism until the pool or the fitnesses change
         else:
-            self.compute_relative_fitnesses(excluded_org, composition_space)
-            self.compute_relative_selection_probs()
-            found = False
-            while not found:
-                rand = random.random()
-                for i, organism in enumerate(pool_list):
-                    if rand >= organism.relative_selection_loc and rand < (
-                            organism.relative_selection_loc +
-                            organism.relative_selection_prob):
-                        found = True
-                        ind = i
-                        break
-            return pool_list[ind]
+            if excluded_org.id not in self.relative_selections:
+                self.compute_relative_fitnesses(excluded_org,
+                                                composition_space)
+                self.relative_selections[excluded_org.id] = \
+                    self.compute_relative_selection_probs()
+            organisms, ends = self.relative_selections[excluded_org.id]
+            return self.draw_organism(organisms, ends, random)
+
+    def draw_organism(self, organisms, ends, random):
+        """
+        Returns the organism whose selection interval contains a random
+        number, found by binary search.
+
+        Args:
+            organisms: the list of Organisms, in the order of their intervals
+
+            ends: the ends of the intervals, as a sorted numpy array
+
+            random: a copy of Python's built in PRNG
+        """
+
+        # draw again in the unlikely case that rounding made the intervals
+        # end before the random number
+        ind = len(organisms)
+        while ind == len(organisms):
+            ind = np.searchsorted(ends, random.random(), side='right')
+        return organisms[ind]
 
     def print_summary(self, composition_space):
         """
@@ -813,35 +882,21 @@ class Pool(object):
 
     def get_convex_hull_area(self, composition_space):
         """
-        Prints out the area or volume of the convex hull defined by the
-        organisms in the promotion set.
+        Returns the area or volume of the convex hull defined by the
+        organisms in the promotion set, or None if it is degenerate.
 
         composition_space: the CompositionSpace of the search
         """
 
-        # make a phase diagram of just the organisms in the promotion set
-        # (on the lower convex hull)
-        pdentries = []
-        for organism in self.promotion_set:
-            pdentries.append(PDEntry(organism.composition,
-                                     organism.total_energy))
-        compound_pd = CompoundPhaseDiagram(pdentries,
-                                           composition_space.endpoints)
-
-        # get the data for the convex hull
-        qhull_data = compound_pd.qhull_data
-        # for some reason, the last point is positive, so remove it
-        hull_data = np.delete(qhull_data, -1, 0)
-
-        # make a ConvexHull object from the hull data
-        try:
-            convex_hull = ConvexHull(hull_data)
-        except:
-            return None
-        if len(composition_space.endpoints) == 2:
-            return convex_hull.area
-        else:
-            return convex_hull.volume
+        return self.hull.get_area()
+
+    def get_hull(self):
+        """
+        Returns the LowerHull of the organisms in the pool, whose vertices are
+        the organisms in the promotion set.
+        """
+
+        return self.hull
 
     def to_list(self):
         """
@@ -849,3 +904,295 @@ class Pool(object):
         """
 
         return self.promotion_set + list(self.queue)
+
+
+class LowerHull(object):
+    """
+    The lower convex hull of the energies of a set of organisms in a phase
+    diagram search, which can be updated one organism at a time.
+
+    Uses the same coordinates as CompoundPhaseDiagram: each organism is a
+    point whose coordinates are the fractions of its atoms that belong to each
+    endpoint of the composition space and its energy per atom. The hull is
+    stored as the planes of its lower facets, so the hull energy at a
+    composition is the largest of the plane energies there.
+
+    The version of the hull is incremented whenever its set of vertices
+    changes. Decompositions, volumes per atom and the area/volume of the hull
+    are cached until then.
+    """
+
+    def __init__(self, composition_space):
+        """
+        Makes an empty LowerHull.
+
+        Args:
+            composition_space: the CompositionSpace of the search
+        """
+
+        # the number of atoms in each (reduced) endpoint
+        self.endpoint_sizes = np.array(
+            [endpoint.num_atoms for endpoint in composition_space.endpoints])
+        # maps the ids of the organisms to the organisms and their points
+        self.organisms = {}
+        self.points = {}
+        # the ids of the organisms at the vertices of the lower hull
+        self.vertex_ids = set()
+        # the lower facets, as planes giving energy = slopes.x + intercepts,
+        # and the ids of the organisms at their vertices
+        self.slopes = None
+        self.intercepts = None
+        self.facet_ids = None
+        # incremented whenever the vertices of the hull change
+        self.version = 0
+
+        # the cached results, and the version of the hull they are for
+        self.cache_version = 0
+        # maps reduced formulas to decompositions
+        self.decompositions = {}
+        # maps reduced formulas to average volumes per atom
+        self.vpas = {}
+        # the area/volume of the hull (None if it hasn't been computed)
+        self.area = None
+
+    def get_point(self, organism):
+        """
+        Returns the point of an organism, as a numpy array containing the
+        atomic fractions of all but the first endpoint followed by the energy
+        per atom.
+
+        Args:
+            organism: the relaxed Organism
+        """
+
+        return np.append(
+            self.get_coordinates(organism.composition_vector), organism.epa)
+
+    def get_coordinates(self, endpoint_fractions):
+        """
+        Returns the atomic fractions of all but the first endpoint, as a numpy
+        array.
+
+        Args:
+            endpoint_fractions: the fractions of the endpoints, counted in
+                formula units, as returned by
+                CompositionSpace.get_endpoint_fractions
+        """
+
+        # convert from formula units of the endpoints to atoms
+        fractions = endpoint_fractions*self.endpoint_sizes
+        return fractions[1:]/np.sum(fractions)
+
+    def add_organism(self, organism):
+        """
+        Adds an organism to the hull.
+
+        Returns a boolean indicating whether the lower hull changed. If the
+        new organism lies on or above the hull, nothing needs to be done.
+        Otherwise, the hull is rebuilt from the old hull vertices and the new
+        organism, since no other organism can be a vertex of the new hull.
+
+        Args:
+            organism: the relaxed Organism to add
+        """
+
+        point = self.get_point(organism)
+        self.organisms[organism.id] = organism
+        self.points[organism.id] = point
+        if self.slopes is None:
+            return False
+        if self.get_e_above_hull(point[np.newaxis])[0] > -0.000000001:
+            return False
+        self.build(list(self.vertex_ids) + [organism.id])
+        return True
+
+    def remove_organism(self, organism):
+        """
+        Removes an organism from the hull.
+
+        Returns a boolean indicating whether the lower hull changed, which
+        only happens if the organism was a vertex of the hull. In that case
+        the hull is rebuilt from all the remaining organisms.
+
+        Args:
+            organism: the Organism to remove
+        """
+
+        del self.organisms[organism.id]
+        del self.points[organism.id]
+        if organism.id not in self.vertex_ids:
+            return False
+        self.build()
+        return True
+
+    def build(self, organism_ids=None):
+        """
+        Builds the lower hull from the points of the given organisms.
+
+        Raises a ValueError if the organisms don't include all the endpoints
+        of the composition space.
+
+        Args:
+            organism_ids: the ids of the organisms whose points to use. If
+                None, all the points are used.
+        """
+
+        if organism_ids is None:
+            organism_ids = list(self.points)
+        points = np.array([self.points[org_id] for org_id in organism_ids])
+
+        # the hull is only defined if there are points at all the endpoints
+        num_endpoints = len(self.endpoint_sizes)
+        corners = np.vstack((np.zeros(num_endpoints - 1),
+                             np.identity(num_endpoints - 1)))
+        for corner in corners:
+            if not np.any(np.all(np.abs(points[:, :-1] - corner) < 1e-6,
+                                 axis=1)):
+                raise ValueError('No organism at one of the endpoints of '
+                                 'the composition space.')
+
+        # add a point above the center of the composition space so the hull
+        # is full-dimensional even if all the points lie on the same plane
+        top = np.append(np.mean(corners, axis=0),
+                        np.max(points[:, -1]) + 1.0)
+        convex_hull = ConvexHull(np.vstack((points, top)))
+
+        # keep the facets whose outward normals point down in energy
+        lower = convex_hull.equations[:, -2] < -1e-9
+        normals = convex_hull.equations[lower]
+        self.slopes = -normals[:, :-2]/normals[:, -2:-1]
+        self.intercepts = -normals[:, -1]/normals[:, -2]
+        self.facet_ids = [[organism_ids[i] for i in simplex] for simplex in
+                          convex_hull.simplices[lower]]
+        vertex_ids = set(org_id for facet_ids in self.facet_ids for org_id in
+                         facet_ids)
+        if vertex_ids != self.vertex_ids:
+            self.vertex_ids = vertex_ids
+            self.version = self.version + 1
+
+    def get_e_above_hull(self, points):
+        """
+        Returns the energies above the hull of some points, as a numpy array.
+
+        Args:
+            points: the points, as a 2D numpy array with one point per row
+        """
+
+        hull_energies = np.max(
+            np.dot(points[:, :-1], self.slopes.T) + self.intercepts, axis=1)
+        return points[:, -1] - hull_energies
+
+    def set_values(self, organisms):
+        """
+        Sets the values of the given organisms to their energies above the
+        hull, in one vectorized pass.
+
+        Precondition: all the organisms have been added to the hull
+
+        Args:
+            organisms: the list of Organisms whose values to set
+        """
+
+        points = np.array([self.points[org.id] for org in organisms])
+        values = np.maximum(self.get_e_above_hull(points), 0.0)
+        for organism, value in zip(organisms, values):
+            if organism.id in self.vertex_ids:
+                organism.value = 0.0
+            else:
+                organism.value = float(value)
+
+    def check_cache(self):
+        """
+        Clears the cached results if the hull has changed since they were
+        computed.
+        """
+
+        if self.cache_version != self.version:
+            self.cache_version = self.version
+            self.decompositions = {}
+            self.vpas = {}
+            self.area = None
+
+    def get_decomposition(self, composition, composition_space):
+        """
+        Returns the decomposition of a composition into the organisms on the
+        hull, as a list of (organism, fraction) tuples, where the fractions are
+        counted in atoms, or None if the composition is outside the
+        composition space.
+
+        Args:
+            composition: the pymatgen.core.composition.Composition to
+                decompose
+
+            composition_space: the CompositionSpace of the search
+        """
+
+        self.check_cache()
+        key = composition.reduced_formula
+        if key not in self.decompositions:
+            endpoint_fractions = composition_space.get_endpoint_fractions(
+                composition)
+            if endpoint_fractions is None:
+                self.decompositions[key] = None
+            else:
+                # the composition lies in the facet whose plane is highest
+                # there, so decompose it into that facet's vertices
+                coordinates = self.get_coordinates(endpoint_fractions)
+                facet = np.argmax(
+                    np.dot(self.slopes, coordinates) + self.intercepts)
+                facet_ids = self.facet_ids[facet]
+                vertices = np.array(
+                    [self.points[org_id][:-1] for org_id in facet_ids])
+                fractions = np.linalg.lstsq(
+                    np.vstack((vertices.T, np.ones(len(facet_ids)))),
+                    np.append(coordinates, 1.0), rcond=None)[0]
+                self.decompositions[key] = [
+                    (self.organisms[org_id], fraction) for org_id, fraction in
+                    zip(facet_ids, fractions) if fraction > 1e-9]
+        return self.decompositions[key]
+
+    def get_vpa(self, composition, composition_space):
+        """
+        Returns the weighted average volume per atom of the organisms in the
+        decomposition of a composition, or None if the composition is outside
+        the composition space.
+
+        Args:
+            composition: the pymatgen.core.composition.Composition
+
+            composition_space: the CompositionSpace of the search
+        """
+
+        self.check_cache()
+        key = composition.reduced_formula
+        if key not in self.vpas:
+            decomposition = self.get_decomposition(composition,
+                                                   composition_space)
+            if decomposition is None:
+                self.vpas[key] = None
+            else:
+                self.vpas[key] = sum(
+                    fraction*org.cell.volume/org.cell.num_sites for
+                    org, fraction in decomposition)
+        return self.vpas[key]
+
+    def get_area(self):
+        """
+        Returns the area (for binary searches) or volume of the convex hull of
+        the vertices of the lower hull, or None if it is degenerate (e.g.,
+        when there are no organisms below the endpoints).
+        """
+
+        self.check_cache()
+        if self.area is None:
+            points = np.array(
+                [self.points[org_id] for org_id in self.vertex_ids])
+            try:
+                convex_hull = ConvexHull(points)
+            except:
+                return None
+            if len(self.endpoint_sizes) == 2:
+                self.area = convex_hull.area
+            else:
+                self.area = convex_hull.volume
+        return self.area
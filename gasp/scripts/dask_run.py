@@ -20,7 +20,6 @@ from gasp import parameters_printer
 from gasp import interface
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
-import copy
 import threading
 import random
 import sys
@@ -149,28 +148,55 @@ def main():
     for creator in organism_creators:
         print('Making {} organisms with {}'.format(creator.number,
                                                    creator.name))
+        # organisms that were developed in a batch but not used yet
+        developed_organisms = []
         while not creator.is_finished and not stopping_criteria.are_satisfied:
             working_jobs = len([i for i, f in enumerate(futures) \
                                                 if not f.done()])
             if working_jobs < num_calcs_at_once:
-                # make a new organism - keep trying until we get one
-                new_organism = creator.create_organism(
-                    id_generator, composition_space, constraints, random)
-                while new_organism is None and not creator.is_finished:
+                if creator.is_successes_based and \
+                        developer.num_processes > 1:
+                    # make a batch of new organisms and develop them in
+                    # parallel, then take the survivors one at a time
+                    if len(developed_organisms) == 0:
+                        new_organisms = []
+                        for _ in range(developer.batch_size):
+                            new_organism = creator.create_organism(
+                                id_generator, composition_space, constraints,
+                                random)
+                            if new_organism is not None:
+                                geometry.unpad(new_organism.cell,
+                                               new_organism.n_sub, constraints)
+                                new_organisms.append(new_organism)
+                        developed_organisms = developer.develop_many(
+                            new_organisms, composition_space, constraints,
+                            geometry, pool)
+                    new_organism = None
+                    is_developed = len(developed_organisms) > 0
+                    if is_developed:
+                        new_organism = developed_organisms.pop(0)
+                else:
+                    # make a new organism - keep trying until we get one
                     new_organism = creator.create_organism(
                         id_generator, composition_space, constraints, random)
-                if new_organism is not None:  # loop above could return None
-                    geometry.unpad(new_organism.cell, new_organism.n_sub,
-                                                                constraints)
-
-                    if developer.develop(new_organism, composition_space,
-                                         constraints, geometry, pool):
+                    while new_organism is None and not creator.is_finished:
+                        new_organism = creator.create_organism(
+                            id_generator, composition_space, constraints, random)
+                    is_developed = False
+                    if new_organism is not None:  # loop above could return None
+                        geometry.unpad(new_organism.cell, new_organism.n_sub,
+                                       constraints)
+                        is_developed = developer.develop(
+                            new_organism, composition_space, constraints,
+                            geometry, pool)
+                if new_organism is not None:
+                    if is_developed:
                         redundant_organism = redundancy_guard.check_redundancy(
                             new_organism, whole_pop, geometry)
                         if redundant_organism is None:  # no redundancy
                             # add a copy to whole_pop so the organisms in
                             # whole_pop don't change upon relaxation
-                            whole_pop.append(copy.deepcopy(new_organism))
+                            whole_pop.append(new_organism.snapshot())
                             # pad with vacuum
                             geometry.pad(new_organism.cell)
                             if substrate_search:
@@ -197,9 +223,15 @@ def main():
                                     new_organism, composition_space,
                                     **substrate_params)
                             futures.append(out)
+                            # whole_pop[-1] is the unpadded copy
+                            redundancy_guard.register_pending(
+                                whole_pop[-1], out.key)
 
             # process finished calculations and start new ones
             else:
+                for future in futures:
+                    if future.done():
+                        redundancy_guard.release_pending(future.key)
                 futures, relaxed_futures = update_futures(futures)
                 for future in relaxed_futures:
                     if not future.exception():
@@ -257,6 +289,9 @@ def main():
                                         creator.update_status()
 
 
+    # the worker processes of the developer are only used by the creators
+    developer.close()
+
     # depending on how the loop above exited, update bookkeeping
     if not stopping_criteria.are_satisfied:
         num_finished_calcs = num_finished_calcs - 1
@@ -276,7 +311,7 @@ def main():
             unrelaxed_offspring = offspring_generator.make_offspring_organism(
                 random, pool, variations, geometry, id_generator, whole_pop,
                 developer, redundancy_guard, composition_space, constraints)
-            whole_pop.append(copy.deepcopy(unrelaxed_offspring))
+            whole_pop.append(unrelaxed_offspring.snapshot())
             geometry.pad(unrelaxed_offspring.cell)
 
             if substrate_search:
@@ -303,8 +338,13 @@ def main():
                             **substrate_params
                                 )
             futures.append(out)
+            # whole_pop[-1] is the unpadded copy
+            redundancy_guard.register_pending(whole_pop[-1], out.key)
 
         else:  # process finished calculations
+            for future in futures:
+                if future.done():
+                    redundancy_guard.release_pending(future.key)
             futures, relaxed_futures = update_futures(futures)
 
             for i, future in enumerate(relaxed_futures):
@@ -319,9 +359,12 @@ def main():
                         if developer.develop(relaxed_offspring,
                                              composition_space,
                                              constraints, geometry, pool):
-                            # check for redundancy with the the pool first
-                            redundant_organism = redundancy_guard.check_redundancy(
-                                relaxed_offspring, pool.to_list(), geometry)
+                            # check for redundancy with the pool and with all the
+                            # organisms in a single pass
+                            redundant_organism, archived_organism = \
+                                redundancy_guard.check_redundancy_with_pool(
+                                    relaxed_offspring, pool.to_list(), whole_pop,
+                                    geometry)
                             if redundant_organism is not None:  # redundant
                                 if redundant_organism.epa > relaxed_offspring.epa:
                                     pool.replace_organism(redundant_organism,
@@ -336,13 +379,11 @@ def main():
                                                            progress)
                                     print('Number of energy calculations so far: '
                                           '{} '.format(num_finished_calcs))
-                            # check for redundancy with all the organisms
+                            # otherwise use the result for the organisms not in the pool
                             else:
                                 num_finished_calcs += 1
                                 stopping_criteria.update_calc_counter()
-                                redundant_organism = \
-                                    redundancy_guard.check_redundancy(
-                                        relaxed_offspring, whole_pop, geometry)
+                                redundant_organism = archived_organism
                             if redundant_organism is None:  # not redundant
                                 stopping_criteria.check_organism(
                                     relaxed_offspring, redundancy_guard, geometry)
@@ -359,20 +400,14 @@ def main():
                                           'the pool ')
                                     for _ in range(len(
                                             initial_population.initial_population)):
-                                        removed_org = pool.queue.pop()
-                                        removed_org.is_active = False
-                                        print('Removing organism {} from the '
-                                              'pool '.format(removed_org.id))
+                                        pool.remove_organism(composition_space)
 
                                 # if the initial population organisms have already
                                 # been removed from the pool's queue, then just
                                 # need to pop one organism from the front (right
                                 # end) of the queue.
                                 elif pool.num_adds > pool.size:
-                                    removed_org = pool.queue.pop()
-                                    removed_org.is_active = False
-                                    print('Removing organism {} from the '
-                                          'pool '.format(removed_org.id))
+                                    pool.remove_organism(composition_space)
 
                                 pool.compute_fitnesses()
                                 pool.compute_selection_probs()
@@ -387,6 +422,9 @@ def main():
     # process all the calculations that were still running when the
     # stopping criteria were achieved
     while len(futures) > 0:
+        for future in futures:
+            if future.done():
+                redundancy_guard.release_pending(future.key)
         futures, relaxed_futures = update_futures(futures)
         for i, future in enumerate(relaxed_futures):
             if not future.exception():
@@ -398,9 +436,12 @@ def main():
                                         relaxed_offspring.n_sub, constraints)
                     if developer.develop(relaxed_offspring, composition_space,
                                          constraints, geometry, pool):
-                        # check for redundancy with the pool first
-                        redundant_organism = redundancy_guard.check_redundancy(
-                            relaxed_offspring, pool.to_list(), geometry)
+                        # check for redundancy with the pool and with all the
+                        # organisms in a single pass
+                        redundant_organism, archived_organism = \
+                            redundancy_guard.check_redundancy_with_pool(
+                                relaxed_offspring, pool.to_list(), whole_pop,
+                                geometry)
                         if redundant_organism is not None:  # redundant
                             if redundant_organism.epa > relaxed_offspring.epa:
                                 pool.replace_organism(redundant_organism,
@@ -415,21 +456,16 @@ def main():
                                                        progress)
                                 print('Number of energy calculations so far: '
                                       '{} '.format(num_finished_calcs))
-                        # check for redundancy with all the organisms
+                        # otherwise use the result for the organisms not in the pool
                         else:
-                            redundant_organism = \
-                                redundancy_guard.check_redundancy(
-                                    relaxed_offspring, whole_pop, geometry)
+                            redundant_organism = archived_organism
                         if redundant_organism is None:  # not redundant
                             num_finished_calcs += 1
                             stopping_criteria.update_calc_counter()
                             pool.add_organism(relaxed_offspring,
                                               composition_space)
                             whole_pop.append(relaxed_offspring)
-                            removed_org = pool.queue.pop()
-                            removed_org.is_active = False
-                            print('Removing organism {} from the pool '.format(
-                                removed_org.id))
+                            pool.remove_organism(composition_space)
                             pool.compute_fitnesses()
                             pool.compute_selection_probs()
                             pool.print_summary(composition_space)
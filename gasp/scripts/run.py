@@ -20,7 +20,6 @@ from gasp import parameters_printer
 from gasp import interface
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
-import copy
 import threading
 import random
 import sys
@@ -130,6 +129,8 @@ def main():
     for creator in organism_creators:
         print('Making {} organisms with {}'.format(creator.number,
                                                    creator.name))
+        # organisms that were developed in a batch but not used yet
+        developed_organisms = []
         n_whiles1 = 0
         iface_attempts = 0
         while not creator.is_finished and not stopping_criteria.are_satisfied:
@@ -137,30 +138,55 @@ def main():
             n_whiles1 += 1
             # start initial batch of energy calculations
             if len(threads) < num_calcs_at_once:
-                # make a new organism - keep trying until we get one
-                new_organism = creator.create_organism(
-                    id_generator, composition_space, constraints, random)
-                n_whiles2 = 0
-                while new_organism is None and not creator.is_finished:
-                    n_whiles2 += 1
-                    if n_whiles2 % 1000 == 0:
-                        print ('145: Program can\'t make new random organism')
-                        print ('whiles1: {0}\nwhiles2: {1}'.format(
-                                                        n_whiles1, n_whiles2))
+                if creator.is_successes_based and \
+                        developer.num_processes > 1:
+                    # make a batch of new organisms and develop them in
+                    # parallel, then take the survivors one at a time
+                    if len(developed_organisms) == 0:
+                        new_organisms = []
+                        for _ in range(developer.batch_size):
+                            new_organism = creator.create_organism(
+                                id_generator, composition_space, constraints,
+                                random)
+                            if new_organism is not None:
+                                geometry.unpad(new_organism.cell,
+                                               new_organism.n_sub, constraints)
+                                new_organisms.append(new_organism)
+                        developed_organisms = developer.develop_many(
+                            new_organisms, composition_space, constraints,
+                            geometry, pool)
+                    new_organism = None
+                    is_developed = len(developed_organisms) > 0
+                    if is_developed:
+                        new_organism = developed_organisms.pop(0)
+                else:
+                    # make a new organism - keep trying until we get one
                     new_organism = creator.create_organism(
                         id_generator, composition_space, constraints, random)
-                if new_organism is not None:  # loop above could return None
-                    geometry.unpad(new_organism.cell, new_organism.n_sub,
-                                                                constraints)
-
-                    if developer.develop(new_organism, composition_space,
-                                         constraints, geometry, pool):
+                    n_whiles2 = 0
+                    while new_organism is None and not creator.is_finished:
+                        n_whiles2 += 1
+                        if n_whiles2 % 1000 == 0:
+                            print ('145: Program can\'t make new random organism')
+                            print ('whiles1: {0}\nwhiles2: {1}'.format(
+                                                            n_whiles1, n_whiles2))
+                        new_organism = creator.create_organism(
+                            id_generator, composition_space, constraints, random)
+                    is_developed = False
+                    if new_organism is not None:  # loop above could return None
+                        geometry.unpad(new_organism.cell, new_organism.n_sub,
+                                       constraints)
+                        is_developed = developer.develop(
+                            new_organism, composition_space, constraints,
+                            geometry, pool)
+                if new_organism is not None:
+                    if is_developed:
                         redundant_organism = redundancy_guard.check_redundancy(
                             new_organism, whole_pop, geometry)
                         if redundant_organism is None:  # no redundancy
                             # add a copy to whole_pop so the organisms in
                             # whole_pop don't change upon relaxation
-                            whole_pop.append(copy.deepcopy(new_organism))
+                            whole_pop.append(new_organism.snapshot())
                             # pad with vacuum
                             geometry.pad(new_organism.cell)
                             kwargs = {}
@@ -196,6 +222,9 @@ def main():
                                       index, composition_space],
                                 kwargs=kwargs)
                             thread.start()
+                            # whole_pop[-1] is the unpadded copy
+                            redundancy_guard.register_pending(
+                                whole_pop[-1], index)
                             threads.append(thread)
                             sleep(5)
 
@@ -209,6 +238,7 @@ def main():
                         num_finished_calcs += 1
                         relaxed_organism = relaxed_organisms[index]
                         relaxed_organisms[index] = None
+                        redundancy_guard.release_pending(index)
 
                         # take care of relaxed organism
                         if relaxed_organism is not None:
@@ -295,7 +325,7 @@ def main():
                                         # add a copy to whole_pop so the organisms in
                                         # whole_pop don't change upon relaxation
                                         whole_pop.append(
-                                                    copy.deepcopy(new_organism))
+                                                    new_organism.snapshot())
                                         # pad with vacuum
                                         geometry.pad(new_organism.cell)
                                         kwargs = {}
@@ -334,10 +364,16 @@ def main():
                                                   composition_space],
                                             kwargs=kwargs)
                                         new_thread.start()
+                                        # whole_pop[-1] is the unpadded copy
+                                        redundancy_guard.register_pending(
+                                            whole_pop[-1], index)
                                         threads[index] = new_thread
                                         started_new_calc = True
 
 
+    # the worker processes of the developer are only used by the creators
+    developer.close()
+
     # depending on how the loop above exited, update bookkeeping
     if not stopping_criteria.are_satisfied:
         num_finished_calcs = num_finished_calcs - 1
@@ -361,6 +397,7 @@ def main():
                 num_to_get = num_to_get - 1
                 handled_indices.append(index)
                 relaxed_organisms[index] = None
+                redundancy_guard.release_pending(index)
 
                 # take care of relaxed organism
                 if relaxed_organism is not None:
@@ -424,7 +461,7 @@ def main():
         unrelaxed_offspring = offspring_generator.make_offspring_organism(
             random, pool, variations, geometry, id_generator, whole_pop,
             developer, redundancy_guard, composition_space, constraints)
-        whole_pop.append(copy.deepcopy(unrelaxed_offspring))
+        whole_pop.append(unrelaxed_offspring.snapshot())
         geometry.pad(unrelaxed_offspring.cell)
         kwargs = {}
         if substrate_search:
@@ -457,6 +494,8 @@ def main():
             args=[unrelaxed_offspring, relaxed_organisms, index,
                   composition_space], kwargs=kwargs)
         new_thread.start()
+        # whole_pop[-1] is the unpadded copy
+        redundancy_guard.register_pending(whole_pop[-1], index)
         threads.append(new_thread)
         sleep(5)
 
@@ -472,6 +511,7 @@ def main():
                 num_finished_calcs += 1
                 relaxed_offspring = relaxed_organisms[index]
                 relaxed_organisms[index] = None
+                redundancy_guard.release_pending(index)
 
                 # take care of relaxed offspring organism
                 if relaxed_offspring is not None:
@@ -479,9 +519,12 @@ def main():
                                         relaxed_offspring.n_sub, constraints)
                     if developer.develop(relaxed_offspring, composition_space,
                                          constraints, geometry, pool):
-                        # check for redundancy with the the pool first
-                        redundant_organism = redundancy_guard.check_redundancy(
-                            relaxed_offspring, pool.to_list(), geometry)
+                        # check for redundancy with the pool and with all the
+                        # organisms in a single pass
+                        redundant_organism, archived_organism = \
+                            redundancy_guard.check_redundancy_with_pool(
+                                relaxed_offspring, pool.to_list(), whole_pop,
+                                geometry)
                         if redundant_organism is not None:  # redundant
                             if redundant_organism.epa > relaxed_offspring.epa:
                                 pool.replace_organism(redundant_organism,
@@ -496,11 +539,9 @@ def main():
                                                        progress)
                                 print('Number of energy calculations so far: '
                                       '{} '.format(num_finished_calcs))
-                        # check for redundancy with all the organisms
+                        # otherwise use the result for the organisms not in the pool
                         else:
-                            redundant_organism = \
-                                redundancy_guard.check_redundancy(
-                                    relaxed_offspring, whole_pop, geometry)
+                            redundant_organism = archived_organism
                         if redundant_organism is None:  # not redundant
                             stopping_criteria.check_organism(
                                 relaxed_offspring, redundancy_guard, geometry)
@@ -517,20 +558,14 @@ def main():
                                       'the pool ')
                                 for _ in range(len(
                                         initial_population.initial_population)):
-                                    removed_org = pool.queue.pop()
-                                    removed_org.is_active = False
-                                    print('Removing organism {} from the '
-                                          'pool '.format(removed_org.id))
+                                    pool.remove_organism(composition_space)
 
                             # if the initial population organisms have already
                             # been removed from the pool's queue, then just
                             # need to pop one organism from the front (right
                             # end) of the queue.
                             elif pool.num_adds > pool.size:
-                                removed_org = pool.queue.pop()
-                                removed_org.is_active = False
-                                print('Removing organism {} from the '
-                                      'pool '.format(removed_org.id))
+                                pool.remove_organism(composition_space)
 
                             pool.compute_fitnesses()
                             pool.compute_selection_probs()
@@ -554,7 +589,7 @@ def main():
                             random, pool, variations, geometry, id_generator,
                             whole_pop, developer, redundancy_guard,
                             composition_space, constraints)
-                    whole_pop.append(copy.deepcopy(unrelaxed_offspring))
+                    whole_pop.append(unrelaxed_offspring.snapshot())
                     geometry.pad(unrelaxed_offspring.cell)
                     kwargs = {}
 
@@ -586,6 +621,8 @@ def main():
                         args=[unrelaxed_offspring, relaxed_organisms,
                               index, composition_space], kwargs=kwargs)
                     new_thread.start()
+                    # whole_pop[-1] is the unpadded copy
+                    redundancy_guard.register_pending(whole_pop[-1], index)
                     threads[index] = new_thread
                     started_new_calc = True
 
@@ -604,6 +641,7 @@ def main():
                 num_to_get -= 1
                 handled_indices.append(index)
                 relaxed_organisms[index] = None
+                redundancy_guard.release_pending(index)
 
                 # take care of relaxed offspring organism
                 if relaxed_offspring is not None:
@@ -611,9 +649,12 @@ def main():
                                         relaxed_offspring.n_sub, constraints)
                     if developer.develop(relaxed_offspring, composition_space,
                                          constraints, geometry, pool):
-                        # check for redundancy with the pool first
-                        redundant_organism = redundancy_guard.check_redundancy(
-                            relaxed_offspring, pool.to_list(), geometry)
+                        # check for redundancy with the pool and with all the
+                        # organisms in a single pass
+                        redundant_organism, archived_organism = \
+                            redundancy_guard.check_redundancy_with_pool(
+                                relaxed_offspring, pool.to_list(), whole_pop,
+                                geometry)
                         if redundant_organism is not None:  # redundant
                             if redundant_organism.epa > relaxed_offspring.epa:
                                 pool.replace_organism(redundant_organism,
@@ -628,19 +669,14 @@ def main():
                                                        progress)
                                 print('Number of energy calculations so far: '
                                       '{} '.format(num_finished_calcs))
-                        # check for redundancy with all the organisms
+                        # otherwise use the result for the organisms not in the pool
                         else:
-                            redundant_organism = \
-                                redundancy_guard.check_redundancy(
-                                    relaxed_offspring, whole_pop, geometry)
+                            redundant_organism = archived_organism
                         if redundant_organism is None:  # not redundant
                             pool.add_organism(relaxed_offspring,
                                               composition_space)
                             whole_pop.append(relaxed_offspring)
-                            removed_org = pool.queue.pop()
-                            removed_org.is_active = False
-                            print('Removing organism {} from the pool '.format(
-                                removed_org.id))
+                            pool.remove_organism(composition_space)
                             pool.compute_fitnesses()
                             pool.compute_selection_probs()
                             pool.print_summary(composition_space)
@@ -23,7 +23,6 @@ from gasp import parameters_printer
 from gasp import interface
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 
-import copy
 import threading
 import random
 import sys
@@ -166,7 +165,7 @@ for creator in organism_creators:
                     if redundant_organism is None:  # no redundancy
                         # add a copy to whole_pop so the organisms in
                         # whole_pop don't change upon relaxation
-                        whole_pop.append(copy.deepcopy(new_organism))
+                        whole_pop.append(new_organism.snapshot())
                         # pad with vacuum
                         geometry.pad(new_organism.cell)
                         if substrate_search:
@@ -193,9 +192,15 @@ for creator in organism_creators:
                                 new_organism, composition_space,
                                 **substrate_params)
                         futures.append(out)
+                        # whole_pop[-1] is the unpadded copy
+                        redundancy_guard.register_pending(whole_pop[-1],
+                                                          out.key)
 
         # process finished calculations and start new ones
         else:
+            for future in futures:
+                if future.done():
+                    redundancy_guard.release_pending(future.key)
             futures, relaxed_futures = update_futures(futures)
             for future in relaxed_futures:
                 if not future.exception():
@@ -251,6 +256,9 @@ for creator in organism_creators:
                                         relaxed_organism.made_by == \
                                         creator.name:
                                     creator.update_status()
+# the worker processes of the developer are only used by the creators
+developer.close()
+
 # depending on how the loop above exited, update bookkeeping
 if not stopping_criteria.are_satisfied:
     num_finished_calcs = num_finished_calcs - 1
@@ -270,7 +278,7 @@ while not stopping_criteria.are_satisfied:
         unrelaxed_offspring = offspring_generator.make_offspring_organism(
             random, pool, variations, geometry, id_generator, whole_pop,
             developer, redundancy_guard, composition_space, constraints)
-        whole_pop.append(copy.deepcopy(unrelaxed_offspring))
+        whole_pop.append(unrelaxed_offspring.snapshot())
         geometry.pad(unrelaxed_offspring.cell)
 
         if substrate_search:
@@ -297,8 +305,13 @@ while not stopping_criteria.are_satisfied:
                         **substrate_params
                             )
         futures.append(out)
+        # whole_pop[-1] is the unpadded copy
+        redundancy_guard.register_pending(whole_pop[-1], out.key)
 
     else:  # process finished calculations
+        for future in futures:
+            if future.done():
+                redundancy_guard.release_pending(future.key)
         futures, relaxed_futures = update_futures(futures)
 
         for i, future in enumerate(relaxed_futures):
@@ -313,9 +326,12 @@ while not stopping_criteria.are_satisfied:
                     if developer.develop(relaxed_offspring,
                                          composition_space,
                                          constraints, geometry, pool):
-                        # check for redundancy with the the pool first
-                        redundant_organism = redundancy_guard.check_redundancy(
-                            relaxed_offspring, pool.to_list(), geometry)
+                        # check for redundancy with the pool and with all the
+                        # organisms in a single pass
+                        redundant_organism, archived_organism = \
+                            redundancy_guard.check_redundancy_with_pool(
+                                relaxed_offspring, pool.to_list(), whole_pop,
+                                geometry)
                         if redundant_organism is not None:  # redundant
                             if redundant_organism.epa > relaxed_offspring.epa:
                                 pool.replace_organism(redundant_organism,
@@ -330,13 +346,11 @@ while not stopping_criteria.are_satisfied:
                                                        progress)
                                 print('Number of energy calculations so far: '
                                       '{} '.format(num_finished_calcs))
-                        # check for redundancy with all the organisms
+                        # otherwise use the result for the organisms not in the pool
                         else:
                             num_finished_calcs += 1
                             stopping_criteria.update_calc_counter()
-                            redundant_organism = \
-                                redundancy_guard.check_redundancy(
-                                    relaxed_offspring, whole_pop, geometry)
+                            redundant_organism = archived_organism
                         if redundant_organism is None:  # not redundant
                             stopping_criteria.check_organism(
                                 relaxed_offspring, redundancy_guard, geometry)
@@ -353,20 +367,14 @@ while not stopping_criteria.are_satisfied:
                                       'the pool ')
                                 for _ in range(len(
                                         initial_population.initial_population)):
-                                    removed_org = pool.queue.pop()
-                                    removed_org.is_active = False
-                                    print('Removing organism {} from the '
-                                          'pool '.format(removed_org.id))
+                                    pool.remove_organism(composition_space)
 
                             # if the initial population organisms have already
                             # been removed from the pool's queue, then just
                             # need to pop one organism from the front (right
                             # end) of the queue.
                             elif pool.num_adds > pool.size:
-                                removed_org = pool.queue.pop()
-                                removed_org.is_active = False
-                                print('Removing organism {} from the '
-                                      'pool '.format(removed_org.id))
+                                pool.remove_organism(composition_space)
 
                             pool.compute_fitnesses()
                             pool.compute_selection_probs()
@@ -381,6 +389,9 @@ while not stopping_criteria.are_satisfied:
 # process all the calculations that were still running when the
 # stopping criteria were achieved
 while len(futures) > 0:
+    for future in futures:
+        if future.done():
+            redundancy_guard.release_pending(future.key)
     futures, relaxed_futures = update_futures(futures)
     for i, future in enumerate(relaxed_futures):
         if not future.exception():
@@ -392,9 +403,12 @@ while len(futures) > 0:
                                     relaxed_offspring.n_sub, constraints)
                 if developer.develop(relaxed_offspring, composition_space,
                                      constraints, geometry, pool):
-                    # check for redundancy with the pool first
-                    redundant_organism = redundancy_guard.check_redundancy(
-                        relaxed_offspring, pool.to_list(), geometry)
+                    # check for redundancy with the pool and with all the
+                    # organisms in a single pass
+                    redundant_organism, archived_organism = \
+                        redundancy_guard.check_redundancy_with_pool(
+                            relaxed_offspring, pool.to_list(), whole_pop,
+                            geometry)
                     if redundant_organism is not None:  # redundant
                         if redundant_organism.epa > relaxed_offspring.epa:
                             pool.replace_organism(redundant_organism,
@@ -409,21 +423,16 @@ while len(futures) > 0:
                                                    progress)
                             print('Number of energy calculations so far: '
                                   '{} '.format(num_finished_calcs))
-                    # check for redundancy with all the organisms
+                    # otherwise use the result for the organisms not in the pool
                     else:
-                        redundant_organism = \
-                            redundancy_guard.check_redundancy(
-                                relaxed_offspring, whole_pop, geometry)
+                        redundant_organism = archived_organism
                     if redundant_organism is None:  # not redundant
                         num_finished_calcs += 1
                         stopping_criteria.update_calc_counter()
                         pool.add_organism(relaxed_offspring,
                                           composition_space)
                         whole_pop.append(relaxed_offspring)
-                        removed_org = pool.queue.pop()
-                        removed_org.is_active = False
-                        print('Removing organism {} from the pool '.format(
-                            removed_org.id))
+                        pool.remove_organism(composition_space)
                         pool.compute_fitnesses()
                         pool.compute_selection_probs()
                         pool.print_summary(composition_space)
@@ -16,8 +16,10 @@ from gasp import general, development, variations, population, \
 from gasp import geometry as geo
 
 from pymatgen.core.periodic_table import Element
+from pymatgen.core.composition import Composition
 
 import unittest
+import itertools
 import random
 import copy
 import numpy as np
@@ -39,6 +41,49 @@ class TestIDGenerator(unittest.TestCase):
         self.assertEqual(first_id + 1, second_id)
 
 
+class TestCompositionSpace(unittest.TestCase):
+    def setUp(self):
+        self.composition_space = general.CompositionSpace(['Al2O3', 'MgO'])
+
+    def test_inside(self):
+        # counted in formula units of Al2O3 and MgO
+        for formula, fractions in [('MgAl2O4', [0.5, 0.5]),
+                                   ('Mg2Al2O5', [1/3, 2/3]),
+                                   ('Mg2Al4O8', [0.5, 0.5]),
+                                   ('Al2O3', [1, 0]), ('Mg3O3', [0, 1])]:
+            self.assertTrue(np.allclose(
+                self.composition_space.get_endpoint_fractions(
+                    Composition(formula)), fractions))
+
+    def test_outside(self):
+        # wrong ratios, missing elements and elements not in any endpoint
+        for formula in ['MgO2', 'Mg2Al2O4', 'Al', 'AlN']:
+            self.assertTrue(self.composition_space.get_endpoint_fractions(
+                Composition(formula)) is None)
+
+
+class TestCell(unittest.TestCase):
+
+    def test_rotate_to_principal_directions(self):
+        sampler = np.random.RandomState(0)
+        for _ in range(20):
+            matrix = 4*np.identity(3) + sampler.uniform(-2, 2, (3, 3))
+            coords = sampler.random_sample((3, 3))
+            cell = general.Cell(matrix, [Element('Al')]*3, coords)
+            abc = cell.lattice.abc
+            angles = cell.lattice.angles
+            cell.rotate_to_principal_directions()
+
+            # the lattice rotated (and mirrored if left-handed) so that a is
+            # along x, b is in the x-y plane, and the diagonal is positive
+            q, r = np.linalg.qr(matrix.T)
+            expected = (np.diag(np.sign(np.diag(r))).dot(r)).T
+            self.assertTrue(np.allclose(cell.lattice.matrix, expected))
+            self.assertTrue(np.allclose(cell.lattice.abc, abc))
+            self.assertTrue(np.allclose(cell.lattice.angles, angles))
+            self.assertTrue(np.allclose(cell.frac_coords, coords))
+
+
 class TestMating(unittest.TestCase):
     def setUp(self):
         mating_params = {'fraction': 0.1}
@@ -753,6 +798,33 @@ class TestMating(unittest.TestCase):
         new_cell = self.mating.merge_sites(cell, geometry, constraints)
         self.assertEqual(new_cell.num_sites, old_num_atoms - 1)
 
+    def test_merge_sites_across_boundary(self):
+        # two Cu sites 0.25 Angstroms apart across the cell boundary, an Al
+        # site close to one of them, and a Cu site far from all of them
+        species = [Element('Cu'), Element('Al'), Element('Cu'),
+                   Element('Cu')]
+        coords = [[0.02, 0.5, 0.5], [0.06, 0.5, 0.5], [0.97, 0.5, 0.5],
+                  [0.5, 0.2, 0.2]]
+        lattice = [[5, 0, 0], [0, 5, 0], [0, 0, 5]]
+        cell = general.Cell(lattice, species, coords)
+        geometry = geo.Bulk()
+        composition_space = general.CompositionSpace(['Cu', 'Al'])
+        constraints = development.Constraints(None, composition_space)
+        new_cell = self.mating.merge_sites(cell, geometry, constraints)
+        self.assertEqual(new_cell.num_sites, 3)
+        self.assertEqual(sorted(site.specie.symbol for site in
+                                new_cell.sites), ['Al', 'Cu', 'Cu'])
+
+        # the merged site is halfway between the two, at x = -0.005, and the
+        # others haven't moved
+        expected_coords = [[-0.005, 0.5, 0.5], [0.06, 0.5, 0.5],
+                           [0.5, 0.2, 0.2]]
+        for expected in expected_coords:
+            differences = new_cell.frac_coords - expected
+            differences -= np.round(differences)
+            self.assertTrue(np.any(np.all(np.abs(differences) < 1e-6,
+                                          axis=1)))
+
     def test_do_variation(self):
         # test with fixed-composition search
         composition_space = general.CompositionSpace(['AlCu'])
@@ -1000,6 +1072,47 @@ class TestStructureMut(unittest.TestCase):
         self.assertTrue(offspring is not None)
         self.assertTrue(offspring.cell.num_sites > 0)
 
+    def test_perturbation_bounds(self):
+        structure_mut = variations.StructureMut({
+            'fraction': 0.1, 'frac_atoms_perturbed': 0.5,
+            'sigma_atomic_coord_perturbation': 1.0,
+            'max_atomic_coord_perturbation': 0.3,
+            'sigma_strain_matrix_element': 2.0})
+        sampler = random.Random(5)
+
+        # the truncated Gaussians are redrawn until they're all in bounds
+        values = structure_mut.get_truncated_gaussians(
+            np.random.default_rng(5), 1.0, 0.5, (1000, 3))
+        self.assertEqual(values.shape, (1000, 3))
+        self.assertTrue(np.all(np.abs(values) <= 0.5))
+        self.assertTrue(len(np.unique(values)) == values.size)
+
+        # each perturbed site moves by at most 0.3 Angstroms along each
+        # Cartesian direction
+        coords = np.random.RandomState(5).random_sample((40, 3))
+        lattice = [[10, 0, 0], [0, 10, 0], [0, 0, 10]]
+        cell = general.Cell(lattice, [Element('Cu')]*40, coords)
+        composition_space = general.CompositionSpace(['Cu'])
+        constraints = development.Constraints(None, composition_space)
+        structure_mut.perturb_atomic_coords(cell, geo.Bulk(), constraints,
+                                            sampler)
+        displacements = cell.frac_coords - coords
+        displacements -= np.round(displacements)
+        displacements *= 10
+        self.assertTrue(np.all(np.abs(displacements) <= 0.3 + 1e-9))
+        num_perturbed = np.count_nonzero(np.any(displacements != 0,
+                                                axis=1))
+        self.assertTrue(0 < num_perturbed < 40)
+
+        # the elements of the strain matrix are in [-1, 1]
+        for _ in range(20):
+            cell = general.Cell(lattice, [Element('Cu')], [[0, 0, 0]])
+            structure_mut.perturb_lattice_vectors(cell, sampler)
+            strain_matrix = np.linalg.solve(np.array(lattice, dtype=float),
+                                            cell.lattice.matrix).T
+            self.assertTrue(np.all(np.abs(
+                strain_matrix - np.identity(3)) <= 1 + 1e-9))
+
 
 class TestNumAtomsMut(unittest.TestCase):
     def setUp(self):
@@ -1215,6 +1328,30 @@ class TestNumAtomsMut(unittest.TestCase):
         self.assertEqual(cell.lattice.volume, old_cell.lattice.volume)
         self.assertEqual(cell.num_sites, old_cell.num_sites + num_adds)
 
+    def test_add_atoms_void(self):
+        # test that atoms added to voids satisfy the per-species MIDs
+        num_atoms_mut = variations.NumAtomsMut({'fraction': 0.1,
+                                                'insertion_mode': 'void'})
+        composition_space = general.CompositionSpace(['Al', 'Cu'])
+        constraints = development.Constraints(None, composition_space)
+        species = [Element('Cu'), Element('Cu'), Element('Al'), Element('Al')]
+        coords = [[0.0, 0.0, 0.0], [0.5, 0.5, 0.0], [0.5, 0.0, 0.5],
+                  [0.0, 0.5, 0.5]]
+        lattice = [[6, 0, 0], [0, 6, 0], [0, 0, 6]]
+        cell = general.Cell(lattice, species, coords)
+        old_cell = copy.deepcopy(cell)
+        num_adds = 4
+        num_atoms_mut.add_atoms_pd(cell, num_adds, composition_space, random,
+                                   constraints)
+        self.assertEqual(cell.lattice.volume, old_cell.lattice.volume)
+        self.assertEqual(cell.num_sites, old_cell.num_sites + num_adds)
+        mid_indices = constraints.get_mid_indices(
+            [site.specie.symbol for site in cell.sites])
+        mids = constraints.mid_matrix[np.ix_(mid_indices, mid_indices)]
+        distances = cell.distance_matrix
+        np.fill_diagonal(distances, np.inf)
+        self.assertTrue(np.all(distances >= mids))
+
     def test_remove_atoms_pd(self):
         # test with removing 1 atom
         species = [Element('Cu'), Element('Cu'), Element('Cu'), Element('Al'),
@@ -1255,6 +1392,20 @@ class TestNumAtomsMut(unittest.TestCase):
         self.assertEqual(cell.lattice.volume, old_cell.lattice.volume)
         self.assertEqual(cell.num_sites, old_cell.num_sites - num_removes)
 
+    def test_remove_least_coordinated(self):
+        # test that an isolated atom is removed first
+        num_atoms_mut = variations.NumAtomsMut(
+            {'fraction': 0.1, 'removal_mode': 'least_coordinated'})
+        species = [Element('Cu'), Element('Cu'), Element('Cu'), Element('Cu'),
+                   Element('Cu')]
+        coords = [[0.0, 0.0, 0.0], [0.25, 0.25, 0.0], [0.25, 0.0, 0.25],
+                  [0.0, 0.25, 0.25], [0.6, 0.6, 0.6]]
+        lattice = [[7, 0, 0], [0, 7, 0], [0, 0, 7]]
+        cell = general.Cell(lattice, species, coords)
+        num_atoms_mut.remove_atoms_pd(cell, 1, random)
+        self.assertEqual(cell.num_sites, 4)
+        self.assertTrue(np.all(cell.frac_coords < 0.5))
+
     def test_do_variation(self):
         # test with fixed-composition search
         composition_space = general.CompositionSpace(['AlCu'])
@@ -1495,6 +1646,42 @@ class TestPermutation(unittest.TestCase):
         self.assertEqual(cell.sites[2].specie, old_cell.sites[3].specie)
         self.assertEqual(cell.sites[3].specie, old_cell.sites[2].specie)
 
+    def test_swap_candidates(self):
+        composition_space = general.CompositionSpace(['Al', 'Cu', 'Ni'])
+        permutation = variations.Permutation(
+            {'fraction': 0.1, 'pairs_to_swap': ['Al Cu', 'Cu Ni']},
+            composition_space)
+        lattice = [[3, 0, 0], [0, 3, 0], [0, 0, 3]]
+        coords = [[i/6, 0.5, 0.5] for i in range(6)]
+
+        # without Ni, only Al and Cu can be swapped
+        cell = general.Cell(lattice, [Element('Al')]*3 + [Element('Cu')]*3,
+                            coords)
+        self.assertEqual(permutation.get_possible_swaps(cell), ['Al Cu'])
+
+        # each swap uses one of the two Cu sites, so there are two swaps,
+        # each between sites of a swappable pair, and no site is used twice
+        symbols = ['Al', 'Cu', 'Al', 'Ni', 'Cu', 'Al']
+        cell = general.Cell(lattice, [Element(symbol) for symbol in
+                                      symbols], coords)
+        sampler = random.Random(7)
+        swapped_pairs = set()
+        for _ in range(50):
+            indices_to_swap = permutation.get_indices_to_swap(cell, 10,
+                                                              sampler)
+            self.assertEqual(len(indices_to_swap), 2)
+            used_indices = [index for pair in indices_to_swap for index in
+                            pair]
+            self.assertEqual(len(set(used_indices)), 4)
+            for i, j in indices_to_swap:
+                pair = symbols[i] + ' ' + symbols[j]
+                self.assertTrue(pair in ['Al Cu', 'Cu Ni'])
+                swapped_pairs.add(pair)
+        self.assertEqual(swapped_pairs, set(['Al Cu', 'Cu Ni']))
+        # the cell isn't changed
+        self.assertEqual([site.specie.symbol for site in cell.sites],
+                         symbols)
+
     def test_do_variation(self):
         # test with fixed-composition search
         composition_space = general.CompositionSpace(['AlCu'])
@@ -1594,5 +1781,523 @@ class TestPermutation(unittest.TestCase):
         if offspring is not None:
             self.assertTrue(offspring.cell.num_sites > 0)
 
+
+class TestPartiallyPeriodicMatcher(unittest.TestCase):
+    def test_fit_sheets(self):
+        matcher = development.PartiallyPeriodicMatcher(0.05, 0.1, 2, [0, 1],
+                                                       True)
+        lattice = [[3.2, 0, 0], [-1.6, 2.77128, 0], [0, 0, 8]]
+        species = [Element('Mo'), Element('S'), Element('S')]
+        coords = [[0, 0, 0.5], [1/3, 2/3, 0.3], [1/3, 2/3, 0.7]]
+        cell = general.Cell(lattice, species, coords)
+
+        # translated, and wrapped across the cell boundary along c
+        shifted_coords = [[0.3, 0.1, 0.9], [1/3 + 0.3, 2/3 + 0.1, 0.7],
+                          [1/3 + 0.3, 2/3 + 0.1, 0.1]]
+        shifted_cell = general.Cell(lattice, species, shifted_coords)
+        self.assertTrue(matcher.fit(cell, shifted_cell))
+
+        # an in-plane supercell
+        supercell = general.Cell(lattice, species, coords)
+        supercell.make_supercell([[2, 1, 0], [0, 1, 0], [0, 0, 1]])
+        self.assertTrue(matcher.fit(cell, supercell))
+
+        # a different structure
+        moved_coords = [[0, 0, 0.5], [1/3, 2/3, 0.2], [1/3, 2/3, 0.7]]
+        moved_cell = general.Cell(lattice, species, moved_coords)
+        self.assertFalse(matcher.fit(cell, moved_cell))
+
+    def test_fit_wires(self):
+        matcher = development.PartiallyPeriodicMatcher(0.05, 0.1, 2, [2],
+                                                       True)
+        lattice = [[10, 0, 0], [0, 10, 0], [0, 0, 3]]
+        species = [Element('Si')]*4
+        coords = [[0.6, 0.5, 0], [0.5, 0.6, 0.25], [0.4, 0.5, 0.5],
+                  [0.5, 0.4, 0.75]]
+        cell = general.Cell(lattice, species, coords)
+
+        # rotated about the wire axis and translated, in a different cell
+        angle = 0.7
+        rotation = np.array([[np.cos(angle), -np.sin(angle), 0],
+                             [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+        cart_coords = np.dot(cell.cart_coords - [5, 5, 0],
+                             rotation.T) + [1, 2, 1.1]
+        rotated_cell = general.Cell([[9, 1, 0], [0, 11, 0], [0, 0, 3]],
+                                    species, cart_coords,
+                                    coords_are_cartesian=True)
+        self.assertTrue(matcher.fit(cell, rotated_cell))
+
+        # a different structure
+        moved_coords = [[0.7, 0.5, 0], [0.5, 0.6, 0.25], [0.4, 0.5, 0.5],
+                        [0.5, 0.4, 0.75]]
+        moved_cell = general.Cell(lattice, species, moved_coords)
+        self.assertFalse(matcher.fit(cell, moved_cell))
+
+
+class TestRedundancyGuard(unittest.TestCase):
+
+    def setUp(self):
+        self.composition_space = general.CompositionSpace(['Na', 'Cl'])
+        self.id_generator = general.IDGenerator()
+        self.geometry = geo.Bulk()
+        self.redundancy_guard = development.RedundancyGuard(
+            {'pending_tol': 0.05}, self.geometry)
+
+    def make_organism(self, symbols, coords, length=4.0):
+        lattice = [[length, 0, 0], [0, length, 0], [0, 0, length]]
+        species = [Element(symbol) for symbol in symbols]
+        cell = general.Cell(lattice, species, coords)
+        return general.Organism(cell, self.id_generator, 'maker',
+                                self.composition_space)
+
+    def test_pending(self):
+        coords = [[0, 0, 0], [0.5, 0.5, 0.5]]
+        pending = self.make_organism(['Na', 'Cl'], coords)
+        self.redundancy_guard.register_pending(pending, 0)
+
+        # a near duplicate, within pending_tol
+        near_duplicate = self.make_organism(['Na', 'Cl'], coords, 4.01)
+        self.assertEqual(self.redundancy_guard.check_redundancy(
+            near_duplicate, [], self.geometry), pending)
+
+        # too far from the pending organism, so it isn't compared to the
+        # pending organism again with the structure matcher
+        stretched = self.make_organism(['Na', 'Cl'], coords, 4.1)
+        self.assertTrue(self.redundancy_guard.check_redundancy(
+            stretched, [pending], self.geometry) is None)
+
+        # a different composition
+        different_composition = self.make_organism(['Na', 'Na'], coords)
+        self.assertTrue(self.redundancy_guard.check_redundancy(
+            different_composition, [], self.geometry) is None)
+
+        # the same composition with a different number of atoms
+        supercell = self.make_organism(
+            ['Na', 'Cl', 'Na', 'Cl'],
+            [[0, 0, 0], [0.5, 0.5, 0.5], [0.5, 0, 0], [0, 0.5, 0.5]])
+        self.assertTrue(self.redundancy_guard.check_redundancy(
+            supercell, [], self.geometry) is None)
+
+        # the structure is allowed again once the calculation is released,
+        # and the structure matcher is used again
+        self.redundancy_guard.release_pending(0)
+        self.assertTrue(self.redundancy_guard.check_redundancy(
+            near_duplicate, [], self.geometry) is None)
+        self.assertEqual(self.redundancy_guard.check_redundancy(
+            stretched, [pending], self.geometry), pending)
+
+    def test_pending_near_cutoff(self):
+        # the Na-Na distance along each axis moves across the 5 Angstrom
+        # cutoff
+        coords = [[0, 0, 0], [0.5, 0.5, 0.5]]
+        pending = self.make_organism(['Na', 'Cl'], coords, 4.99)
+        self.redundancy_guard.register_pending(pending, 0)
+        near_duplicate = self.make_organism(['Na', 'Cl'], coords, 5.01)
+        self.assertEqual(self.redundancy_guard.check_redundancy(
+            near_duplicate, [], self.geometry), pending)
+        # and the other way around
+        self.redundancy_guard.release_pending(0)
+        self.redundancy_guard.register_pending(near_duplicate, 1)
+        self.assertEqual(self.redundancy_guard.check_redundancy(
+            pending, [], self.geometry), near_duplicate)
+
+
+class TestDeveloper(unittest.TestCase):
+
+    def test_stats_interval(self):
+        geometry = geo.Bulk()
+        developer = development.Developer(None, geometry)
+        self.assertEqual(developer.stats_interval, 1000)
+        developer = development.Developer({'stats_interval': 'default'},
+                                          geometry)
+        self.assertEqual(developer.stats_interval, 1000)
+        developer = development.Developer({'stats_interval': 50}, geometry)
+        self.assertEqual(developer.stats_interval, 50)
+
+        # None turns off the printouts
+        developer = development.Developer({'stats_interval': None},
+                                          geometry)
+        self.assertTrue(developer.stats_interval is None)
+        developer.print_stage_stats = self.fail
+        developer.update_num_developed(5000)
+
+    def test_mids_constraints(self):
+        composition_space = general.CompositionSpace(['Al', 'Cu'])
+        mids = {'Al Al': 1.6, 'Al Cu': 1.9, 'Cu Cu': 2.2}
+        constraints = development.Constraints({'per_species_mids': mids},
+                                              composition_space)
+        developer = development.Developer(None, geo.Bulk())
+        id_generator = general.IDGenerator()
+        sampler = np.random.RandomState(3)
+        images = np.array(list(itertools.product(range(-2, 3), repeat=3)))
+        num_passed = 0
+        for _ in range(50):
+            lattice = 5*np.identity(3) + sampler.uniform(-0.5, 0.5, (3, 3))
+            symbols = [sampler.choice(['Al', 'Cu']) for _ in range(4)]
+            coords = sampler.random_sample((4, 3))
+            cell = general.Cell(lattice, [Element(symbol) for symbol in
+                                          symbols], coords)
+            organism = general.Organism(cell, id_generator, 'maker',
+                                        composition_space)
+
+            # check every pair of sites, including periodic images
+            satisfied = True
+            for i in range(4):
+                for j in range(4):
+                    if (symbols[i] + ' ' + symbols[j]) in mids:
+                        mid = mids[symbols[i] + ' ' + symbols[j]]
+                    else:
+                        mid = mids[symbols[j] + ' ' + symbols[i]]
+                    for image in images:
+                        if i == j and not np.any(image):
+                            continue
+                        distance = np.linalg.norm(np.dot(
+                            coords[j] + image - coords[i], lattice))
+                        if distance <= mid:
+                            satisfied = False
+            num_passed += satisfied
+            self.assertEqual(developer.satisfies_mids_constraints(
+                organism, constraints, pre_dev=False), satisfied)
+        # make sure both outcomes were tested
+        self.assertTrue(0 < num_passed < 50)
+
+
+class TestRandomOrganismCreator(unittest.TestCase):
+
+    def make_creator(self, endpoints, max_num_atoms, allow_endpoints=True):
+        composition_space = general.CompositionSpace(endpoints)
+        constraints = development.Constraints(
+            {'min_num_atoms': 2, 'max_num_atoms': 30}, composition_space)
+        creator = organism_creators.RandomOrganismCreator(
+            {'max_num_atoms': max_num_atoms,
+             'allow_endpoints': allow_endpoints},
+            composition_space, constraints)
+        return creator, composition_space, constraints
+
+    def test_composition_table(self):
+        for endpoints in [['Al2Cu', 'Cu'], ['Al2O3', 'MgO', 'SiO2'],
+                          ['Fe2O3', 'Fe3O4']]:
+            for allow_endpoints in [True, False]:
+                creator, composition_space, constraints = self.make_creator(
+                    endpoints, 12, allow_endpoints)
+                table = set()
+                for num_atoms in creator.table_group_sizes:
+                    for amounts in creator.get_composition_group(num_atoms):
+                        self.assertEqual(np.sum(amounts), num_atoms)
+                        table.add(tuple(amounts))
+
+                # every reduced composition with at most 12 atoms per
+                # formula unit in the composition space
+                endpoint_formulas = [endpoint.reduced_formula for endpoint in
+                                     composition_space.endpoints]
+                expected = set()
+                num_elements = len(creator.table_elements)
+                for amounts in np.ndindex(*[13]*num_elements):
+                    if not 0 < sum(amounts) <= 12 or \
+                            np.gcd.reduce(amounts) != 1:
+                        continue
+                    composition = Composition(dict(
+                        (element, amount) for element, amount in
+                        zip(creator.table_elements, amounts) if amount > 0))
+                    if composition_space.get_endpoint_fractions(
+                            composition) is None:
+                        continue
+                    if not allow_endpoints and \
+                            composition.reduced_formula in endpoint_formulas:
+                        continue
+                    expected.add(amounts)
+                self.assertEqual(table, expected)
+
+    def test_composition_sampling(self):
+        creator, composition_space, constraints = self.make_creator(
+            ['Al', 'Cu'], 6)
+        # every number of atoms per formula unit is equally likely, however
+        # many compositions it has, and so is every composition with the
+        # same number of atoms per formula unit
+        sampler = random.Random(1)
+        group_counts = {}
+        composition_counts = {}
+        num_draws = 6000
+        for _ in range(num_draws):
+            species = creator.get_pd_species_list(composition_space,
+                                                  constraints, sampler)
+            self.assertTrue(2 <= len(species) <= 6)
+            composition = Composition(dict(
+                (element, species.count(element)) for element in
+                set(species)))
+            num_atoms = int(composition.get_reduced_composition_and_factor()[
+                0].num_atoms)
+            group_counts[num_atoms] = group_counts.get(num_atoms, 0) + 1
+            formula = composition.reduced_formula
+            composition_counts[formula] = composition_counts.get(
+                formula, 0) + 1
+        self.assertEqual(sorted(group_counts), [1, 2, 3, 4, 5, 6])
+        for num_atoms in group_counts:
+            self.assertTrue(abs(group_counts[num_atoms] -
+                                num_draws/6) < 0.1*num_draws/6)
+        # the two compositions with 3 atoms per formula unit
+        self.assertTrue(abs(composition_counts['Al2Cu'] -
+                            composition_counts['AlCu2']) < 0.2*num_draws/12)
+
+    def test_satisfy_mids(self):
+        composition_space = general.CompositionSpace(['Al', 'Cu'])
+        mids = {'Al Al': 1.6, 'Al Cu': 1.9, 'Cu Cu': 2.2}
+        constraints = development.Constraints({'per_species_mids': mids},
+                                              composition_space)
+        creator = organism_creators.RandomOrganismCreator(
+            {}, composition_space, constraints)
+        developer = development.Developer(None, geo.Bulk())
+        id_generator = general.IDGenerator()
+        sampler = np.random.RandomState(4)
+        # enough candidates to be screened in several chunks
+        num_candidates = 700
+        num_atoms = 8
+        matrices = 6.5*np.identity(3) + sampler.uniform(
+            -1, 1, (num_candidates, 3, 3))
+        frac_coords = sampler.random_sample((num_candidates, num_atoms, 3))
+        symbols = sampler.choice(['Al', 'Cu'], (num_candidates, num_atoms))
+        mid_indices = np.array([constraints.get_mid_indices(list(row)) for
+                                row in symbols])
+        satisfied = creator.satisfy_mids(matrices, frac_coords, mid_indices,
+                                         constraints)
+
+        # check each candidate on its own
+        for i in range(num_candidates):
+            cell = general.Cell(matrices[i], [Element(symbol) for symbol in
+                                              symbols[i]], frac_coords[i])
+            organism = general.Organism(cell, id_generator, 'maker',
+                                        composition_space)
+            self.assertEqual(developer.satisfies_mids_constraints(
+                organism, constraints, pre_dev=False), satisfied[i])
+        # make sure both outcomes were tested
+        self.assertTrue(0 < np.sum(satisfied) < num_candidates)
+
+    def test_symmetric_organisms(self):
+        composition_space = general.CompositionSpace(['AlCu'])
+        constraints = development.Constraints(
+            {'min_num_atoms': 2, 'max_num_atoms': 24}, composition_space)
+        id_generator = general.IDGenerator()
+        sampler = random.Random(2)
+        # one space group from each crystal system
+        for number in [2, 14, 62, 139, 166, 194, 225]:
+            creator = organism_creators.RandomOrganismCreator(
+                {'mode': 'symmetry', 'max_num_atoms': 24},
+                composition_space, constraints)
+            creator.space_group_numbers = [number]
+            num_made = 0
+            for _ in range(10):
+                organism = creator.create_organism(
+                    id_generator, composition_space, constraints, sampler)
+                if organism is None:
+                    continue
+                num_made += 1
+                self.assertTrue(2 <= len(organism.cell.sites) <= 24)
+                # every operation of the space group maps each site onto
+                # exactly one site of the same species
+                rotations, translations, _ = creator.space_groups[number]
+                frac_coords = organism.cell.frac_coords
+                species = organism.cell.species
+                for rotation, translation in zip(rotations, translations):
+                    images = np.dot(frac_coords, rotation.T) + translation
+                    differences = images[:, None, :] - frac_coords[None, :, :]
+                    differences -= np.round(differences)
+                    same = np.all(np.abs(differences) < 1e-4, axis=2)
+                    for i in range(len(species)):
+                        matches = np.nonzero(same[i])[0]
+                        self.assertEqual(len(matches), 1)
+                        self.assertEqual(species[matches[0]], species[i])
+            self.assertTrue(num_made > 0)
+
+
+class TestPool(unittest.TestCase):
+
+    def setUp(self):
+        self.composition_space = general.CompositionSpace(['Al', 'Cu'])
+        self.id_generator = general.IDGenerator()
+        # the pool writes POSCAR files to the working directory
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir)
+
+    def make_organism(self, symbols, epa):
+        num_atoms = len(symbols)
+        lattice = [[3*num_atoms, 0, 0], [0, 3, 0], [0, 0, 3]]
+        species = [Element(symbol) for symbol in symbols]
+        coords = [[i/num_atoms, 0.5, 0.5] for i in range(num_atoms)]
+        cell = general.Cell(lattice, species, coords)
+        organism = general.Organism(cell, self.id_generator, 'maker',
+                                    self.composition_space)
+        organism.epa = epa
+        organism.total_energy = epa*num_atoms
+        return organism
+
+    def test_hull_after_removal(self):
+        al = self.make_organism(['Al'], -1.0)
+        cu = self.make_organism(['Cu'], -1.0)
+        alcu_1 = self.make_organism(['Al', 'Cu'], -1.5)
+        alcu_2 = self.make_organism(['Al', 'Cu'], -1.4)
+        al2cu = self.make_organism(['Al', 'Al', 'Cu'], -0.5)
+        initial_population = population.InitialPopulation('doesnt_matter')
+        initial_population.initial_population = [al, cu, alcu_1, alcu_2,
+                                                 al2cu]
+        pool = population.Pool(None, self.composition_space,
+                               'doesnt_matter')
+        pool.selection = general.SelectionProbDist(None, 5)
+        pool.comp_fitness_weight = general.CompositionFitnessWeight(None)
+        pool.add_initial_population(initial_population,
+                                    self.composition_space)
+
+        # evict alcu_2, then replace the hull vertex alcu_1 with a worse
+        # organism, so the hull is rebuilt
+        self.assertEqual(pool.remove_organism(self.composition_space),
+                         alcu_2)
+        alcu_3 = self.make_organism(['Al', 'Cu'], -1.2)
+        pool.replace_organism(alcu_1, alcu_3, self.composition_space)
+
+        pool_ids = set(organism.id for organism in pool.to_list())
+        self.assertTrue(pool.hull.vertex_ids <= pool_ids)
+        self.assertEqual(pool.hull.vertex_ids, set([al.id, cu.id,
+                                                    alcu_3.id]))
+        for vertex_id in pool.hull.vertex_ids:
+            self.assertTrue(type(vertex_id) is int)
+        self.assertEqual(alcu_3.value, 0.0)
+        self.assertTrue(al2cu.value > 0.0)
+
+    def test_initial_population_hull_unchanged(self):
+        al = self.make_organism(['Al'], -1.0)
+        cu = self.make_organism(['Cu'], -1.0)
+        alcu = self.make_organism(['Al', 'Cu'], -1.5)
+        al2cu = self.make_organism(['Al', 'Al', 'Cu'], -0.5)
+        initial_population = population.InitialPopulation('doesnt_matter')
+        initial_population.initial_population = [al, cu, alcu, al2cu]
+        area = initial_population.get_convex_hull_area(
+            self.composition_space)
+        pool = population.Pool(None, self.composition_space,
+                               'doesnt_matter')
+        pool.selection = general.SelectionProbDist(None, 4)
+        pool.comp_fitness_weight = general.CompositionFitnessWeight(None)
+        pool.add_initial_population(initial_population,
+                                    self.composition_space)
+        self.assertFalse(pool.hull is initial_population.hull)
+        self.assertEqual(pool.hull.vertex_ids, set([al.id, cu.id, alcu.id]))
+
+        # replacing a vertex of the pool's hull leaves the initial
+        # population's hull alone
+        worse_alcu = self.make_organism(['Al', 'Cu'], -1.2)
+        pool.replace_organism(alcu, worse_alcu, self.composition_space)
+        self.assertEqual(pool.hull.vertex_ids,
+                         set([al.id, cu.id, worse_alcu.id]))
+        self.assertEqual(initial_population.hull.vertex_ids,
+                         set([al.id, cu.id, alcu.id]))
+        self.assertAlmostEqual(initial_population.get_convex_hull_area(
+            self.composition_space), area)
+
+    def make_pool(self, organisms):
+        initial_population = population.InitialPopulation('doesnt_matter')
+        initial_population.initial_population = list(organisms)
+        pool = population.Pool(None, self.composition_space,
+                               'doesnt_matter')
+        pool.selection = general.SelectionProbDist(None, len(organisms))
+        pool.comp_fitness_weight = general.CompositionFitnessWeight(None)
+        pool.add_initial_population(initial_population,
+                                    self.composition_space)
+        return pool
+
+    def test_selection_frequencies(self):
+        organisms = [self.make_organism(['Al'], -1.0),
+                     self.make_organism(['Cu'], -1.0),
+                     self.make_organism(['Al', 'Cu'], -1.5),
+                     self.make_organism(['Al', 'Cu'], -1.4),
+                     self.make_organism(['Al', 'Al', 'Cu'], -1.2),
+                     self.make_organism(['Al', 'Cu', 'Cu'], -1.1),
+                     self.make_organism(['Al', 'Al', 'Al', 'Cu'], -0.2)]
+        pool = self.make_pool(organisms)
+        sampler = random.Random(5)
+        num_draws = 20000
+
+        # standard selection
+        counts = dict((organism.id, 0) for organism in organisms)
+        for _ in range(num_draws):
+            selected = pool.select_organism(sampler, self.composition_space)
+            counts[selected.id] += 1
+        for organism in organisms:
+            self.assertTrue(abs(counts[organism.id]/num_draws -
+                                organism.selection_prob) < 0.01)
+        # the organism with zero fitness is never selected
+        self.assertEqual(counts[organisms[-1].id], 0)
+
+        # relative selection, excluding an organism
+        excluded_org = organisms[2]
+        counts = dict((organism.id, 0) for organism in organisms)
+        for _ in range(num_draws):
+            selected = pool.select_organism(sampler, self.composition_space,
+                                            excluded_org)
+            counts[selected.id] += 1
+        self.assertEqual(counts[excluded_org.id], 0)
+        for organism in organisms:
+            self.assertTrue(abs(counts[organism.id]/num_draws -
+                                organism.relative_selection_prob) < 0.01)
+
+    def test_relative_fitnesses(self):
+        organisms = [self.make_organism(['Al'], -1.0),
+                     self.make_organism(['Al', 'Al'], -0.9),
+                     self.make_organism(['Cu'], -1.0),
+                     self.make_organism(['Al', 'Cu'], -1.5),
+                     self.make_organism(['Al', 'Al', 'Cu'], -1.2),
+                     self.make_organism(['Al', 'Cu', 'Cu'], -1.1),
+                     self.make_organism(['Al', 'Al', 'Al', 'Cu'], -0.2)]
+        fitnesses = [1.0, 0.3, 0.8, 0.0, 0.6, 0.9, 0.0]
+        for organism, fitness in zip(organisms, fitnesses):
+            organism.fitness = fitness
+        # fill the pool without computing the fitnesses
+        pool = population.Pool(None, self.composition_space,
+                               'doesnt_matter')
+        pool.comp_fitness_weight = general.CompositionFitnessWeight(
+            {'max_weight': 0.6, 'power': 2})
+        pool.promotion_set = organisms[:3]
+        pool.queue.extend(organisms[3:])
+        extra_organism = self.make_organism(['Cu', 'Cu'], -0.8)
+        extra_organism.fitness = 0.5
+
+        for replace in [False, True]:
+            if replace:
+                # change the organisms in the pool, which makes the stored
+                # arrays out of date
+                pool.queue.pop()
+                pool.queue.append(extra_organism)
+            for ref_organism in pool.to_list():
+                pool.compute_relative_fitnesses(ref_organism,
+                                                self.composition_space)
+                computed = [organism.relative_fitness for organism in
+                            pool.to_list()]
+
+                # the relative fitnesses computed one organism at a time
+                dist_from_center = pool.get_composition_distance(
+                    ref_organism.composition_vector,
+                    self.composition_space.center)
+                comp_fit_weight = 0.6*(dist_from_center/(
+                    self.composition_space.max_dist_from_center))**2
+                expected = []
+                for organism in pool.to_list():
+                    if organism is ref_organism or organism.fitness <= 0.0:
+                        expected.append(0.0)
+                    elif ref_organism.is_at_endpoint(
+                            self.composition_space) and \
+                            ref_organism.composition.reduced_formula == \
+                            organism.composition.reduced_formula:
+                        expected.append((1 - comp_fit_weight)*organism.fitness)
+                    else:
+                        comp_fitness = 1 - pool.get_composition_distance(
+                            organism.composition_vector,
+                            ref_organism.composition_vector)
+                        expected.append(comp_fit_weight*comp_fitness + (
+                            1 - comp_fit_weight)*organism.fitness)
+                self.assertTrue(np.allclose(computed, expected))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -28,10 +28,7 @@ from gasp.general import Organism, Cell
 
 from pymatgen.core.lattice import Lattice
 from pymatgen.core.periodic_table import Element, Specie
-from pymatgen.transformations.standard_transformations import \
-    RotationTransformation
 
-import copy
 import numpy as np
 import warnings
 
@@ -139,6 +136,8 @@ class Mating(object):
             self.merge_cutoff = self.default_merge_cutoff
         else:
             self.merge_cutoff = mating_params['merge_cutoff']
+        # the merge distance of each element, computed as needed
+        self.merge_distances = {}
 
         # used to optionally half large area offspring cells
         if 'halve_offspring_prob' in mating_params:
@@ -221,8 +220,8 @@ class Mating(object):
         parent1 = pool.select_organism(random, composition_space)
         parent2 = pool.select_organism(random, composition_space,
                                        excluded_org=parent1)
-        cell_1 = copy.deepcopy(parent1.cell)
-        cell_2 = copy.deepcopy(parent2.cell)
+        cell_1 = parent1.cell.snapshot()
+        cell_2 = parent2.cell.snapshot()
 
         # For interface goemetry, get the primitive cells of either one or
         # both the parent cells. This is to allow large area low energy
@@ -391,18 +390,12 @@ class Mating(object):
             random: copy of Python's built in PRNG
         """
 
-        species_from_parent_1 = []
-        species_from_parent_2 = []
+        num_from_parent_1 = 0
+        num_from_parent_2 = 0
 
         # loop needed here because sometimes no atoms get contributed from one
         # of the parents, so have to try again
-        while len(species_from_parent_1) == 0 or len(
-                species_from_parent_2) == 0:
-            species_from_parent_1 = []
-            frac_coords_from_parent_1 = []
-            species_from_parent_2 = []
-            frac_coords_from_parent_2 = []
-
+        while num_from_parent_1 == 0 or num_from_parent_2 == 0:
             # get the lattice vector to cut and the cut location
             cut_vector_index = random.randint(0, 2)
             cut_location = random.gauss(self.mu_cut_loc, self.sigma_cut_loc)
@@ -427,19 +420,20 @@ class Mating(object):
                                         random)
 
             # get the site contributions of each parent
-            for site in parent_cell_1.sites:
-                if site.frac_coords[cut_vector_index] <= cut_location:
-                    species_from_parent_1.append(site.species)
-                    frac_coords_from_parent_1.append(site.frac_coords)
-            for site in parent_cell_2.sites:
-                if site.frac_coords[cut_vector_index] > cut_location:
-                    species_from_parent_2.append(site.species)
-                    frac_coords_from_parent_2.append(site.frac_coords)
+            array_cell_1 = parent_cell_1.to_array_cell()
+            sites_from_parent_1 = array_cell_1.get_sites(
+                array_cell_1.frac_coords[:, cut_vector_index] <= cut_location)
+            num_from_parent_1 = sites_from_parent_1.num_sites
+            array_cell_2 = parent_cell_2.to_array_cell()
+            sites_from_parent_2 = array_cell_2.get_sites(
+                array_cell_2.frac_coords[:, cut_vector_index] > cut_location)
+            num_from_parent_2 = sites_from_parent_2.num_sites
 
         # combine the information for the sites contributed by each parent
-        offspring_species = species_from_parent_1 + species_from_parent_2
-        offspring_frac_coords = frac_coords_from_parent_1 + \
-            frac_coords_from_parent_2
+        offspring_species = sites_from_parent_1.get_species() + \
+            sites_from_parent_2.get_species()
+        offspring_frac_coords = np.concatenate(
+            (sites_from_parent_1.frac_coords, sites_from_parent_2.frac_coords))
 
         # compute the lattice vectors of the offspring
         offspring_lengths = 0.5*(np.array(parent_cell_1.lattice.abc) +
@@ -496,28 +490,14 @@ class Mating(object):
             pass
         else:
             # do the shift
-            shift_vector = random.random()*cell.lattice.matrix[
-                lattice_vector_index]
-            site_indices = [i for i in range(len(cell.sites))]
-            cell.translate_sites(site_indices, shift_vector, frac_coords=False,
-                                 to_unit_cell=False)
+            array_cell = cell.to_array_cell()
+            array_cell.frac_coords[:, lattice_vector_index] += random.random()
 
             # translate the sites back into the cell if needed
-            translation_vectors = {}
-            for site in cell.sites:
-                translation_vector = []
-                for coord in site.frac_coords:
-                    if coord < 0.0:
-                        translation_vector.append(1.0)
-                    elif coord > 1.0:
-                        translation_vector.append(-1.0)
-                    else:
-                        translation_vector.append(0.0)
-                translation_vectors[
-                    cell.sites.index(site)] = translation_vector
-            for key in translation_vectors:
-                cell.translate_sites(key, translation_vectors[key],
-                                     frac_coords=True, to_unit_cell=False)
+            frac_coords = array_cell.frac_coords
+            frac_coords += (frac_coords < 0.0).astype(float) - \
+                (frac_coords > 1.0).astype(float)
+            cell.set_from_array_cell(array_cell)
 
     def do_random_rotation(self, cell, geometry, constraints, random):
         """
@@ -573,22 +553,13 @@ class Mating(object):
             angle: the angle to rotate (in degrees)
         """
 
-        # make the rotation object and get a rotated cell
-        rotation = RotationTransformation(axis, angle)
-        rotated_cell = rotation.apply_transformation(cell)
+        # rotate the lattice vectors
+        rotated_lattice = cell.rotate_matrix(cell.lattice.matrix, axis, angle)
 
         # modify the cell to have the rotated lattice but the original
         # Cartesian atomic site coordinates
-        species = cell.species
-        cartesian_coords = cell.cart_coords
-        cell.modify_lattice(rotated_cell.lattice)
-        site_indices = []
-        for i in range(len(cell.sites)):
-            site_indices.append(i)
-        cell.remove_sites(site_indices)
-        for i in range(len(cartesian_coords)):
-            cell.append(species[i], cartesian_coords[i],
-                        coords_are_cartesian=True)
+        cell.set_sites(rotated_lattice, cell.species, cell.cart_coords,
+                       coords_are_cartesian=True)
 
     def merge_sites(self, cell, geometry, constraints):
         """
@@ -605,62 +576,93 @@ class Mating(object):
             geometry: the Geometry of the search
 
             constraints: the constraints of the search
-        """
 
-        species = []
-        frac_coords = []
-        merged_indices = []
+        Description:
+
+            Repeats the following on arrays until no more sites are removed:
+
+            1. Gets the pairs of sites that are within the largest merge
+                distance of each other from one periodic neighbor list.
+
+            2. Removes duplicate sites (closer than 0.01 Angstroms).
+
+            3. Goes through the sites in order, and merges each one that
+                hasn't been merged yet with the first site after it that has
+                the same element, hasn't been merged yet and is closer than
+                the merge distance of the element.
+        """
 
         # pad the cell first to prevent incorrect merges
         geometry.pad(cell)
-
-        # remove duplicate sites if needed
-        if cell.num_sites > 1:
-            cell.merge_sites(mode='delete')
-
-        # go through the cell site by site and merge pairs of sites if
-        # needed
-        for site in cell.sites:
-            # check that the site hasn't already been merged
-            if cell.sites.index(site) not in merged_indices:
-                symbol = site.specie.symbol
-                element = Element(site.specie.symbol)
-                a_radius = element.atomic_radius
-                site_index = cell.sites.index(site)
-                for other_site in cell.sites:
-                    other_symbol = other_site.specie.symbol
-                    other_index = cell.sites.index(other_site)
-                    # check that the other site hasn't already been merged, is
-                    # distinct from and has the same symbol as the site
-                    if other_index not in merged_indices and other_index != \
-                            site_index and other_symbol == symbol:
-                        # make a new site if the two are close enough
-                        if site.distance(other_site) < \
-                                a_radius*self.merge_cutoff:
-                            merged_indices.append(other_index)
-                            merged_indices.append(site_index)
-                            new_frac_coords = np.add(
-                                site.frac_coords, other_site.frac_coords)/2
-                            species.append(site.specie)
-                            frac_coords.append(new_frac_coords)
-
-        # get the data for the sites that were NOT merged
-        for site in cell.sites:
-            if cell.sites.index(site) not in merged_indices:
-                species.append(site.specie)
-                frac_coords.append(site.frac_coords)
+        lattice = cell.lattice
+        species = cell.species
+        symbols = [specie.symbol for specie in species]
+        frac_coords = cell.frac_coords
+
+        num_removed = len(species)
+        while num_removed > 0 and len(species) > 1:
+            # get all the pairs of sites that might be merged
+            merge_distances = np.array([self.get_merge_distance(symbol) for
+                                        symbol in symbols])
+            cell.set_sites(lattice, species, frac_coords)
+            centers, neighbors, images, distances = cell.get_neighbor_list(
+                max(np.max(merge_distances), 0.01))
+            pairs = np.where(centers < neighbors)[0]
+            pairs = pairs[np.lexsort((distances[pairs], neighbors[pairs],
+                                      centers[pairs]))]
+
+            # remove duplicate sites
+            is_removed = np.zeros(len(species), dtype=bool)
+            for k in pairs:
+                if distances[k] < 0.01 and not is_removed[centers[k]]:
+                    is_removed[neighbors[k]] = True
+
+            # merge pairs of sites with the same element
+            is_merged = np.zeros(len(species), dtype=bool)
+            new_species = []
+            new_frac_coords = []
+            for k in pairs:
+                i = centers[k]
+                j = neighbors[k]
+                if is_removed[i] or is_removed[j] or is_merged[i] or \
+                        is_merged[j] or symbols[i] != symbols[j] or \
+                        distances[k] >= merge_distances[i]:
+                    continue
+                is_merged[i] = True
+                is_merged[j] = True
+                new_species.append(species[i])
+                new_frac_coords.append(
+                    (frac_coords[i] + frac_coords[j] + images[k])/2)
+
+            # get the data for the sites that were NOT merged
+            for i in np.where(~(is_removed | is_merged))[0]:
+                new_species.append(species[i])
+                new_frac_coords.append(frac_coords[i])
+
+            num_removed = len(species) - len(new_species)
+            species = new_species
+            symbols = [specie.symbol for specie in species]
+            frac_coords = np.array(new_frac_coords)
 
         # make a new cell and unpad it
-        new_cell = Cell(cell.lattice, species, frac_coords)
+        new_cell = Cell(lattice, species, frac_coords)
         n_sub = None
         geometry.unpad(new_cell, n_sub, constraints)
+        return new_cell
 
-        # if any merges were done, call merge_sites recursively on the new
-        # cell
-        if len(new_cell.sites) < len(cell.sites):
-            return self.merge_sites(new_cell, geometry, constraints)
-        else:
-            return new_cell
+    def get_merge_distance(self, symbol):
+        """
+        Returns the distance below which to merge two sites of an element,
+        which is self.merge_cutoff times the atomic radius of the element.
+
+        Args:
+            symbol: the symbol of the element
+        """
+
+        if symbol not in self.merge_distances:
+            self.merge_distances[symbol] = float(
+                Element(symbol).atomic_radius)*self.merge_cutoff
+        return self.merge_distances[symbol]
 
     def halve_offspring(self, offspring_cell, mated_vector_index):
         """
@@ -681,15 +683,13 @@ class Mating(object):
         new_latt[halve_index] = latt_mat[halve_index] / 2
         new_latt = Lattice(new_latt)
 
-        offspring_species = []
-        offspring_cart_coords = []
-        for site in offspring_cell.sites:
-            if site.frac_coords[halve_index] <= 0.5:
-                offspring_species.append(site.specie)
-                offspring_cart_coords.append(site.coords)
+        array_cell = offspring_cell.to_array_cell()
+        kept_sites = array_cell.get_sites(
+            array_cell.frac_coords[:, halve_index] <= 0.5)
 
-        halved_offspring_cell = Cell(new_latt, offspring_species,
-                            offspring_cart_coords, coords_are_cartesian=True)
+        halved_offspring_cell = Cell(new_latt, kept_sites.get_species(),
+                                     kept_sites.get_cart_coords(),
+                                     coords_are_cartesian=True)
         # Sometimes, the halved cell does not have any atoms
         # Then return original offspring_cell
         if halved_offspring_cell.num_sites == 0:
@@ -783,6 +783,11 @@ class StructureMut(object):
             self.sigma_strain_matrix_element = structure_mut_params[
                 'sigma_strain_matrix_element']
 
+        # the numpy random number generator used for the perturbations. Made
+        # from Python's PRNG the first time it's needed, so that seeding
+        # Python's PRNG makes the perturbations reproducible
+        self.rng = None
+
     def do_variation(self, pool, random, geometry, constraints, id_generator,
                      composition_space):
         """
@@ -834,7 +839,7 @@ class StructureMut(object):
 
         # select a parent organism from the pool and get its cell
         parent_org = pool.select_organism(random, composition_space)
-        cell = copy.deepcopy(parent_org.cell)
+        cell = parent_org.cell.snapshot()
 
         # perturb the site coordinates
         self.perturb_atomic_coords(cell, geometry, constraints, random)
@@ -874,29 +879,24 @@ class StructureMut(object):
         # in non-periodic directions
         geometry.pad(cell)
 
-        # for each site in the cell, possibly randomly perturb it
-        for site in cell.sites:
-            if random.random() < self.frac_atoms_perturbed:
-                # perturbation along x-coordinate
-                nudge_x = random.gauss(0, self.sigma_atomic_coord_perturbation)
-                while np.abs(nudge_x) > self.max_atomic_coord_perturbation:
-                    nudge_x = random.gauss(
-                        0, self.sigma_atomic_coord_perturbation)
-                # perturbation along y-coordinate
-                nudge_y = random.gauss(0, self.sigma_atomic_coord_perturbation)
-                while np.abs(nudge_y) > self.max_atomic_coord_perturbation:
-                    nudge_y = random.gauss(
-                        0, self.sigma_atomic_coord_perturbation)
-                # perturbation along z-coordinate
-                nudge_z = random.gauss(0, self.sigma_atomic_coord_perturbation)
-                while np.abs(nudge_z) > self.max_atomic_coord_perturbation:
-                    nudge_z = random.gauss(
-                        0, self.sigma_atomic_coord_perturbation)
-                # translate the site by the random coordinate perturbations
-                perturbation_vector = [nudge_x, nudge_y, nudge_z]
-                cell.translate_sites(
-                    cell.sites.index(site), perturbation_vector,
-                    frac_coords=False, to_unit_cell=True)
+        # choose the sites to perturb, and draw the perturbations along each
+        # Cartesian coordinate for all of them at once
+        rng = self.get_rng(random)
+        array_cell = cell.to_array_cell()
+        is_perturbed = rng.random(
+            array_cell.num_sites) < self.frac_atoms_perturbed
+        perturbations = self.get_truncated_gaussians(
+            rng, self.sigma_atomic_coord_perturbation,
+            self.max_atomic_coord_perturbation,
+            (np.count_nonzero(is_perturbed), 3))
+
+        # translate the perturbed sites by the perturbations, and move them
+        # back into the cell (the other sites are left exactly as they were)
+        frac_perturbations = np.linalg.solve(array_cell.lattice_matrix.T,
+                                             perturbations.T).T
+        array_cell.frac_coords[is_perturbed] = (
+            array_cell.frac_coords[is_perturbed] + frac_perturbations) % 1.0
+        cell.set_from_array_cell(array_cell)
 
         # unpad the cell
         n_sub = None
@@ -922,25 +922,49 @@ class StructureMut(object):
 
         # compute the random non-identity components of the nine elements of
         # the strain matrix, and make sure they're in [-1, 1]
-        epsilons = []
-        for _ in range(9):
-            epsilon = random.gauss(0, self.sigma_strain_matrix_element)
-            while np.abs(epsilon) > 1:
-                epsilon = random.gauss(0, self.sigma_strain_matrix_element)
-            epsilons.append(epsilon)
-
-        # construct the strain matrix I + epsilon_ij
-        row_1 = [1 + epsilons[0], epsilons[1], epsilons[2]]
-        row_2 = [epsilons[3], 1 + epsilons[4], epsilons[5]]
-        row_3 = [epsilons[6], epsilons[7], 1 + epsilons[8]]
-        strain_matrix = np.array([row_1, row_2, row_3])
-
-        # apply the strain matrix to the lattice vectors
-        new_a = strain_matrix.dot(cell.lattice.matrix[0])
-        new_b = strain_matrix.dot(cell.lattice.matrix[1])
-        new_c = strain_matrix.dot(cell.lattice.matrix[2])
-        new_lattice = Lattice([new_a, new_b, new_c])
-        cell.lattice = new_lattice
+        epsilons = self.get_truncated_gaussians(
+            self.get_rng(random), self.sigma_strain_matrix_element, 1, (3, 3))
+
+        # apply the strain matrix I + epsilon_ij to the lattice vectors
+        strain_matrix = np.identity(3) + epsilons
+        cell.lattice = Lattice(np.dot(cell.lattice.matrix, strain_matrix.T))
+
+    def get_rng(self, random):
+        """
+        Returns the numpy random number generator used for the perturbations,
+        making it from Python's PRNG if needed.
+
+        Args:
+            random: a copy of Python's built in PRNG
+        """
+
+        if self.rng is None:
+            self.rng = np.random.default_rng(random.getrandbits(64))
+        return self.rng
+
+    def get_truncated_gaussians(self, rng, sigma, max_magnitude, shape):
+        """
+        Returns an array of numbers drawn from a Gaussian with mean zero and
+        standard deviation sigma, redrawing the ones whose magnitudes exceed
+        max_magnitude until none do.
+
+        Args:
+            rng: the numpy random number generator
+
+            sigma: the standard deviation of the Gaussian
+
+            max_magnitude: the largest allowed magnitude
+
+            shape: the shape of the array
+        """
+
+        values = rng.normal(0, sigma, shape)
+        too_large = np.abs(values) > max_magnitude
+        while np.any(too_large):
+            values[too_large] = rng.normal(0, sigma,
+                                           np.count_nonzero(too_large))
+            too_large = np.abs(values) > max_magnitude
+        return values
 
 
 class NumAtomsMut(object):
@@ -975,6 +999,20 @@ class NumAtomsMut(object):
         # whether to scale the volume of the offspring to equal that of the
         # parent (only done when atoms are added to the cell)
         self.default_scale_volume = True
+        # where to put added atoms: 'random' places them at uniformly random
+        # fractional coordinates, and 'void' places them in the largest empty
+        # regions of the cell
+        self.default_insertion_mode = 'random'
+
+        # which atoms to remove: 'random' picks them at random, and
+        # 'least_coordinated' picks the ones with the fewest neighbors
+        self.default_removal_mode = 'random'
+
+        # the grid spacing (in Angstroms) used to locate voids in the cell
+        self.void_grid_spacing = 0.5
+        # two atoms are counted as neighbors when their distance is at most
+        # this factor times the sum of their atomic radii
+        self.bond_length_factor = 1.2
 
         # the average number of stoichiometries to add
         if 'mu_num_adds' not in num_atoms_mut_params:
@@ -1000,6 +1038,33 @@ class NumAtomsMut(object):
         else:
             self.scale_volume = num_atoms_mut_params['scale_volume']
 
+        # how to choose the locations of added atoms
+        if 'insertion_mode' not in num_atoms_mut_params:
+            self.insertion_mode = self.default_insertion_mode
+        elif num_atoms_mut_params['insertion_mode'] in (None, 'default'):
+            self.insertion_mode = self.default_insertion_mode
+        elif num_atoms_mut_params['insertion_mode'] in ('random', 'void'):
+            self.insertion_mode = num_atoms_mut_params['insertion_mode']
+        else:
+            print('The value of the "insertion_mode" flag in the NumAtomsMut '
+                  'block must be either "random" or "void".')
+            print('Quitting...')
+            quit()
+
+        # how to choose the atoms to remove
+        if 'removal_mode' not in num_atoms_mut_params:
+            self.removal_mode = self.default_removal_mode
+        elif num_atoms_mut_params['removal_mode'] in (None, 'default'):
+            self.removal_mode = self.default_removal_mode
+        elif num_atoms_mut_params['removal_mode'] in ('random',
+                                                      'least_coordinated'):
+            self.removal_mode = num_atoms_mut_params['removal_mode']
+        else:
+            print('The value of the "removal_mode" flag in the NumAtomsMut '
+                  'block must be either "random" or "least_coordinated".')
+            print('Quitting...')
+            quit()
+
     def do_variation(self, pool, random, geometry, constraints, id_generator,
                      composition_space):
         """
@@ -1048,8 +1113,8 @@ class NumAtomsMut(object):
 
         # select a parent organism from the pool and get its cell
         parent_org = pool.select_organism(random, composition_space)
-        cell = copy.deepcopy(parent_org.cell)
-        parent_vol_per_atom = copy.deepcopy(cell.lattice.volume/cell.num_sites)
+        cell = parent_org.cell.snapshot()
+        parent_vol_per_atom = cell.lattice.volume/cell.num_sites
 
         # compute a valid, non-zero number of atoms (or stoichiometries) to add
         # or remove
@@ -1059,14 +1124,15 @@ class NumAtomsMut(object):
         # if fixed composition search
         if len(composition_space.endpoints) == 1:
             if num_adds > 0:
-                self.add_atoms_epa(cell, num_adds, random)
+                self.add_atoms_epa(cell, num_adds, random, constraints)
             elif num_adds < 0:
                 self.remove_atoms_epa(cell, -1*num_adds, random)
 
         # if phase diagram search
         elif len(composition_space.endpoints) > 1:
             if num_adds > 0:
-                self.add_atoms_pd(cell, num_adds, composition_space, random)
+                self.add_atoms_pd(cell, num_adds, composition_space, random,
+                                  constraints)
             elif num_adds < 0:
                 self.remove_atoms_pd(cell, -1*num_adds, random)
 
@@ -1114,10 +1180,10 @@ class NumAtomsMut(object):
                                               self.sigma_num_adds)))
         return num_adds
 
-    def add_atoms_epa(self, cell, num_adds, random):
+    def add_atoms_epa(self, cell, num_adds, random, constraints=None):
         """
-        Modifies a cell by randomly adding atoms to it. Preserves the
-        composition of the cell.
+        Modifies a cell by adding atoms to it. Preserves the composition of
+        the cell.
 
         Args:
             cell: the Cell to add sites to
@@ -1126,29 +1192,24 @@ class NumAtomsMut(object):
                 the cell. Must be a positive integer.
 
             random: a copy of Python's built in PRNG
+
+            constraints: the Constraints of the search. Only needed if
+                self.insertion_mode is 'void'.
         """
 
         # compute the number of each type of atom to add
-        amounts_to_add = {}
-        total_add = 0
+        symbols_to_add = []
         for key in cell.composition.reduced_composition:
-            amounts_to_add[key] = int(
-                num_adds*cell.composition.reduced_composition[key])
-            total_add += amounts_to_add[key]
-
-        # put the new atoms in the cell at random locations
-        for key in amounts_to_add:
-            for _ in range(amounts_to_add[key]):
-                frac_coords = [random.random(), random.random(),
-                               random.random()]
-                cell.append(Specie(key, 0), frac_coords)
-        cell.remove_oxidation_states()
-        cell.sort()
+            symbols_to_add.extend([key.symbol]*int(
+                num_adds*cell.composition.reduced_composition[key]))
+
+        # put the new atoms in the cell
+        self.insert_atoms(cell, symbols_to_add, random, constraints)
 
     def remove_atoms_epa(self, cell, num_removes, random):
         """
-        Modifies a cell by randomly removing atoms from it. Preserves the
-        composition of the cell.
+        Modifies a cell by removing atoms from it. Preserves the composition
+        of the cell.
 
         Args:
             cell: the Cell to remove atoms from
@@ -1168,21 +1229,27 @@ class NumAtomsMut(object):
             amounts_to_remove[key] = int(
                 num_removes*cell.composition.reduced_composition[key])
 
-        # remove random atoms
+        # pick the atoms of each element to remove from the indices of the
+        # sites of that element
+        species_indices = cell.get_species_indices()
+        if self.removal_mode == 'least_coordinated':
+            coordination_numbers = self.get_coordination_numbers(cell)
         site_indices_to_remove = []
         for key in amounts_to_remove:
-            for _ in range(0, amounts_to_remove[key]):
-                random_site = random.choice(cell.sites)
-                while str(random_site.specie.symbol) != str(key) or \
-                        cell.sites.index(random_site) in \
-                        site_indices_to_remove:
-                    random_site = random.choice(cell.sites)
-                site_indices_to_remove.append(cell.sites.index(random_site))
+            indices = species_indices[str(key.symbol)]
+            if self.removal_mode == 'least_coordinated':
+                site_indices_to_remove.extend(self.get_least_coordinated(
+                    indices, coordination_numbers, amounts_to_remove[key],
+                    random))
+            else:
+                site_indices_to_remove.extend(
+                    random.sample(indices, amounts_to_remove[key]))
         cell.remove_sites(site_indices_to_remove)
 
-    def add_atoms_pd(self, cell, num_adds, composition_space, random):
+    def add_atoms_pd(self, cell, num_adds, composition_space, random,
+                     constraints=None):
         """
-        Modifies a cell by randomly adding atoms to it. In general, does not
+        Modifies a cell by adding random atoms to it. In general, does not
         preserve the composition of the cell.
 
         Args:
@@ -1194,6 +1261,9 @@ class NumAtomsMut(object):
             composition_space: the CompositionSpcace of the search
 
             random: a copy of Python's built in PRNG
+
+            constraints: the Constraints of the search. Only needed if
+                self.insertion_mode is 'void'.
         """
 
         # get the random symbols to add
@@ -1202,17 +1272,105 @@ class NumAtomsMut(object):
             random_endpoint = random.choice(composition_space.endpoints)
             random_element = random.choice(list(random_endpoint.keys()))
             symbols_to_add.append(random_element.symbol)
-        # add each random symbol, and random fractional coordinates
-        for symbol in symbols_to_add:
-            frac_coords = [random.random(), random.random(), random.random()]
+        # put the new atoms in the cell
+        self.insert_atoms(cell, symbols_to_add, random, constraints)
+
+    def insert_atoms(self, cell, symbols, random, constraints=None):
+        """
+        Adds atoms of the given elements to a cell, either at random
+        locations or in the voids of the cell, depending on
+        self.insertion_mode.
+
+        Args:
+            cell: the Cell to add atoms to
+
+            symbols: a list of the element symbols (as strings) of the atoms
+                to add
+
+            random: a copy of Python's built in PRNG
+
+            constraints: the Constraints of the search. If None, the atoms are
+                placed at random locations regardless of self.insertion_mode.
+        """
+
+        if self.insertion_mode == 'void' and constraints is not None and \
+                cell.num_sites > 0:
+            new_frac_coords = self.get_void_coords(cell, symbols, constraints,
+                                                   random)
+        else:
+            new_frac_coords = [[random.random(), random.random(),
+                                random.random()] for _ in symbols]
+
+        for symbol, frac_coords in zip(symbols, new_frac_coords):
             cell.append(Specie(symbol, 0), frac_coords)
         cell.remove_oxidation_states()
         cell.sort()
 
+    def get_void_coords(self, cell, symbols, constraints, random):
+        """
+        Returns the fractional coordinates at which to place new atoms so that
+        each one sits in the largest remaining void of the cell, as a numpy
+        array with one row per new atom.
+
+        Args:
+            cell: the Cell the atoms will be added to
+
+            symbols: a list of the element symbols (as strings) of the atoms
+                to add
+
+            constraints: the Constraints of the search
+
+            random: a copy of Python's built in PRNG
+
+        Description:
+
+            1. Makes a grid of points spanning the cell, with a spacing of
+                about self.void_grid_spacing Angstroms along each lattice
+                vector, and shifts it by a random offset so repeated calls
+                don't always pick the same points.
+
+            2. Computes the periodic distance from every grid point to every
+                atom in the cell.
+
+            3. For each new atom, finds the grid point where the smallest
+                difference between the distance to an atom and the per-species
+                minimum interatomic distance between the two elements is
+                largest, and puts the new atom there. The new atom is then
+                included in the distances used to place the next one.
+        """
+
+        # make the grid of points, in fractional coordinates
+        lattice = cell.lattice
+        num_points = [max(1, int(np.ceil(length/self.void_grid_spacing)))
+                      for length in lattice.abc]
+        offset = np.array([random.random() for _ in range(3)])/num_points
+        axes = [np.arange(n)/n + offset[i] for i, n in enumerate(num_points)]
+        grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+        grid = grid.reshape(-1, 3)
+
+        # the distances from each grid point to each atom in the cell, and the
+        # index of each atom's element in the MID matrix
+        cell_symbols = [site.specie.symbol for site in cell.sites]
+        mid_indices = constraints.get_mid_indices(cell_symbols + symbols)
+        distances = lattice.get_all_distances(grid, cell.frac_coords)
+
+        new_frac_coords = np.empty((len(symbols), 3))
+        num_placed = len(cell_symbols)
+        for i in range(len(symbols)):
+            mids = constraints.mid_matrix[mid_indices[num_placed],
+                                          mid_indices[:num_placed]]
+            margins = np.min(distances - mids, axis=1)
+            best_point = grid[np.argmax(margins)]
+            new_frac_coords[i] = best_point
+            distances = np.hstack(
+                (distances, lattice.get_all_distances(grid, [best_point])))
+            num_placed += 1
+        return new_frac_coords % 1.0
+
     def remove_atoms_pd(self, cell, num_removes, random):
         """
-        Modifies a cell by randomly removing atoms from it. In general, does
-        not preserve the composition of the cell.
+        Modifies a cell by removing atoms from it. In general, does not
+        preserve the composition of the cell.
 
         Args:
             cell: the Cell to remove atoms from
@@ -1227,9 +1385,54 @@ class NumAtomsMut(object):
         """
 
         all_site_indices = list(range(len(cell.sites)))
-        site_indices_to_remove = random.sample(all_site_indices, num_removes)
+        if self.removal_mode == 'least_coordinated':
+            site_indices_to_remove = self.get_least_coordinated(
+                all_site_indices, self.get_coordination_numbers(cell),
+                num_removes, random)
+        else:
+            site_indices_to_remove = random.sample(all_site_indices,
+                                                   num_removes)
         cell.remove_sites(site_indices_to_remove)
 
+    def get_coordination_numbers(self, cell):
+        """
+        Returns the number of neighbors of each site in a cell, as a numpy
+        array. Two atoms are neighbors if their distance is at most
+        self.bond_length_factor times the sum of their atomic radii.
+
+        Args:
+            cell: the Cell
+        """
+
+        radii = np.array([Element(site.specie.symbol).atomic_radius
+                          for site in cell.sites], dtype=float)
+        cutoff = 2*self.bond_length_factor*np.max(radii)
+        centers, neighbors, _, distances = cell.get_neighbor_list(cutoff)
+        bonded = distances <= self.bond_length_factor*(
+            radii[centers] + radii[neighbors])
+        return np.bincount(centers[bonded], minlength=cell.num_sites)
+
+    def get_least_coordinated(self, indices, coordination_numbers,
+                              num_removes, random):
+        """
+        Returns a list of the num_removes site indices from indices with the
+        smallest coordination numbers. Ties are broken at random.
+
+        Args:
+            indices: a list of the candidate site indices
+
+            coordination_numbers: a numpy array with the coordination number
+                of every site in the cell
+
+            num_removes: the number of site indices to return
+
+            random: a copy of Python's built in PRNG
+        """
+
+        shuffled_indices = random.sample(indices, len(indices))
+        shuffled_indices.sort(key=lambda i: coordination_numbers[i])
+        return shuffled_indices[:num_removes]
+
 
 class Permutation(object):
     """
@@ -1347,7 +1550,7 @@ class Permutation(object):
             return None
 
         # get a copy of the parent organism's cell
-        cell = copy.deepcopy(parent_org.cell)
+        cell = parent_org.cell.snapshot()
 
         # compute a positive random number of swaps to do
         num_swaps = int(round(random.gauss(self.mu_num_swaps,
@@ -1409,17 +1612,24 @@ class Permutation(object):
             cell: the Cell to check
         """
 
+        return self.get_possible_swaps_from_indices(
+            cell.get_species_indices())
+
+    def get_possible_swaps_from_indices(self, species_indices):
+        """
+        Returns the sublist of self.pairs_to_swap whose elements both have
+        sites in species_indices.
+
+        Args:
+            species_indices: a dictionary mapping element symbols to lists of
+                site indices, as returned by Cell.get_species_indices
+        """
+
         possible_pairs = []
         for pair in self.pairs_to_swap:
             symbols = pair.split()
-            has_element_1 = False
-            has_element_2 = False
-            for site in cell.sites:
-                if str(site.specie.symbol) == symbols[0]:
-                    has_element_1 = True
-                if str(site.specie.symbol) == symbols[1]:
-                    has_element_2 = True
-            if has_element_1 and has_element_2:
+            if len(species_indices.get(symbols[0], [])) > 0 and len(
+                    species_indices.get(symbols[1], [])) > 0:
                 possible_pairs.append(pair)
         return possible_pairs
 
@@ -1439,36 +1649,42 @@ class Permutation(object):
             random: a copy of Python's built in PRNG
         """
 
+        # the indices of the sites of each element that haven't been picked
+        species_indices = cell.get_species_indices()
+
         # try to select the computed number of swaps - keep getting more until
         # either we've got enough or no more swaps are possible
-        possible_swaps = self.get_possible_swaps(cell)
-        num_swaps_selected = 0
+        possible_swaps = self.get_possible_swaps_from_indices(species_indices)
         pair_indices = []
-        cell_to_check = copy.deepcopy(cell)
-        while num_swaps_selected < num_swaps and len(possible_swaps) > 0:
+        while len(pair_indices) < num_swaps and len(possible_swaps) > 0:
             # pick a random pair to swap that we know is possible
             swap = random.choice(possible_swaps)
             symbols = swap.split()
-            # find sites with the elements to swap
-            site_1 = random.choice(cell_to_check.sites)
-            while str(site_1.specie.symbol) != symbols[0]:
-                site_1 = random.choice(cell_to_check.sites)
-            site_2 = random.choice(cell_to_check.sites)
-            while str(site_2.specie.symbol) != symbols[1]:
-                site_2 = random.choice(cell_to_check.sites)
-            # record the indices (w.r.t. to the unchanged cell) for this
-            # pair of sites
-            pair_index = [cell.sites.index(site_1),
-                          cell.sites.index(site_2)]
-            pair_indices.append(pair_index)
-            num_swaps_selected += 1
-            # remove these two sites from the cell to check
-            cell_to_check.remove_sites(
-                [cell_to_check.sites.index(site_1),
-                 cell_to_check.sites.index(site_2)])
-            possible_swaps = self.get_possible_swaps(cell_to_check)
+            # pick sites with the elements to swap, without replacement
+            pair_indices.append(
+                [self.pop_random_index(species_indices[symbols[0]], random),
+                 self.pop_random_index(species_indices[symbols[1]], random)])
+            possible_swaps = self.get_possible_swaps_from_indices(
+                species_indices)
         return pair_indices
 
+    def pop_random_index(self, indices, random):
+        """
+        Removes a randomly chosen entry from a list of indices and returns
+        it. Doesn't preserve the order of the list.
+
+        Args:
+            indices: the list of indices
+
+            random: a copy of Python's built in PRNG
+        """
+
+        k = random.randrange(len(indices))
+        index = indices[k]
+        indices[k] = indices[-1]
+        indices.pop()
+        return index
+
     def swap_pairs(self, cell, indices_to_swap):
         """
         Modifies a cell by swapping the sites with the specified indices.